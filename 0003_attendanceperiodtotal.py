@@ -0,0 +1,66 @@
+# Generated by Django 5.2 on 2026-10-17 06:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q, Sum
+
+
+def backfill_period_totals(apps, schema_editor):
+    # Existing attendance must be in the accumulators before payroll reads whole periods from them
+    from hr.attendance_totals import pay_periods_between
+
+    Attendance = apps.get_model('hr', 'Attendance')
+    AttendancePeriodTotal = apps.get_model('hr', 'AttendancePeriodTotal')
+    bounds = Attendance.objects.aggregate(first=Min('date'), last=Max('date'))
+    if bounds['first'] is None:
+        return
+    for period_start, period_end in pay_periods_between(bounds['first'], bounds['last']):
+        rows = Attendance.objects.filter(date__range=[period_start, period_end]).values('employee_id').annotate(
+            days_recorded=Count('id'),
+            present_days=Count('id', filter=Q(check_in_time__isnull=False)),
+            late_days=Count('id', filter=Q(is_late=True)),
+            absent_days=Count('id', filter=Q(is_absent=True)),
+            total_hours=Sum('work_hours'),
+            overtime_hours=Sum('overtime_hours'),
+        ).order_by()
+        AttendancePeriodTotal.objects.bulk_create([
+            AttendancePeriodTotal(
+                period_start=period_start, period_end=period_end,
+                **{field: value or 0 for field, value in row.items()},
+            )
+            for row in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr', '0002_alter_employee_employee_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendancePeriodTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('days_recorded', models.IntegerField(default=0)),
+                ('present_days', models.IntegerField(default=0)),
+                ('late_days', models.IntegerField(default=0)),
+                ('absent_days', models.IntegerField(default=0)),
+                ('total_hours', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('overtime_hours', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_totals', to='hr.employee')),
+            ],
+            options={
+                'verbose_name': 'Attendance Period Total',
+                'verbose_name_plural': 'Attendance Period Totals',
+                'db_table': 'hr_attendance_period_total',
+                'ordering': ['-period_start', 'employee'],
+                'unique_together': {('employee', 'period_start')},
+            },
+        ),
+        migrations.RunPython(backfill_period_totals, migrations.RunPython.noop),
+    ]
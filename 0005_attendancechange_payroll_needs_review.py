@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-17 06:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr', '0004_payrollrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payroll',
+            name='needs_review',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='AttendanceChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_changes', to='hr.employee')),
+            ],
+            options={
+                'verbose_name': 'Attendance Change',
+                'verbose_name_plural': 'Attendance Changes',
+                'db_table': 'hr_attendance_change',
+                'ordering': ['recorded_at'],
+                'unique_together': {('employee', 'date')},
+            },
+        ),
+    ]
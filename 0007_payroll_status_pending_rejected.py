@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-17 06:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr', '0006_payslipbatch_payroll_payslip_file'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('late_checkin', 'Late Check-in'), ('missed_checkout', 'Missed Check-out'), ('leave_approval', 'Leave Approval'), ('payroll_ready', 'Payroll Ready'), ('payroll_approved', 'Payroll Approved'), ('payroll_rejected', 'Payroll Rejected'), ('payroll_paid', 'Payroll Paid'), ('document_expiry', 'Document Expiry'), ('general', 'General')], default='general', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='payroll',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Draft'), ('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('paid', 'Paid')], default='draft', max_length=20),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-17 06:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr', '0007_payroll_status_pending_rejected'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='break_hours',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=5),
+        ),
+        migrations.CreateModel(
+            name='RawPunch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('punched_at', models.DateTimeField(db_index=True)),
+                ('device_id', models.CharField(blank=True, max_length=50)),
+                ('employee', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='raw_punches', to='hr.employee')),
+            ],
+            options={
+                'verbose_name': 'Raw Punch',
+                'verbose_name_plural': 'Raw Punches',
+                'db_table': 'hr_raw_punch',
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2 on 2026-10-17 06:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q, Sum
+
+
+def backfill_month_totals(apps, schema_editor):
+    # Dashboards and summaries read history from the rollup, so existing attendance goes in now
+    from hr.attendance_totals import month_bounds, months_between
+
+    Attendance = apps.get_model('hr', 'Attendance')
+    AttendanceMonthTotal = apps.get_model('hr', 'AttendanceMonthTotal')
+    bounds = Attendance.objects.aggregate(first=Min('date'), last=Max('date'))
+    if bounds['first'] is None:
+        return
+    for year, month in months_between(bounds['first'], bounds['last']):
+        rows = Attendance.objects.filter(date__range=month_bounds(year, month)).values('employee_id').annotate(
+            days_recorded=Count('id'),
+            present_days=Count('id', filter=Q(check_in_time__isnull=False)),
+            late_days=Count('id', filter=Q(is_late=True)),
+            absent_days=Count('id', filter=Q(is_absent=True)),
+            total_hours=Sum('work_hours'),
+            overtime_hours=Sum('overtime_hours'),
+        ).order_by()
+        AttendanceMonthTotal.objects.bulk_create([
+            AttendanceMonthTotal(year=year, month=month, **{field: value or 0 for field, value in row.items()})
+            for row in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr', '0008_rawpunch_attendance_break_hours'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceMonthTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('days_recorded', models.IntegerField(default=0)),
+                ('present_days', models.IntegerField(default=0)),
+                ('late_days', models.IntegerField(default=0)),
+                ('absent_days', models.IntegerField(default=0)),
+                ('total_hours', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('overtime_hours', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='month_totals', to='hr.employee')),
+            ],
+            options={
+                'verbose_name': 'Attendance Month Total',
+                'verbose_name_plural': 'Attendance Month Totals',
+                'db_table': 'hr_attendance_month_total',
+                'ordering': ['-year', '-month', 'employee'],
+                'unique_together': {('employee', 'year', 'month')},
+            },
+        ),
+        migrations.RunPython(backfill_month_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-17 06:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr', '0009_attendancemonthtotal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField(unique=True)),
+                ('status', models.CharField(choices=[('archived', 'Archived'), ('restored', 'Restored')], default='archived', max_length=20)),
+                ('path', models.CharField(max_length=255)),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('checksum', models.CharField(max_length=64)),
+                ('first_date', models.DateField(blank=True, null=True)),
+                ('last_date', models.DateField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('restored_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Attendance Archive',
+                'verbose_name_plural': 'Attendance Archives',
+                'db_table': 'hr_attendance_archive',
+                'ordering': ['-year'],
+            },
+        ),
+    ]
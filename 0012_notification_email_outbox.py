@@ -0,0 +1,54 @@
+# Generated by Django 5.2 on 2026-10-17 06:50
+
+from django.db import migrations, models
+
+
+def mark_sent(apps, schema_editor):
+    # Emails sent inline before the outbox existed must not be queued again
+    Notification = apps.get_model('hr', 'Notification')
+    Notification.objects.filter(is_email_sent=True).update(email_status='sent')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr', '0011_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='email_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='email_claim',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='email_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='email_next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='email_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='email_status',
+            field=models.CharField(choices=[('none', 'Not Requested'), ('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='none', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['email_status', 'email_next_attempt_at'], name='hr_notif_outbox_idx'),
+        ),
+        migrations.RunPython(mark_sent, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-17 06:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr', '0013_notification_dedup_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('late_checkin', 'Late Check-in'), ('missed_checkout', 'Missed Check-out'), ('leave_approval', 'Leave Approval'), ('payroll_ready', 'Payroll Ready'), ('payroll_approved', 'Payroll Approved'), ('payroll_rejected', 'Payroll Rejected'), ('payroll_paid', 'Payroll Paid'), ('document_expiry', 'Document Expiry'), ('digest', 'Digest'), ('general', 'General')], default='general', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='NotificationDigestItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_type', models.CharField(choices=[('late_checkin', 'Late Check-in'), ('missed_checkout', 'Missed Check-out'), ('leave_approval', 'Leave Approval'), ('payroll_ready', 'Payroll Ready'), ('payroll_approved', 'Payroll Approved'), ('payroll_rejected', 'Payroll Rejected'), ('payroll_paid', 'Payroll Paid'), ('document_expiry', 'Document Expiry'), ('digest', 'Digest'), ('general', 'General')], max_length=20)),
+                ('title', models.CharField(max_length=200)),
+                ('message', models.TextField()),
+                ('related_object_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('related_object_type', models.CharField(blank=True, max_length=50)),
+                ('dedup_key', models.CharField(blank=True, max_length=64, null=True, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('digest', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='digest_items', to='hr.notification')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='digest_items', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Notification Digest Item',
+                'verbose_name_plural': 'Notification Digest Items',
+                'db_table': 'hr_notification_digest_item',
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,153 @@
+"""
+Set-based detection of working days with no attendance
+"""
+from django.db import connection, models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.utils import timezone
+from datetime import date, timedelta
+import logging
+import time
+
+from .models import Employee, Attendance, LeaveRequest
+from .attendance_calendar import AttendanceCalendarService
+from .attendance_totals import (
+    TOTAL_FIELDS, UNIQUE_FIELDS, accumulator_buckets_between, bucket_lookup, months_between
+)
+
+logger = logging.getLogger(__name__)
+
+
+def insert_from_select(model, queryset, columns, conflict_fields):
+    """
+    INSERT INTO model (columns) <queryset> ON CONFLICT (conflict_fields) DO NOTHING.
+    columns maps model field names to the queryset values selected for them, in order.
+    Returns the number of rows inserted.
+    """
+    select = queryset.order_by().annotate(
+        **{f'insert_{name}': value for name, value in columns.items() if not isinstance(value, str)}
+    ).values_list(*(value if isinstance(value, str) else f'insert_{name}' for name, value in columns.items()))
+    sql, params = select.query.sql_with_params()
+    quote = connection.ops.quote_name
+    column_sql = ', '.join(quote(model._meta.get_field(name).column) for name in columns)
+    conflict_sql = ', '.join(quote(model._meta.get_field(name).column) for name in conflict_fields)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(model._meta.db_table)} ({column_sql}) {sql} ON CONFLICT ({conflict_sql}) DO NOTHING',
+            params,
+        )
+        return cursor.rowcount
+
+
+class AbsenceDetectionService:
+    """
+    Insert absence rows for employees who should have worked but have no attendance
+    """
+
+    @staticmethod
+    def insert_absences(start_date, end_date, now):
+        """
+        Insert absence rows for the whole range with one INSERT ... SELECT: active employees
+        cross joined with the range's days, minus days off, days with attendance and days
+        of approved leave. No rows pass through Python. Returns the number of rows inserted.
+        """
+        quote = connection.ops.quote_name
+
+        def table(model):
+            return quote(model._meta.db_table)
+
+        def column(model, name):
+            return quote(model._meta.get_field(name).column)
+
+        days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+        # (date, weekday) rows; working days are the first work_days_per_week days of the week, Monday first
+        days_sql = ', '.join(['(%s, %s)'] * len(days))
+        days_params = [value for day in days for value in (connection.ops.adapt_datefield_value(day), day.weekday())]
+        insert_columns = [
+            'employee', 'date', 'is_absent', 'is_late', 'work_hours', 'overtime_hours',
+            'break_hours', 'notes', 'created_at', 'updated_at',
+        ]
+        sql = f"""
+            INSERT INTO {table(Attendance)} ({', '.join(column(Attendance, name) for name in insert_columns)})
+            SELECT e.{column(Employee, 'id')}, d.column1, %s, %s, 0, 0, 0, '', %s, %s
+            FROM {table(Employee)} e CROSS JOIN (VALUES {days_sql}) d
+            WHERE (e.{column(Employee, 'status')} = 'active' OR e.{column(Employee, 'termination_date')} IS NOT NULL)
+              AND (e.{column(Employee, 'termination_date')} IS NULL OR e.{column(Employee, 'termination_date')} >= d.column1)
+              AND e.{column(Employee, 'hire_date')} <= d.column1
+              AND e.{column(Employee, 'work_days_per_week')} > d.column2
+              AND NOT EXISTS (
+                  SELECT 1 FROM {table(Attendance)} a
+                  WHERE a.{column(Attendance, 'employee')} = e.{column(Employee, 'id')}
+                    AND a.{column(Attendance, 'date')} = d.column1
+              )
+              AND NOT EXISTS (
+                  SELECT 1 FROM {table(LeaveRequest)} l
+                  WHERE l.{column(LeaveRequest, 'employee')} = e.{column(Employee, 'id')}
+                    AND l.{column(LeaveRequest, 'status')} = 'approved'
+                    AND l.{column(LeaveRequest, 'start_date')} <= d.column1
+                    AND l.{column(LeaveRequest, 'end_date')} >= d.column1
+              )
+            ON CONFLICT ({column(Attendance, 'employee')}, {column(Attendance, 'date')}) DO NOTHING
+        """
+        # A punch landing between the anti-join and the insert wins
+        with connection.cursor() as cursor:
+            created_at = connection.ops.adapt_datetimefield_value(now)
+            cursor.execute(sql, [True, False, created_at, created_at, *days_params])
+            return cursor.rowcount
+
+    @staticmethod
+    def add_to_totals(start_date, end_date, now):
+        """
+        Count absences inserted at `now` into the period and month accumulators,
+        one set-based insert and update per bucket
+        """
+        for model, key_fields, first_day, last_day in accumulator_buckets_between(start_date, end_date):
+            inserted = Attendance.objects.filter(
+                date__range=[max(first_day, start_date), min(last_day, end_date)],
+                is_absent=True,
+                created_at=now,
+            )
+            insert_from_select(
+                model,
+                inserted.values('employee_id').distinct(),
+                {
+                    'employee': 'employee_id',
+                    **{
+                        field: Value(value, output_field=models.DateField() if isinstance(value, date) else models.IntegerField())
+                        for field, value in key_fields
+                    },
+                    **{field: Value(0) for field in TOTAL_FIELDS},
+                    'updated_at': Value(now, output_field=models.DateTimeField()),
+                },
+                ['employee', *UNIQUE_FIELDS[model]],
+            )
+            count = Subquery(
+                inserted.filter(employee_id=OuterRef('employee_id')).order_by().values('employee_id').annotate(
+                    absences=Count('id')
+                ).values('absences')
+            )
+            model.objects.filter(
+                employee_id__in=inserted.values('employee_id'), **bucket_lookup(model, key_fields)
+            ).update(days_recorded=F('days_recorded') + count, absent_days=F('absent_days') + count)
+
+    @staticmethod
+    def detect(start_date, end_date):
+        """
+        Mark absences for every day in the range and return the number of rows created
+        """
+        started = time.perf_counter()
+        now = timezone.now()
+        # The rows and their accumulator counts commit together, so a crash leaves neither
+        with transaction.atomic():
+            created = AbsenceDetectionService.insert_absences(start_date, end_date, now)
+            if created:
+                # Absence rows carry no hours, so only the day counters change
+                AbsenceDetectionService.add_to_totals(start_date, end_date, now)
+                AttendanceCalendarService.invalidate(
+                    date(year, month, 1) for year, month in months_between(start_date, end_date)
+                )
+
+        logger.info(
+            f"Detected {created} absences from {start_date} to {end_date} "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return created
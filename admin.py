@@ -3,8 +3,16 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.html import format_html
 from .models import (
     User, Employee, Department, JobPosition, Attendance, 
-    LeaveRequest, Payroll, Document, Notification, AuditLog
+    LeaveRequest, Payroll, Document, Notification, AuditLog, AttendancePeriodTotal, AttendanceMonthTotal,
+    PayrollRun, PayrollRunShard, PayslipBatch, RawPunch, AttendanceArchive,
+    ExportJob, NotificationDigestItem
 )
+from .payroll_calculator import PayrollCalculator
+from .payroll_transitions import PayrollTransitionService
+from .attendance_calendar import AttendanceCalendarService
+from .attendance_totals import AttendanceTotalsService
+from .payroll_recalculation import PayrollRecalculationService
+from .notification_outbox import EmailOutboxService
 
 
 class EmployeeInline(admin.StackedInline):
@@ -163,13 +171,101 @@ class AttendanceAdmin(admin.ModelAdmin):
     """
     Attendance admin
     """
-    list_display = ('employee', 'date', 'check_in_time', 'check_out_time', 'work_hours', 'is_late', 'is_absent')
+    list_display = ('employee', 'date', 'check_in_time', 'check_out_time', 'work_hours', 'break_hours', 'is_late', 'is_absent')
     list_filter = ('date', 'is_late', 'is_absent', 'employee__department')
     search_fields = ('employee__user__first_name', 'employee__user__last_name', 'employee__employee_id')
     ordering = ('-date',)
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('employee__user')
+    
+    def delete_queryset(self, request, queryset):
+        """Bulk delete bypasses Attendance.delete, so refresh the accumulators afterwards"""
+        pairs = list(queryset.values_list('employee_id', 'date'))
+        super().delete_queryset(request, queryset)
+        AttendanceTotalsService.refresh(pairs)
+        AttendanceCalendarService.invalidate(day for _, day in pairs)
+        PayrollRecalculationService.record_changes(pairs)
+
+
+@admin.register(RawPunch)
+class RawPunchAdmin(admin.ModelAdmin):
+    """
+    Raw punch log admin (read-only, append-only)
+    """
+    list_display = ('employee', 'punched_at', 'device_id')
+    ordering = ('-punched_at',)
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('employee__user')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AttendancePeriodTotal)
+class AttendancePeriodTotalAdmin(admin.ModelAdmin):
+    """
+    Attendance period totals admin (read-only, maintained from Attendance)
+    """
+    list_display = ('employee', 'period_start', 'period_end', 'days_recorded', 'present_days', 'late_days', 'absent_days', 'total_hours', 'overtime_hours')
+    list_filter = ('period_start', 'employee__department')
+    search_fields = ('employee__user__first_name', 'employee__user__last_name', 'employee__employee_id')
+    ordering = ('-period_start',)
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('employee__user')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AttendanceMonthTotal)
+class AttendanceMonthTotalAdmin(admin.ModelAdmin):
+    """
+    Monthly attendance rollup admin (read-only, maintained from Attendance)
+    """
+    list_display = ('employee', 'year', 'month', 'days_recorded', 'present_days', 'late_days', 'absent_days', 'total_hours', 'overtime_hours')
+    list_filter = ('year', 'month', 'employee__department')
+    search_fields = ('employee__user__first_name', 'employee__user__last_name', 'employee__employee_id')
+    ordering = ('-year', '-month')
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('employee__user')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AttendanceArchive)
+class AttendanceArchiveAdmin(admin.ModelAdmin):
+    """
+    Attendance archive manifest admin (read-only, maintained by archive_attendance)
+    """
+    list_display = ('year', 'status', 'row_count', 'first_date', 'last_date', 'path', 'archived_at', 'restored_at')
+    list_filter = ('status',)
+    ordering = ('-year',)
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(LeaveRequest)
@@ -191,13 +287,106 @@ class PayrollAdmin(admin.ModelAdmin):
     """
     Payroll admin
     """
-    list_display = ('employee', 'pay_period_start', 'pay_period_end', 'base_salary', 'net_salary', 'status', 'created_at')
-    list_filter = ('status', 'pay_period_start', 'pay_period_end', 'created_at')
+    list_display = ('employee', 'pay_period_start', 'pay_period_end', 'base_salary', 'net_salary', 'status', 'needs_review', 'created_at')
+    list_filter = ('status', 'needs_review', 'pay_period_start', 'pay_period_end', 'created_at')
     search_fields = ('employee__user__first_name', 'employee__user__last_name', 'employee__employee_id')
     ordering = ('-pay_period_end',)
+    actions = ['recalculate_net_salary', 'approve_payrolls', 'reject_payrolls', 'mark_payrolls_paid']
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('employee__user', 'created_by', 'approved_by')
+    
+    @admin.action(description='Recalculate net salary for selected payrolls')
+    def recalculate_net_salary(self, request, queryset):
+        """Recalculate selected payrolls in one batch pass"""
+        updated = PayrollCalculator.recalculate(queryset)
+        self.message_user(request, f'Recalculated net salary for {updated} payrolls.')
+    
+    def _transition(self, request, queryset, action, verb):
+        outcomes = PayrollTransitionService.transition(
+            queryset.values_list('id', flat=True), action, user=request.user
+        )
+        skipped = sum(1 for outcome in outcomes.values() if outcome == 'invalid_status')
+        self.message_user(
+            request,
+            f'{verb} {len(outcomes) - skipped} payrolls'
+            + (f'; skipped {skipped} not in a valid status.' if skipped else '.'),
+        )
+    
+    @admin.action(description='Approve selected draft or pending payrolls')
+    def approve_payrolls(self, request, queryset):
+        self._transition(request, queryset, 'approve', 'Approved')
+    
+    @admin.action(description='Reject selected draft or pending payrolls')
+    def reject_payrolls(self, request, queryset):
+        self._transition(request, queryset, 'reject', 'Rejected')
+    
+    @admin.action(description='Mark selected approved payrolls as paid')
+    def mark_payrolls_paid(self, request, queryset):
+        self._transition(request, queryset, 'mark_paid', 'Marked paid')
+
+
+class PayrollRunShardInline(admin.TabularInline):
+    """
+    Read-only shard checkpoints for a payroll run
+    """
+    model = PayrollRunShard
+    extra = 0
+    can_delete = False
+    fields = ('label', 'status', 'batches_completed', 'last_employee_id', 'created_count', 'skipped_count', 'error', 'updated_at')
+    readonly_fields = fields
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PayrollRun)
+class PayrollRunAdmin(admin.ModelAdmin):
+    """
+    Payroll run admin for inspecting in-flight and past runs
+    """
+    list_display = ('id', 'pay_period_start', 'pay_period_end', 'status', 'processed_employees', 'total_employees', 'created_count', 'heartbeat_at', 'created_at')
+    list_filter = ('status', 'pay_period_start', 'created_at')
+    ordering = ('-created_at',)
+    inlines = [PayrollRunShardInline]
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PayslipBatch)
+class PayslipBatchAdmin(admin.ModelAdmin):
+    """
+    Payslip batch admin for following rendering progress
+    """
+    list_display = ('id', 'status', 'total', 'rendered', 'cached', 'failed', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'created_at')
+    ordering = ('-created_at',)
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    """
+    Export job admin for following background exports
+    """
+    list_display = ('id', 'kind', 'status', 'rows_written', 'total_rows', 'file_size', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status', 'created_at')
+    ordering = ('-created_at',)
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Document)
@@ -219,13 +408,40 @@ class NotificationAdmin(admin.ModelAdmin):
     """
     Notification admin
     """
-    list_display = ('recipient', 'title', 'notification_type', 'is_read', 'created_at')
-    list_filter = ('notification_type', 'is_read', 'created_at')
+    list_display = ('recipient', 'title', 'notification_type', 'is_read', 'email_status', 'email_attempts', 'created_at')
+    list_filter = ('notification_type', 'is_read', 'email_status', 'created_at')
     search_fields = ('recipient__username', 'title', 'message')
     ordering = ('-created_at',)
+    actions = ['retry_failed_emails']
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('recipient')
+    
+    @admin.action(description='Retry failed emails for selected notifications')
+    def retry_failed_emails(self, request, queryset):
+        """Put failed emails back in the outbox"""
+        count = EmailOutboxService.retry_failed(queryset)
+        self.message_user(request, f'{count} emails queued for another delivery attempt.')
+
+
+@admin.register(NotificationDigestItem)
+class NotificationDigestItemAdmin(admin.ModelAdmin):
+    """
+    Digest item admin for alerts waiting for or merged into a digest
+    """
+    list_display = ('recipient', 'title', 'notification_type', 'digest', 'created_at')
+    list_filter = ('notification_type', 'created_at')
+    search_fields = ('recipient__username', 'title', 'message')
+    ordering = ('-created_at',)
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('recipient', 'digest')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(AuditLog)
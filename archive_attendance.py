@@ -0,0 +1,46 @@
+"""
+Management command to move attendance of closed years into archive files
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from hr.attendance_archive import AttendanceArchiveService
+
+
+class Command(BaseCommand):
+    help = 'Archive attendance for closed, fully paid years into compressed per-year files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--year',
+            type=int,
+            action='append',
+            help='Year to archive (repeatable), defaults to every closed year',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the years that would be archived without changing anything',
+        )
+
+    def handle(self, *args, **options):
+        closed = AttendanceArchiveService.closed_years()
+        years = options.get('year') or closed
+        not_closed = sorted(set(years) - set(closed))
+        if not_closed:
+            raise CommandError(
+                f"Not closed, fully paid years with attendance: {', '.join(map(str, not_closed))}"
+            )
+        if not years:
+            self.stdout.write('No closed years to archive.')
+            return
+        
+        if options['dry_run']:
+            self.stdout.write(f"Would archive: {', '.join(map(str, sorted(years)))}")
+            return
+        
+        for year in sorted(years):
+            self.stdout.write(f'Archiving attendance for {year}...')
+            entry = AttendanceArchiveService.archive(year)
+            self.stdout.write(f'  {entry.row_count} rows -> {entry.path}')
+        
+        self.stdout.write(self.style.SUCCESS(f'Successfully archived {len(years)} year(s) of attendance!'))
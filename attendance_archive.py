@@ -0,0 +1,229 @@
+"""
+Cold storage for attendance of closed, fully paid years
+"""
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Max, Min, prefetch_related_objects
+from django.utils import timezone
+from datetime import date
+import gzip
+import hashlib
+import json
+import logging
+import tempfile
+import time
+
+from .models import Attendance, AttendanceArchive, AttendanceChange, Payroll
+from .attendance_calendar import AttendanceCalendarService
+from .punch_files import chunked
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = 'attendance_archive'
+ARCHIVE_FIELDS = [field.attname for field in Attendance._meta.concrete_fields]
+
+
+def archive_path(year):
+    return f"{ARCHIVE_DIR}/attendance-{year}.jsonl.gz"
+
+
+def _year_bounds(year):
+    return date(year, 1, 1), date(year, 12, 31)
+
+
+def _checksum(path):
+    digest = hashlib.sha256()
+    with default_storage.open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _row_to_attendance(row):
+    """Rebuild an unsaved Attendance with its original id from an archived JSON row"""
+    return Attendance(**{
+        field.attname: field.to_python(row[field.attname])
+        for field in Attendance._meta.concrete_fields
+    })
+
+
+class AttendanceArchiveService:
+    """
+    Move whole years of attendance into compressed JSON-lines files, read them back
+    and restore them. The period and month accumulators are kept, so summaries,
+    dashboards and payroll history still cover archived years.
+    """
+
+    @staticmethod
+    def archived_years():
+        return set(AttendanceArchive.objects.filter(status='archived').values_list('year', flat=True))
+
+    @staticmethod
+    def closed_years(today=None):
+        """
+        Years that have ended, still have hot rows, and whose payrolls are all paid
+        with no pending attendance changes
+        """
+        today = today or date.today()
+        first = Attendance.objects.aggregate(first=Min('date'))['first']
+        if first is None:
+            return []
+        closed = []
+        for year in range(first.year, today.year):
+            start_date, end_date = _year_bounds(year)
+            if not Attendance.objects.filter(date__range=[start_date, end_date]).exists():
+                continue
+            unpaid = Payroll.objects.filter(
+                pay_period_start__lte=end_date, pay_period_end__gte=start_date,
+            ).exclude(status='paid')
+            if unpaid.exists() or AttendanceChange.objects.filter(date__range=[start_date, end_date]).exists():
+                continue
+            closed.append(year)
+        return closed
+
+    @staticmethod
+    def archive(year, batch_size=5000):
+        """
+        Write a year of attendance to its archive file, verify it, then delete the hot rows.
+        Returns the manifest entry.
+        """
+        if year not in AttendanceArchiveService.closed_years():
+            raise ValueError(f"{year} is not a closed, fully paid year with attendance to archive")
+
+        started = time.perf_counter()
+        start_date, end_date = _year_bounds(year)
+        rows = Attendance.objects.filter(date__range=[start_date, end_date])
+        path = archive_path(year)
+
+        with transaction.atomic():
+            # Hold the year's rows so nothing changes between the dump and the delete.
+            # PostgreSQL rejects FOR UPDATE on an aggregate, so lock the ids first.
+            list(rows.select_for_update().values_list('id', flat=True))
+            bounds = rows.aggregate(first=Min('date'), last=Max('date'))
+            written = 0
+            with tempfile.TemporaryFile() as spool:
+                with gzip.GzipFile(fileobj=spool, mode='wb') as archive:
+                    for values in rows.order_by('date', 'employee_id').values_list(*ARCHIVE_FIELDS).iterator(
+                        chunk_size=batch_size
+                    ):
+                        # str keeps full microsecond precision, unlike DjangoJSONEncoder
+                        archive.write(json.dumps(dict(zip(ARCHIVE_FIELDS, values)), default=str).encode())
+                        archive.write(b'\n')
+                        written += 1
+                spool.seek(0)
+                if default_storage.exists(path):
+                    default_storage.delete(path)
+                saved_path = default_storage.save(path, File(spool))
+
+            read_back = sum(1 for _ in AttendanceArchiveService._read_file(saved_path))
+            if read_back != written:
+                raise ValueError(f"Archive {saved_path} holds {read_back} rows, expected {written}")
+
+            entry, _ = AttendanceArchive.objects.update_or_create(year=year, defaults={
+                'status': 'archived',
+                'path': saved_path,
+                'row_count': written,
+                'checksum': _checksum(saved_path),
+                'first_date': bounds['first'],
+                'last_date': bounds['last'],
+                'archived_at': timezone.now(),
+                'restored_at': None,
+            })
+            # A queryset delete never calls Attendance.delete, so the accumulators keep the archived year
+            rows.delete()
+            AttendanceCalendarService.invalidate(date(year, month, 1) for month in range(1, 13))
+
+        logger.info(f"Archived {written} attendance rows for {year} to {saved_path} in {time.perf_counter() - started:.2f}s")
+        return entry
+
+    @staticmethod
+    def _read_file(path):
+        with default_storage.open(path, 'rb') as handle:
+            with gzip.GzipFile(fileobj=handle, mode='rb') as archive:
+                for line in archive:
+                    yield json.loads(line)
+
+    @staticmethod
+    def read(year, start_date=None, end_date=None, employee_ids=None):
+        """
+        Yield archived rows of a year as unsaved Attendance instances, in date order
+        """
+        entry = AttendanceArchive.objects.get(year=year, status='archived')
+        start_date = start_date.isoformat() if start_date else None
+        end_date = end_date.isoformat() if end_date else None
+        employee_ids = set(employee_ids) if employee_ids is not None else None
+        for row in AttendanceArchiveService._read_file(entry.path):
+            # ISO dates compare correctly as strings
+            if start_date and row['date'] < start_date:
+                continue
+            if end_date and row['date'] > end_date:
+                return
+            if employee_ids is not None and row['employee_id'] not in employee_ids:
+                continue
+            yield _row_to_attendance(row)
+
+    @staticmethod
+    def history(start_date, end_date, employee_ids=None, related=('employee__user',), fields=None, batch_size=1000):
+        """
+        Attendance for a date range from archive files and hr_attendance alike, in date order.
+        Archived rows get the same related objects a select_related queryset would give.
+        With fields, yield tuples of those Attendance attnames instead of instances.
+        """
+        archived = sorted(
+            year for year in AttendanceArchiveService.archived_years()
+            if start_date.year <= year <= end_date.year
+        )
+        for year in archived:
+            for chunk in chunked(AttendanceArchiveService.read(year, start_date, end_date, employee_ids), batch_size):
+                if fields is not None:
+                    yield from (tuple(getattr(row, field) for field in fields) for row in chunk)
+                    continue
+                if related:
+                    prefetch_related_objects(chunk, *related)
+                yield from chunk
+
+        hot = Attendance.objects.filter(date__range=[start_date, end_date]).order_by('date', 'employee_id')
+        if employee_ids is not None:
+            hot = hot.filter(employee_id__in=employee_ids)
+        if fields is not None:
+            yield from hot.values_list(*fields).iterator(chunk_size=batch_size)
+            return
+        if related:
+            hot = hot.select_related(*related)
+        yield from hot.iterator(chunk_size=batch_size)
+
+    @staticmethod
+    def restore(year, batch_size=1000):
+        """
+        Load an archived year back into hr_attendance with its original ids and timestamps
+        """
+        entry = AttendanceArchive.objects.get(year=year, status='archived')
+        if _checksum(entry.path) != entry.checksum:
+            raise ValueError(f"Archive {entry.path} does not match its manifest checksum")
+
+        restored = 0
+        with transaction.atomic():
+            for chunk in chunked(AttendanceArchiveService.read(year), batch_size):
+                # Employee-days recorded again since the archive was taken keep their hot row
+                existing = set(Attendance.objects.filter(
+                    employee_id__in={row.employee_id for row in chunk},
+                    date__range=[chunk[0].date, chunk[-1].date],
+                ).values_list('employee_id', 'date'))
+                missing = [row for row in chunk if (row.employee_id, row.date) not in existing]
+                if not missing:
+                    continue
+                stamps = [(row.created_at, row.updated_at) for row in missing]
+                Attendance.objects.bulk_create(missing)
+                # bulk_create stamps auto_now fields; put the archived timestamps back
+                for row, (created_at, updated_at) in zip(missing, stamps):
+                    row.created_at, row.updated_at = created_at, updated_at
+                Attendance.objects.bulk_update(missing, ['created_at', 'updated_at'])
+                restored += len(missing)
+            entry.status = 'restored'
+            entry.restored_at = timezone.now()
+            entry.save(update_fields=['status', 'restored_at'])
+            AttendanceCalendarService.invalidate(date(year, month, 1) for month in range(1, 13))
+
+        logger.info(f"Restored {restored} attendance rows for {year} from {entry.path}")
+        return restored
@@ -0,0 +1,149 @@
+"""
+Batch attendance computation and persistence with preloaded employee schedules
+"""
+from django.db import transaction
+from django.utils import timezone
+from datetime import datetime, timedelta
+from decimal import Decimal
+import logging
+
+from .models import Employee, Attendance
+from .attendance_calendar import AttendanceCalendarService
+from .attendance_totals import AttendanceTotalsService
+from .payroll_calculator import hours_per_day
+from .payroll_recalculation import PayrollRecalculationService
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal('0.01')
+LATE_GRACE = timedelta(minutes=15)
+COMPUTED_FIELDS = ['work_hours', 'overtime_hours', 'is_late']
+
+
+def work_hours(check_in_time, check_out_time, break_hours, work_start_time, work_end_time):
+    """
+    (work_hours, overtime_hours) for a day, capped at the scheduled hours
+    """
+    if not (check_in_time and check_out_time):
+        return Decimal('0'), Decimal('0')
+    # Breaks between the first and last punch are not paid time
+    hours = max(0, (check_out_time - check_in_time).total_seconds() / 3600 - float(break_hours or 0))
+    max_hours = hours_per_day(work_start_time, work_end_time)
+    # Round to the field precision so stored values sum exactly
+    return (
+        Decimal(str(min(hours, max_hours))).quantize(CENT),
+        Decimal(str(max(0, hours - max_hours))).quantize(CENT),
+    )
+
+
+def is_late(check_in_time, day, work_start_time):
+    """Checked in after the start of the working day plus a 15 minute grace period"""
+    if not check_in_time:
+        return False
+    return check_in_time > timezone.make_aware(datetime.combine(day, work_start_time)) + LATE_GRACE
+
+
+class AttendanceBulkService:
+    """
+    Compute and persist many Attendance rows without touching row.employee
+    """
+
+    @staticmethod
+    def load_schedules(employee_ids):
+        """
+        (work_start_time, work_end_time) per employee, in one query
+        """
+        return {
+            employee_id: (work_start_time, work_end_time)
+            for employee_id, work_start_time, work_end_time in Employee.objects.filter(
+                id__in=set(employee_ids)
+            ).values_list('id', 'work_start_time', 'work_end_time')
+        }
+
+    @staticmethod
+    def compute(rows, schedules=None):
+        """
+        Set work hours, overtime and lateness on unsaved or loaded rows in one pass
+        """
+        if schedules is None:
+            schedules = AttendanceBulkService.load_schedules(row.employee_id for row in rows)
+        for row in rows:
+            work_start_time, work_end_time = schedules[row.employee_id]
+            row.work_hours, row.overtime_hours = work_hours(
+                row.check_in_time, row.check_out_time, row.break_hours, work_start_time, work_end_time
+            )
+            row.is_late = is_late(row.check_in_time, row.date, work_start_time)
+        return rows
+
+    @staticmethod
+    def _sync(rows, previous=None):
+        """
+        Bring accumulators, cached calendars and the payroll change log in step with rows written in bulk.
+        previous maps (employee_id, date) to stored (work_hours, overtime_hours); without
+        it every row counts as changed.
+        """
+        pairs = {(row.employee_id, row.date) for row in rows}
+        AttendanceTotalsService.refresh(pairs)
+        AttendanceCalendarService.invalidate(day for _, day in pairs)
+        PayrollRecalculationService.record_changes([
+            (row.employee_id, row.date) for row in rows
+            if previous is None or previous.get((row.employee_id, row.date)) != (row.work_hours, row.overtime_hours)
+        ])
+
+    @staticmethod
+    def create(rows, batch_size=1000, ignore_conflicts=False, schedules=None):
+        """
+        Compute and insert new rows. With ignore_conflicts, existing (employee, date) rows are kept.
+        """
+        rows = AttendanceBulkService.compute(list(rows), schedules)
+        with transaction.atomic():
+            Attendance.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=ignore_conflicts)
+            AttendanceBulkService._sync(rows)
+        return len(rows)
+
+    @staticmethod
+    def update(rows, fields, batch_size=1000, schedules=None):
+        """
+        Recompute and save changed fields of loaded rows
+        """
+        rows = list(rows)
+        previous = {(row.employee_id, row.date): (row.work_hours, row.overtime_hours) for row in rows}
+        AttendanceBulkService.compute(rows, schedules)
+        now = timezone.now()
+        for row in rows:
+            row.updated_at = now
+        fields = list(dict.fromkeys([*fields, *COMPUTED_FIELDS, 'updated_at']))
+        with transaction.atomic():
+            Attendance.objects.bulk_update(rows, fields, batch_size=batch_size)
+            AttendanceBulkService._sync(rows, previous)
+        return len(rows)
+
+    @staticmethod
+    def upsert(rows, fields, batch_size=1000, schedules=None):
+        """
+        Compute and insert rows, overwriting fields of any existing (employee, date) row
+        """
+        rows = AttendanceBulkService.compute(list(rows), schedules)
+        if not rows:
+            return 0
+        employee_ids = {row.employee_id for row in rows}
+        days = [row.date for row in rows]
+        pairs = {(row.employee_id, row.date) for row in rows}
+        fields = list(dict.fromkeys([*fields, *COMPUTED_FIELDS, 'updated_at']))
+        with transaction.atomic():
+            previous = {
+                (employee_id, day): (stored_hours, stored_overtime)
+                for employee_id, day, stored_hours, stored_overtime in Attendance.objects.filter(
+                    employee_id__in=employee_ids, date__range=[min(days), max(days)],
+                ).values_list('employee_id', 'date', 'work_hours', 'overtime_hours')
+                if (employee_id, day) in pairs
+            }
+            Attendance.objects.bulk_create(
+                rows,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['employee', 'date'],
+                update_fields=fields,
+            )
+            AttendanceBulkService._sync(rows, previous)
+        return len(rows)
@@ -0,0 +1,206 @@
+"""
+Aggregated attendance calendar with per-day detail loaded on demand
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, Q
+from array import array
+from calendar import monthcalendar, monthrange
+from datetime import date
+import logging
+import uuid
+
+from .models import Attendance
+
+logger = logging.getLogger(__name__)
+
+# Bump when MonthGrid's layout changes so stale cached grids are ignored
+GRID_VERSION = 1
+
+RECORD_FIELDS = (
+    'date', 'employee__employee_id', 'employee__user__first_name', 'employee__user__last_name',
+    'check_in_time', 'check_out_time', 'work_hours', 'overtime_hours', 'is_late', 'is_absent',
+)
+
+
+def describe_record(row):
+    """Calendar entry for an attendance row selected with RECORD_FIELDS"""
+    return {
+        'employee_name': f"{row['employee__user__first_name']} {row['employee__user__last_name']}".strip(),
+        'employee_id': row['employee__employee_id'],
+        'check_in': row['check_in_time'].strftime('%H:%M') if row['check_in_time'] else 'N/A',
+        'check_out': row['check_out_time'].strftime('%H:%M') if row['check_out_time'] else 'N/A',
+        'work_hours': float(row['work_hours']),
+        'overtime_hours': float(row['overtime_hours']),
+        'is_late': row['is_late'],
+        'is_absent': row['is_absent'],
+        'status': 'absent' if row['is_absent'] else ('late' if row['is_late'] else 'present'),
+    }
+
+
+def _archive():
+    """AttendanceArchiveService, imported late as attendance_archive imports this module"""
+    from .attendance_archive import AttendanceArchiveService
+    
+    return AttendanceArchiveService
+
+
+def _archived_record(attendance):
+    """RECORD_FIELDS values of an archived Attendance read with its employee and user"""
+    user = attendance.employee.user
+    return {
+        'date': attendance.date,
+        'employee__employee_id': attendance.employee.employee_id,
+        'employee__user__first_name': user.first_name,
+        'employee__user__last_name': user.last_name,
+        **{field: getattr(attendance, field) for field in RECORD_FIELDS if '__' not in field and field != 'date'},
+    }
+
+
+class MonthGrid:
+    """
+    Per-day status counts for one month, stored as one flat unsigned int array
+    with a row of STATUSES counts per day
+    """
+    STATUSES = ('total', 'present', 'late', 'absent')
+
+    def __init__(self, year, month, counts=None):
+        self.year = year
+        self.month = month
+        self.days = monthrange(year, month)[1]
+        width = len(self.STATUSES)
+        self.counts = counts if counts is not None else array('I', bytes(4 * width * self.days))
+
+    def set_day(self, day, **counts):
+        offset = (day - 1) * len(self.STATUSES)
+        for index, status in enumerate(self.STATUSES):
+            self.counts[offset + index] = counts.get(status, 0)
+
+    def day(self, day):
+        offset = (day - 1) * len(self.STATUSES)
+        return dict(zip(self.STATUSES, self.counts[offset:offset + len(self.STATUSES)]))
+
+    def totals(self):
+        width = len(self.STATUSES)
+        return {status: sum(self.counts[index::width]) for index, status in enumerate(self.STATUSES)}
+
+    def as_dict(self):
+        """{day: counts} for days with at least one record"""
+        return {day: counts for day in range(1, self.days + 1) if (counts := self.day(day))['total']}
+
+    def weeks(self):
+        """Monday-first weeks of {'day', 'date', **counts} cells, None outside the month"""
+        return [
+            [{'day': day, 'date': date(self.year, self.month, day), **self.day(day)} if day else None for day in week]
+            for week in monthcalendar(self.year, self.month)
+        ]
+
+
+class AttendanceCalendarService:
+    """
+    Build month grids in one grouped query and page through a day's records on demand
+    """
+
+    @staticmethod
+    def month_bounds(year, month):
+        return date(year, month, 1), date(year, month, monthrange(year, month)[1])
+
+    @staticmethod
+    def _generation_key(year, month):
+        return f"attendance_calendar:generation:{year}-{month:02d}"
+
+    @staticmethod
+    def _cache_key(year, month, employee_id):
+        # Every grid of a month carries the month's generation, so one write retires them all
+        generation_key = AttendanceCalendarService._generation_key(year, month)
+        generation = cache.get(generation_key)
+        if generation is None:
+            cache.add(generation_key, uuid.uuid4().hex, None)
+            generation = cache.get(generation_key)
+        return f"attendance_calendar:v{GRID_VERSION}:{year}-{month:02d}:{generation}:{employee_id or 'all'}"
+
+    @staticmethod
+    def invalidate(days):
+        """
+        Retire the cached grids of every month containing one of the given dates,
+        for all employee filters, once the current transaction commits
+        """
+        keys = {AttendanceCalendarService._generation_key(day.year, day.month) for day in days}
+        if keys:
+            transaction.on_commit(lambda: cache.set_many({key: uuid.uuid4().hex for key in keys}, None))
+
+    @staticmethod
+    def build_grid(year, month, employee_id=None):
+        """
+        Count records per day and status with a single GROUP BY date query
+        """
+        start_date, end_date = AttendanceCalendarService.month_bounds(year, month)
+        grid = MonthGrid(year, month)
+        if year in _archive().archived_years():
+            # The month's rows live in the year's archive file
+            days = {}
+            for day, is_late, is_absent in _archive().history(
+                start_date, end_date, [employee_id] if employee_id else None, fields=('date', 'is_late', 'is_absent')
+            ):
+                counts = days.setdefault(day.day, dict.fromkeys(MonthGrid.STATUSES, 0))
+                counts['total'] += 1
+                counts['present'] += not is_absent
+                counts['late'] += is_late
+                counts['absent'] += is_absent
+            for day, counts in days.items():
+                grid.set_day(day, **counts)
+            return grid
+
+        attendances = Attendance.objects.filter(date__range=[start_date, end_date])
+        if employee_id:
+            attendances = attendances.filter(employee_id=employee_id)
+        for row in attendances.order_by().values('date').annotate(
+            total=Count('id'),
+            present=Count('id', filter=Q(is_absent=False)),
+            late=Count('id', filter=Q(is_late=True)),
+            absent=Count('id', filter=Q(is_absent=True)),
+        ):
+            grid.set_day(row.pop('date').day, **row)
+        return grid
+
+    @staticmethod
+    def month_grid(year, month, employee_id=None):
+        """
+        Cached MonthGrid for a month and optional employee filter. Entries live for
+        ATTENDANCE_CALENDAR_CACHE_TTL seconds or until an attendance write in the month.
+        """
+        key = AttendanceCalendarService._cache_key(year, month, employee_id)
+        counts = cache.get(key)
+        if counts is not None:
+            return MonthGrid(year, month, counts)
+        grid = AttendanceCalendarService.build_grid(year, month, employee_id)
+        cache.set(key, grid.counts, getattr(settings, 'ATTENDANCE_CALENDAR_CACHE_TTL', 300))
+        return grid
+
+    @staticmethod
+    def day_detail(day, employee_id=None, page=1, page_size=50):
+        """
+        One page of a day's attendance records as plain dicts, ordered by employee
+        """
+        if day.year in _archive().archived_years():
+            rows = sorted(
+                (_archived_record(attendance) for attendance in _archive().history(
+                    day, day, [employee_id] if employee_id else None
+                )),
+                key=lambda row: row['employee__employee_id'],
+            )
+        else:
+            attendances = Attendance.objects.filter(date=day)
+            if employee_id:
+                attendances = attendances.filter(employee_id=employee_id)
+            rows = attendances.order_by('employee__employee_id').values(*RECORD_FIELDS)
+        page = Paginator(rows, page_size).get_page(page)
+        return {
+            'date': day.isoformat(),
+            'page': page.number,
+            'num_pages': page.paginator.num_pages,
+            'count': page.paginator.count,
+            'results': [describe_record(row) for row in page.object_list],
+        }
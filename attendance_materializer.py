@@ -0,0 +1,108 @@
+"""
+Derive Attendance rows from the append-only raw punch log
+"""
+from django.utils import timezone
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+import logging
+
+from .models import Attendance, RawPunch
+from .attendance_bulk import AttendanceBulkService
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal('0.01')
+DERIVED_FIELDS = ['check_in_time', 'check_out_time', 'break_hours', 'is_absent']
+
+
+def derive_attendance(employee_id, day, punches):
+    """
+    Build an unsaved Attendance row from one employee-day of sorted, distinct punches.
+    The first punch is the check-in and the last the check-out; punches in between
+    alternate out/in, and each out-to-in gap is a break.
+    """
+    break_seconds = sum(
+        (punches[i + 1] - punches[i]).total_seconds() for i in range(1, len(punches) - 1, 2)
+    )
+    return Attendance(
+        employee_id=employee_id,
+        date=day,
+        check_in_time=punches[0],
+        check_out_time=punches[-1] if len(punches) > 1 else None,
+        break_hours=Decimal(str(break_seconds / 3600)).quantize(CENT),
+        is_absent=False,
+    )
+
+
+def _day_bounds(start_date, end_date):
+    """Aware datetimes covering whole local days from start_date to end_date"""
+    return (
+        timezone.make_aware(datetime.combine(start_date, time.min)),
+        timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min)),
+    )
+
+
+def _group_punches(queryset, pairs=None):
+    """(employee_id, local date) -> distinct punch times, optionally limited to some pairs"""
+    punches = {}
+    for employee_id, punched_at in queryset.values_list('employee_id', 'punched_at'):
+        key = (employee_id, timezone.localtime(punched_at).date())
+        if pairs is None or key in pairs:
+            punches.setdefault(key, set()).add(punched_at)
+    return punches
+
+
+class AttendanceMaterializer:
+    """
+    Re-derive Attendance from RawPunch for any set of employee-days. Derivation
+    always starts from the full punch log, so running it twice changes nothing.
+    """
+
+    @staticmethod
+    def materialize(pairs, batch_size=1000):
+        """
+        Re-derive the given (employee_id, date) pairs; days without punches are left alone
+        """
+        pairs = set(pairs)
+        if not pairs:
+            return 0
+        days = [day for _, day in pairs]
+        start, end = _day_bounds(min(days), max(days))
+        punches = _group_punches(
+            RawPunch.objects.filter(
+                punched_at__gte=start, punched_at__lt=end,
+                employee_id__in={employee_id for employee_id, _ in pairs},
+            ),
+            pairs,
+        )
+        return AttendanceMaterializer.write(punches, batch_size)
+
+    @staticmethod
+    def write(punches, batch_size=1000):
+        """
+        Upsert Attendance rows for grouped punches and keep the derived tables in step
+        """
+        rows = [
+            derive_attendance(employee_id, day, sorted(times))
+            for (employee_id, day), times in punches.items()
+        ]
+        # Hours, overtime and lateness are computed in bulk from preloaded schedules
+        return AttendanceBulkService.upsert(rows, DERIVED_FIELDS, batch_size=batch_size)
+
+    @staticmethod
+    def rederive(start_date, end_date, employee_ids=None, chunk_days=7):
+        """
+        Re-derive every employee-day with punches in the range, a few days at a time
+        """
+        derived = 0
+        chunk_start = start_date
+        while chunk_start <= end_date:
+            chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+            start, end = _day_bounds(chunk_start, chunk_end)
+            punches = RawPunch.objects.filter(punched_at__gte=start, punched_at__lt=end)
+            if employee_ids is not None:
+                punches = punches.filter(employee_id__in=employee_ids)
+            derived += AttendanceMaterializer.write(_group_punches(punches))
+            chunk_start = chunk_end + timedelta(days=1)
+        logger.info(f"Re-derived {derived} attendance rows from raw punches for {start_date} to {end_date}")
+        return derived
@@ -0,0 +1,410 @@
+"""
+Incremental per-pay-period and monthly attendance accumulators
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from datetime import date, timedelta
+from decimal import Decimal
+import logging
+
+from .models import Attendance, AttendancePeriodTotal, AttendanceMonthTotal
+
+logger = logging.getLogger(__name__)
+
+TOTAL_FIELDS = ('days_recorded', 'present_days', 'late_days', 'absent_days', 'total_hours', 'overtime_hours')
+HOUR_FIELDS = ('total_hours', 'overtime_hours')
+CENT = Decimal('0.01')
+UNIQUE_FIELDS = {
+    AttendancePeriodTotal: ('period_start',),
+    AttendanceMonthTotal: ('year', 'month'),
+}
+
+
+def pay_period_length():
+    return getattr(settings, 'PAYROLL_PERIOD_DAYS', 14)
+
+
+def pay_period_anchor():
+    anchor = getattr(settings, 'PAYROLL_PERIOD_ANCHOR', '2025-01-06')
+    return date.fromisoformat(anchor) if isinstance(anchor, str) else anchor
+
+
+def pay_period_bounds(day):
+    """
+    First and last day of the accumulator pay period containing a date
+    """
+    length = pay_period_length()
+    anchor = pay_period_anchor()
+    start = anchor + timedelta(days=((day - anchor).days // length) * length)
+    return start, start + timedelta(days=length - 1)
+
+
+def pay_periods_between(start_date, end_date):
+    """
+    Every pay period overlapping the date range, in order
+    """
+    periods = []
+    period_start, period_end = pay_period_bounds(start_date)
+    while period_start <= end_date:
+        periods.append((period_start, period_end))
+        period_start, period_end = pay_period_bounds(period_end + timedelta(days=1))
+    return periods
+
+
+def month_bounds(year, month):
+    """
+    First and last day of a calendar month
+    """
+    first = date(year, month, 1)
+    return first, (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+def months_between(start_date, end_date):
+    """
+    Every (year, month) overlapping the date range, in order
+    """
+    months = []
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def _period_bucket(period_start, period_end):
+    return AttendancePeriodTotal, (('period_start', period_start), ('period_end', period_end)), period_start, period_end
+
+
+def _month_bucket(year, month):
+    return AttendanceMonthTotal, (('year', year), ('month', month)), *month_bounds(year, month)
+
+
+def accumulator_buckets(day):
+    """
+    (model, key fields, first day, last day) of every accumulator bucket a date feeds
+    """
+    return _period_bucket(*pay_period_bounds(day)), _month_bucket(day.year, day.month)
+
+
+def accumulator_buckets_between(start_date, end_date):
+    """
+    Every accumulator bucket overlapping the date range: pay periods first, then months
+    """
+    return [
+        *(_period_bucket(*period) for period in pay_periods_between(start_date, end_date)),
+        *(_month_bucket(*month) for month in months_between(start_date, end_date)),
+    ]
+
+
+def _archived_years():
+    from .attendance_archive import AttendanceArchiveService
+    
+    return AttendanceArchiveService.archived_years()
+
+
+def _live_buckets(buckets, archived):
+    """
+    Drop buckets whose days all lie in archived years: their rows are no longer in
+    hr_attendance, so the stored totals are the only record left. A bucket straddling
+    into an archived year, like a Dec/Jan pay period, is kept and recomputed.
+    """
+    return [
+        bucket for bucket in buckets
+        if bucket[2].year not in archived or bucket[3].year not in archived
+    ]
+
+
+def bucket_lookup(model, key_fields):
+    """Filter kwargs selecting one bucket of every employee"""
+    return {field: value for field, value in key_fields if field in UNIQUE_FIELDS[model]}
+
+
+def _hours(value):
+    if value is None:
+        return Decimal('0')
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return value.quantize(CENT)
+
+
+def _employee_filter(employees):
+    """Accept an Employee queryset or an iterable of employee ids"""
+    if hasattr(employees, 'values'):
+        return employees.values('id')
+    return list(employees)
+
+
+def _aggregate(queryset):
+    return queryset.values('employee_id').annotate(
+        days_recorded=Count('id'),
+        present_days=Count('id', filter=Q(check_in_time__isnull=False)),
+        late_days=Count('id', filter=Q(is_late=True)),
+        absent_days=Count('id', filter=Q(is_absent=True)),
+        total_hours=Sum('work_hours'),
+        overtime_hours=Sum('overtime_hours'),
+    ).order_by()
+
+
+def _range_rows(start_date, end_date, employee_ids=None, archived=frozenset()):
+    """
+    Per-employee totals rows shaped like _aggregate's for a date range. A range reaching
+    into an archived year is summed over AttendanceArchiveService.history, so the rows
+    in the archive file count alongside the hot ones.
+    """
+    if not any(start_date.year <= year <= end_date.year for year in archived):
+        attendances = Attendance.objects.filter(date__range=[start_date, end_date])
+        if employee_ids is not None:
+            attendances = attendances.filter(employee_id__in=employee_ids)
+        return _aggregate(attendances)
+
+    from .attendance_archive import AttendanceArchiveService
+    
+    if hasattr(employee_ids, 'values_list'):
+        employee_ids = employee_ids.values_list('id', flat=True)
+    totals = {}
+    for attendance in AttendanceArchiveService.history(start_date, end_date, employee_ids, related=()):
+        employee_id, _, values = AttendanceTotalsService.contribution(attendance)
+        _add_totals(totals.setdefault(employee_id, _empty_totals()), values)
+    return [{'employee_id': employee_id, **values} for employee_id, values in totals.items()]
+
+
+def _empty_totals():
+    return {field: (Decimal('0') if field in HOUR_FIELDS else 0) for field in TOTAL_FIELDS}
+
+
+def _add_totals(target, row):
+    for field in TOTAL_FIELDS:
+        value = row[field] or 0
+        target[field] += _hours(value) if field in HOUR_FIELDS else value
+
+
+class AttendanceTotalsService:
+    """
+    Service keeping AttendancePeriodTotal and AttendanceMonthTotal in step with Attendance writes
+    """
+
+    @staticmethod
+    def contribution(attendance):
+        """
+        What a single attendance row adds to its pay period and month buckets
+        """
+        day = attendance.date
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        return (
+            attendance.employee_id,
+            day,
+            {
+                'days_recorded': 1,
+                'present_days': 1 if attendance.check_in_time else 0,
+                'late_days': 1 if attendance.is_late else 0,
+                'absent_days': 1 if attendance.is_absent else 0,
+                'total_hours': _hours(attendance.work_hours),
+                'overtime_hours': _hours(attendance.overtime_hours),
+            },
+        )
+
+    @staticmethod
+    def previous_contribution(attendance):
+        """
+        Contribution of the row as currently stored, or None for a new row
+        """
+        if attendance._state.adding or attendance.pk is None:
+            return None
+        if hasattr(attendance, '_totals_snapshot'):
+            return attendance._totals_snapshot
+        stored = Attendance.objects.filter(pk=attendance.pk).only(*Attendance.TOTALS_FIELDS).first()
+        return AttendanceTotalsService.contribution(stored) if stored else None
+
+    @staticmethod
+    def apply_change(old, new):
+        """
+        Apply the difference between two contributions to the accumulators
+        """
+        deltas = {}
+        for contribution, sign in ((old, -1), (new, 1)):
+            if contribution is None:
+                continue
+            employee_id, day, values = contribution
+            for model, key_fields, _, _ in accumulator_buckets(day):
+                bucket = deltas.setdefault((model, employee_id, key_fields), _empty_totals())
+                for field in TOTAL_FIELDS:
+                    bucket[field] += sign * values[field]
+
+        for (model, employee_id, key_fields), bucket in deltas.items():
+            changes = {field: F(field) + value for field, value in bucket.items() if value}
+            if not changes:
+                continue
+            existing = model.objects.filter(employee_id=employee_id, **bucket_lookup(model, key_fields))
+            if not existing.update(**changes):
+                model.objects.bulk_create([
+                    model(employee_id=employee_id, **dict(key_fields))
+                ], ignore_conflicts=True)
+                existing.update(**changes)
+
+    @staticmethod
+    def refresh(pairs, chunk_size=500):
+        """
+        Recompute the buckets touched by (employee_id, date) pairs from raw Attendance.
+        Used by bulk write paths that bypass Attendance.save.
+        """
+        archived = _archived_years()
+        by_bucket = {}
+        for employee_id, day in pairs:
+            # Archived days have no hot rows to refresh from; their buckets keep the stored totals
+            if day.year in archived:
+                continue
+            for bucket in accumulator_buckets(day):
+                by_bucket.setdefault(bucket, set()).add(employee_id)
+
+        refreshed = 0
+        for (model, key_fields, first_day, last_day), employee_ids in by_bucket.items():
+            employee_ids = sorted(employee_ids)
+            for offset in range(0, len(employee_ids), chunk_size):
+                chunk = employee_ids[offset:offset + chunk_size]
+                rows = _range_rows(first_day, last_day, chunk, archived)
+                totals = {employee_id: _empty_totals() for employee_id in chunk}
+                for row in rows:
+                    _add_totals(totals[row['employee_id']], row)
+                model.objects.bulk_create(
+                    [
+                        model(employee_id=employee_id, **dict(key_fields), **values)
+                        for employee_id, values in totals.items()
+                    ],
+                    update_conflicts=True,
+                    unique_fields=['employee', *UNIQUE_FIELDS[model]],
+                    update_fields=list(TOTAL_FIELDS),
+                )
+                refreshed += len(chunk)
+        return refreshed
+
+    @staticmethod
+    def _range_or_all(start_date, end_date):
+        if start_date is None or end_date is None:
+            bounds = Attendance.objects.aggregate(first=Min('date'), last=Max('date'))
+            start_date = start_date or bounds['first']
+            end_date = end_date or bounds['last']
+        return start_date, end_date
+
+    @staticmethod
+    def rebuild(start_date=None, end_date=None, batch_size=1000):
+        """
+        Recompute every accumulator overlapping the range from raw Attendance
+        """
+        start_date, end_date = AttendanceTotalsService._range_or_all(start_date, end_date)
+        if start_date is None:
+            return 0
+
+        archived = _archived_years()
+        rebuilt = 0
+        for model, key_fields, first_day, last_day in _live_buckets(
+            accumulator_buckets_between(start_date, end_date), archived
+        ):
+            rows = _range_rows(first_day, last_day, archived=archived)
+            buckets = []
+            for row in rows:
+                values = _empty_totals()
+                _add_totals(values, row)
+                buckets.append(model(employee_id=row['employee_id'], **dict(key_fields), **values))
+            with transaction.atomic():
+                model.objects.filter(**bucket_lookup(model, key_fields)).delete()
+                model.objects.bulk_create(buckets, batch_size=batch_size)
+            rebuilt += len(buckets)
+        logger.info(f"Rebuilt {rebuilt} attendance totals from {start_date} to {end_date}")
+        return rebuilt
+
+    @staticmethod
+    def check(start_date=None, end_date=None):
+        """
+        Compare accumulators with raw Attendance and return a list of mismatches
+        """
+        start_date, end_date = AttendanceTotalsService._range_or_all(start_date, end_date)
+        if start_date is None:
+            return []
+
+        archived = _archived_years()
+        mismatches = []
+        for model, key_fields, first_day, last_day in _live_buckets(
+            accumulator_buckets_between(start_date, end_date), archived
+        ):
+            expected = {}
+            for row in _range_rows(first_day, last_day, archived=archived):
+                expected[row['employee_id']] = _empty_totals()
+                _add_totals(expected[row['employee_id']], row)
+
+            stored = {
+                row['employee_id']: row
+                for row in model.objects.filter(**bucket_lookup(model, key_fields)).values(
+                    'employee_id', *TOTAL_FIELDS
+                )
+            }
+            for employee_id in set(expected) | set(stored):
+                want = expected.get(employee_id, _empty_totals())
+                have = stored.get(employee_id) or _empty_totals()
+                for field in TOTAL_FIELDS:
+                    if want[field] != (have[field] or 0):
+                        mismatches.append({
+                            'employee_id': employee_id,
+                            'total': model._meta.verbose_name,
+                            'period_start': first_day,
+                            'field': field,
+                            'expected': want[field],
+                            'stored': have[field],
+                        })
+        return mismatches
+
+    @staticmethod
+    def totals(employees, start_date, end_date):
+        """
+        Attendance totals per employee for a date range. Whole pay periods are read
+        from the accumulators; only the partial periods at the edges scan Attendance.
+        """
+        employee_filter = _employee_filter(employees)
+        periods = pay_periods_between(start_date, end_date)
+        full = [(s, e) for s, e in periods if s >= start_date and e <= end_date]
+
+        results = {}
+
+        def add(rows):
+            for row in rows:
+                _add_totals(results.setdefault(row['employee_id'], _empty_totals()), row)
+
+        if full:
+            add(AttendancePeriodTotal.objects.filter(
+                employee_id__in=employee_filter,
+                period_start__gte=full[0][0],
+                period_end__lte=full[-1][1],
+            ).values('employee_id').annotate(
+                **{field: Sum(field) for field in TOTAL_FIELDS}
+            ).order_by())
+
+            archived = _archived_years()
+            if start_date < full[0][0]:
+                add(_range_rows(start_date, full[0][0] - timedelta(days=1), employee_filter, archived))
+            if end_date > full[-1][1]:
+                add(_range_rows(full[-1][1] + timedelta(days=1), end_date, employee_filter, archived))
+        else:
+            add(_range_rows(start_date, end_date, employee_filter, _archived_years()))
+
+        return results
+
+    @staticmethod
+    def month_totals(employees, months=None):
+        """
+        Attendance totals per employee read from the monthly rollup, over the given
+        (year, month) pairs or the whole history
+        """
+        rollups = AttendanceMonthTotal.objects.filter(employee_id__in=_employee_filter(employees))
+        if months is not None:
+            selected = Q(pk__in=[])
+            for year, month in months:
+                selected |= Q(year=year, month=month)
+            rollups = rollups.filter(selected)
+
+        results = {}
+        for row in rollups.values('employee_id').annotate(
+            **{field: Sum(field) for field in TOTAL_FIELDS}
+        ).order_by():
+            _add_totals(results.setdefault(row['employee_id'], _empty_totals()), row)
+        return results
@@ -0,0 +1,49 @@
+"""
+Management command to deliver queued notification emails
+"""
+from django.core.management.base import BaseCommand
+import time
+
+from hr.notification_outbox import EmailOutboxService
+
+
+class Command(BaseCommand):
+    help = 'Send pending notification emails in batches over one mail connection per batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Emails claimed and sent per connection (default NOTIFICATION_EMAIL_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=None,
+            help='Stop after this many batches',
+        )
+        parser.add_argument(
+            '--poll',
+            type=int,
+            default=0,
+            help='Keep running and check the outbox every N seconds',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            totals = EmailOutboxService.drain(options['batch_size'], options['max_batches'])
+            if totals['claimed']:
+                style = self.style.SUCCESS if not totals['failed'] else self.style.WARNING
+                self.stdout.write(style(
+                    f"Sent {totals['sent']} of {totals['claimed']} emails in {totals['batches']} batches "
+                    f"({totals['per_second']}/s), {totals['failed']} failed"
+                ))
+            if not options['poll']:
+                backlog = EmailOutboxService.backlog()
+                self.stdout.write(
+                    f"Outbox: {backlog['pending']} pending, {backlog['failed']} failed, "
+                    f"oldest pending {backlog['oldest_pending_seconds']}s"
+                )
+                break
+            time.sleep(options['poll'])
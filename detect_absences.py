@@ -0,0 +1,41 @@
+"""
+Management command to record absences for working days without attendance
+"""
+from django.core.management.base import BaseCommand, CommandError
+from datetime import date, timedelta
+
+from hr.absence_detection import AbsenceDetectionService
+
+
+class Command(BaseCommand):
+    help = 'Mark employees absent on working days with no attendance and no approved leave (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start-date',
+            type=str,
+            help='First day to check (YYYY-MM-DD), defaults to yesterday',
+        )
+        parser.add_argument(
+            '--end-date',
+            type=str,
+            help='Last day to check (YYYY-MM-DD), defaults to the start date',
+        )
+
+    def handle(self, *args, **options):
+        yesterday = date.today() - timedelta(days=1)
+        try:
+            start_date = date.fromisoformat(options['start_date']) if options.get('start_date') else yesterday
+            end_date = date.fromisoformat(options['end_date']) if options.get('end_date') else start_date
+        except ValueError:
+            raise CommandError('Dates must be YYYY-MM-DD.')
+        if end_date < start_date:
+            raise CommandError('--end-date must not be before --start-date.')
+        if end_date >= date.today():
+            raise CommandError('Only days that have ended can be checked for absences.')
+        
+        self.stdout.write(f'Detecting absences from {start_date} to {end_date}...')
+        
+        created = AbsenceDetectionService.detect(start_date, end_date)
+        
+        self.stdout.write(self.style.SUCCESS(f'Successfully recorded {created} absences!'))
@@ -0,0 +1,185 @@
+"""
+Background export jobs with progress tracking and reusable artifacts
+"""
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db.models import Count, Max
+from django.utils import timezone
+from datetime import date, timedelta
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from .models import (
+    User, Employee, Department, JobPosition, Attendance, AttendanceArchive,
+    LeaveRequest, Payroll, Document, ExportJob
+)
+from .exports import EXPORTS, export_source, iter_csv, gzip_chunks
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = 'exports'
+# Rows written between progress updates
+PROGRESS_EVERY = 5000
+
+
+def _stamp(queryset):
+    """(row count, latest updated_at) of a queryset, in one aggregate"""
+    stamp = queryset.order_by().aggregate(count=Count('pk'), latest=Max('updated_at'))
+    return stamp['count'], stamp['latest'].isoformat() if stamp['latest'] else None
+
+
+def data_version(kind, params):
+    """
+    Fingerprint of the data an export reads, and the number of rows it will write.
+    Any insert, update or delete in the exported tables changes the fingerprint.
+    """
+    users = _stamp(User.objects.all())
+    if kind == 'employees':
+        main = _stamp(Employee.objects.all())
+        return [main, users, _stamp(Department.objects.all()), _stamp(JobPosition.objects.all())], main[0]
+    if kind == 'attendance':
+        start_date, end_date = date.fromisoformat(params['start_date']), date.fromisoformat(params['end_date'])
+        main = _stamp(Attendance.objects.filter(date__range=[start_date, end_date]))
+        archives = list(AttendanceArchive.objects.filter(
+            year__range=[start_date.year, end_date.year], status='archived'
+        ).values_list('year', 'row_count', 'archived_at'))
+        # Archived years count whole; progress is capped at 100%
+        total = main[0] + sum(row_count for _, row_count, _ in archives)
+        return [main, users, _stamp(Employee.objects.all()), [(y, n, a.isoformat()) for y, n, a in archives]], total
+    if kind == 'payroll':
+        main = _stamp(Payroll.objects.filter(
+            pay_period_start__gte=params['start_date'], pay_period_end__lte=params['end_date']
+        ))
+        return [main, users, _stamp(Employee.objects.all())], main[0]
+    if kind == 'leave_requests':
+        main = _stamp(LeaveRequest.objects.all())
+        return [main, users, _stamp(Employee.objects.all())], main[0]
+    main = _stamp(Document.objects.all())
+    return [main, users, _stamp(Employee.objects.all())], main[0]
+
+
+def normalize_params(kind, start_date=None, end_date=None, gzip=False):
+    """
+    Canonical params for a job; raises ValueError for unknown kinds or bad dates
+    """
+    if kind not in EXPORTS:
+        raise ValueError(f"kind must be one of {', '.join(EXPORTS)}")
+    params = {'gzip': bool(gzip)}
+    if EXPORTS[kind][3]:
+        start_date = start_date or (date.today() - timedelta(days=30)).isoformat()
+        end_date = end_date or date.today().isoformat()
+        params['start_date'] = date.fromisoformat(str(start_date)).isoformat()
+        params['end_date'] = date.fromisoformat(str(end_date)).isoformat()
+    return params
+
+
+def job_key(kind, params, version):
+    payload = json.dumps([kind, params, version], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ExportJobService:
+    """
+    Enqueue, build and serve export jobs
+    """
+
+    @staticmethod
+    def request(kind, params, user=None):
+        """
+        Return (job, reused). A completed job for the same kind, params and data version
+        is reused as long as its file exists; a queued or running one is joined.
+        """
+        version, total = data_version(kind, params)
+        key = job_key(kind, params, version)
+        existing = ExportJob.objects.filter(cache_key=key).exclude(status='failed').order_by('-created_at').first()
+        if existing and (existing.status != 'completed' or default_storage.exists(existing.file_path)):
+            return existing, True
+        job = ExportJob.objects.create(
+            kind=kind, params=params, cache_key=key, total_rows=total, requested_by=user,
+        )
+        logger.info(f"Queued export #{job.id} {kind} {params} ({total} rows)")
+        return job, False
+
+    @staticmethod
+    def claim_next():
+        """
+        Atomically move the oldest queued job to running
+        """
+        for job_id in ExportJob.objects.filter(status='queued').order_by('created_at').values_list('id', flat=True)[:5]:
+            if ExportJob.objects.filter(id=job_id, status='queued').update(status='running', started_at=timezone.now()):
+                return ExportJob.objects.get(id=job_id)
+        return None
+
+    @staticmethod
+    def _counted(job, rows):
+        written = 0
+        for row in rows:
+            yield row
+            written += 1
+            if written % PROGRESS_EVERY == 0:
+                ExportJob.objects.filter(id=job.id).update(rows_written=written)
+        job.rows_written = written
+
+    @staticmethod
+    def run(job):
+        """
+        Write the job's CSV to a temporary file, then move it into storage
+        """
+        try:
+            filename, header, rows = export_source(job.kind, job.params)
+            chunks = iter_csv(header, ExportJobService._counted(job, rows))
+            if job.params.get('gzip'):
+                chunks = gzip_chunks(chunks)
+                filename = f'{filename}.gz'
+            with tempfile.TemporaryFile() as spool:
+                for chunk in chunks:
+                    spool.write(chunk)
+                job.file_size = spool.tell()
+                spool.seek(0)
+                job.file_path = default_storage.save(f'{EXPORT_DIR}/{job.cache_key}/{filename}', File(spool))
+            job.status = 'completed'
+        except Exception as e:
+            logger.error(f"Export #{job.id} failed: {str(e)}")
+            job.status = 'failed'
+            job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'rows_written', 'file_path', 'file_size', 'error', 'finished_at'])
+        return job
+
+    @staticmethod
+    def process_queued():
+        """
+        Build queued jobs until the queue is empty, yielding each finished job
+        """
+        while True:
+            job = ExportJobService.claim_next()
+            if job is None:
+                return
+            yield ExportJobService.run(job)
+
+    @staticmethod
+    def describe(job):
+        """
+        Progress payload for the status endpoint
+        """
+        if job.status == 'completed':
+            progress = 100.0
+        else:
+            progress = round(min(job.rows_written / job.total_rows * 100, 99.9), 1) if job.total_rows else 0.0
+        return {
+            'id': job.id,
+            'kind': job.kind,
+            'params': job.params,
+            'status': job.status,
+            'rows_written': job.rows_written,
+            'total_rows': job.total_rows,
+            'progress': progress,
+            'file_name': os.path.basename(job.file_path) if job.file_path else None,
+            'file_size': job.file_size,
+            'error': job.error,
+            'created_at': job.created_at.isoformat(),
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        }
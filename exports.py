@@ -0,0 +1,244 @@
+"""
+Streaming CSV exports built from values_list projections
+"""
+from django.http import StreamingHttpResponse
+from datetime import date
+import csv
+import zlib
+
+from .models import Employee, LeaveRequest, Payroll, Document
+from .attendance_archive import AttendanceArchiveService
+
+# Rows are fetched from the database in chunks of this size
+FETCH_SIZE = 2000
+# Encoded CSV is handed to the response in pieces of roughly this many bytes
+CHUNK_BYTES = 64 * 1024
+
+
+class _Echo:
+    """File-like object whose write() returns the line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def _full_name(first_name, last_name):
+    """Same result as User.get_full_name, from projected columns"""
+    return f"{first_name or ''} {last_name or ''}".strip()
+
+
+def _time(value, fmt):
+    return value.strftime(fmt) if value else ''
+
+
+def _yes_no(value):
+    return 'Yes' if value else 'No'
+
+
+def iter_csv(header, rows, encoding='utf-8'):
+    """
+    Yield the CSV as encoded chunks; the header goes out before any row is fetched
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header).encode(encoding)
+    buffer, size = [], 0
+    for row in rows:
+        line = writer.writerow(row)
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield ''.join(buffer).encode(encoding)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode(encoding)
+
+
+def gzip_chunks(chunks, level=6):
+    """
+    Compress a byte stream into gzip format on the fly
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def streaming_csv_response(request, filename, header, rows):
+    """
+    StreamingHttpResponse for a CSV export; ?gzip=1 sends a .csv.gz instead
+    """
+    chunks = iter_csv(header, rows)
+    if request.GET.get('gzip') in ('1', 'true', 'yes'):
+        response = StreamingHttpResponse(gzip_chunks(chunks), content_type='application/gzip')
+        filename = f'{filename}.gz'
+    else:
+        response = StreamingHttpResponse(chunks, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+EMPLOYEE_HEADER = [
+    'Employee ID', 'First Name', 'Last Name', 'Email', 'Phone', 'Department',
+    'Position', 'Manager', 'Employment Type', 'Status', 'Hire Date',
+    'Base Salary', 'Work Start Time', 'Work End Time', 'Vacation Days',
+    'Sick Days', 'Personal Days'
+]
+
+
+def employee_rows():
+    employment_types = dict(Employee.EMPLOYMENT_TYPE_CHOICES)
+    statuses = dict(Employee.STATUS_CHOICES)
+    for (employee_id, first_name, last_name, email, phone, department, position,
+         manager_first_name, manager_last_name, has_manager, employment_type, status, hire_date,
+         base_salary, work_start_time, work_end_time, vacation, sick, personal) in Employee.objects.order_by(
+            'employee_id'
+    ).values_list(
+        'employee_id', 'user__first_name', 'user__last_name', 'user__email', 'user__phone_number',
+        'department__name', 'position__title', 'manager__user__first_name', 'manager__user__last_name',
+        'manager_id', 'employment_type', 'status', 'hire_date', 'base_salary', 'work_start_time',
+        'work_end_time', 'vacation_days_remaining', 'sick_days_remaining', 'personal_days_remaining',
+    ).iterator(chunk_size=FETCH_SIZE):
+        yield [
+            employee_id, first_name, last_name, email, phone, department or '', position or '',
+            _full_name(manager_first_name, manager_last_name) if has_manager else '',
+            employment_types.get(employment_type, employment_type), statuses.get(status, status),
+            hire_date, base_salary, work_start_time, work_end_time, vacation, sick, personal,
+        ]
+
+
+ATTENDANCE_HEADER = [
+    'Employee ID', 'Employee Name', 'Date', 'Check In', 'Check Out',
+    'Work Hours', 'Overtime Hours', 'Is Late', 'Is Absent', 'Notes'
+]
+
+
+ATTENDANCE_FIELDS = (
+    'employee_id', 'date', 'check_in_time', 'check_out_time', 'work_hours', 'overtime_hours',
+    'is_late', 'is_absent', 'notes',
+)
+
+
+def _attendance_row(employee_id, name, day, check_in_time, check_out_time, work_hours, overtime_hours,
+                    is_late, is_absent, notes):
+    return [
+        employee_id, name, day, _time(check_in_time, '%H:%M'), _time(check_out_time, '%H:%M'),
+        work_hours, overtime_hours, _yes_no(is_late), _yes_no(is_absent), notes,
+    ]
+
+
+def attendance_rows(start_date, end_date):
+    """
+    Attendance rows for a date range, archived years included, via AttendanceArchiveService.history
+    """
+    employees = {
+        pk: (employee_id, _full_name(first_name, last_name))
+        for pk, employee_id, first_name, last_name in Employee.objects.values_list(
+            'id', 'employee_id', 'user__first_name', 'user__last_name'
+        ).iterator(chunk_size=FETCH_SIZE)
+    }
+    for pk, *values in AttendanceArchiveService.history(
+        start_date, end_date, fields=ATTENDANCE_FIELDS, batch_size=FETCH_SIZE
+    ):
+        yield _attendance_row(*employees.get(pk, ('', '')), *values)
+
+
+PAYROLL_HEADER = [
+    'Employee ID', 'Employee Name', 'Pay Period Start', 'Pay Period End',
+    'Base Salary', 'Hours Worked', 'Overtime Hours', 'Overtime Pay',
+    'Deductions', 'Bonuses', 'Net Salary', 'Status', 'Created By', 'Approved By'
+]
+
+
+def payroll_rows(start_date, end_date):
+    statuses = dict(Payroll.STATUS_CHOICES)
+    for (employee_id, first_name, last_name, period_start, period_end, base_salary, hours_worked,
+         overtime_hours, overtime_pay, deductions, bonuses, net_salary, status,
+         created_first_name, created_last_name, approved_first_name, approved_last_name) in Payroll.objects.filter(
+        pay_period_start__gte=start_date,
+        pay_period_end__lte=end_date
+    ).order_by('pay_period_start').values_list(
+        'employee__employee_id', 'employee__user__first_name', 'employee__user__last_name',
+        'pay_period_start', 'pay_period_end', 'base_salary', 'hours_worked', 'overtime_hours',
+        'overtime_pay', 'deductions', 'bonuses', 'net_salary', 'status',
+        'created_by__first_name', 'created_by__last_name', 'approved_by__first_name', 'approved_by__last_name',
+    ).iterator(chunk_size=FETCH_SIZE):
+        yield [
+            employee_id, _full_name(first_name, last_name), period_start, period_end, base_salary,
+            hours_worked, overtime_hours, overtime_pay, deductions, bonuses, net_salary,
+            statuses.get(status, status),
+            _full_name(created_first_name, created_last_name),
+            _full_name(approved_first_name, approved_last_name),
+        ]
+
+
+LEAVE_REQUEST_HEADER = [
+    'Employee ID', 'Employee Name', 'Leave Type', 'Start Date', 'End Date',
+    'Days Requested', 'Reason', 'Status', 'Approved By', 'Approved At',
+    'Rejection Reason'
+]
+
+
+def leave_request_rows():
+    leave_types = dict(LeaveRequest.LEAVE_TYPE_CHOICES)
+    statuses = dict(LeaveRequest.STATUS_CHOICES)
+    for (employee_id, first_name, last_name, leave_type, start_date, end_date, days_requested, reason,
+         status, approved_first_name, approved_last_name, approved_at, rejection_reason) in LeaveRequest.objects.order_by(
+        '-created_at'
+    ).values_list(
+        'employee__employee_id', 'employee__user__first_name', 'employee__user__last_name', 'leave_type',
+        'start_date', 'end_date', 'days_requested', 'reason', 'status',
+        'approved_by__first_name', 'approved_by__last_name', 'approved_at', 'rejection_reason',
+    ).iterator(chunk_size=FETCH_SIZE):
+        yield [
+            employee_id, _full_name(first_name, last_name), leave_types.get(leave_type, leave_type),
+            start_date, end_date, days_requested, reason, statuses.get(status, status),
+            _full_name(approved_first_name, approved_last_name), _time(approved_at, '%Y-%m-%d %H:%M'),
+            rejection_reason,
+        ]
+
+
+DOCUMENT_HEADER = [
+    'Employee ID', 'Employee Name', 'Document Type', 'Title', 'Description',
+    'Upload Date', 'Expiry Date', 'Is Verified', 'Verified By', 'Verified At'
+]
+
+
+def document_rows():
+    document_types = dict(Document.DOCUMENT_TYPE_CHOICES)
+    for (employee_id, first_name, last_name, document_type, title, description, created_at, expiry_date,
+         is_verified, verified_first_name, verified_last_name, verified_at) in Document.objects.order_by(
+        '-created_at'
+    ).values_list(
+        'employee__employee_id', 'employee__user__first_name', 'employee__user__last_name', 'document_type',
+        'title', 'description', 'created_at', 'expiry_date', 'is_verified',
+        'verified_by__first_name', 'verified_by__last_name', 'verified_at',
+    ).iterator(chunk_size=FETCH_SIZE):
+        yield [
+            employee_id, _full_name(first_name, last_name), document_types.get(document_type, document_type),
+            title, description, _time(created_at, '%Y-%m-%d'), _time(expiry_date, '%Y-%m-%d'),
+            _yes_no(is_verified), _full_name(verified_first_name, verified_last_name),
+            _time(verified_at, '%Y-%m-%d %H:%M'),
+        ]
+
+
+# kind -> (file name, header, row generator, takes a date range)
+EXPORTS = {
+    'employees': ('employees', EMPLOYEE_HEADER, employee_rows, False),
+    'attendance': ('attendance', ATTENDANCE_HEADER, attendance_rows, True),
+    'payroll': ('payroll', PAYROLL_HEADER, payroll_rows, True),
+    'leave_requests': ('leave_requests', LEAVE_REQUEST_HEADER, leave_request_rows, False),
+    'documents': ('documents', DOCUMENT_HEADER, document_rows, False),
+}
+
+
+def export_source(kind, params):
+    """
+    (filename, header, rows) for an export kind and its normalized params
+    """
+    name, header, rows, dated = EXPORTS[kind]
+    if dated:
+        start_date, end_date = date.fromisoformat(params['start_date']), date.fromisoformat(params['end_date'])
+        return f'{name}_{start_date}_to_{end_date}.csv', header, rows(start_date, end_date)
+    return f'{name}.csv', header, rows()
@@ -0,0 +1,91 @@
+"""
+Management command to import scanner punch export files
+"""
+from django.core.management.base import BaseCommand, CommandError
+import os
+import time
+
+from hr.punch_files import (
+    DEFAULT_FIXED_LAYOUT, chunked, iter_csv_punches, iter_fixed_punches, iter_lines, parse_layout
+)
+from hr.punch_ingestion import PunchIngestionService
+
+
+class Command(BaseCommand):
+    help = 'Stream a scanner punch export (CSV or fixed-width) into the punch log and attendance'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='Export file to import')
+        parser.add_argument(
+            '--format',
+            type=str,
+            choices=['csv', 'fixed'],
+            default='csv',
+            help='File format',
+        )
+        parser.add_argument(
+            '--delimiter',
+            type=str,
+            default=',',
+            help='CSV delimiter',
+        )
+        parser.add_argument(
+            '--layout',
+            type=str,
+            default=DEFAULT_FIXED_LAYOUT,
+            help='Fixed-width columns as field:start-end,... (fields: fingerprint_id, timestamp, date, time, device_id)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Punches parsed, validated and written per chunk',
+        )
+        parser.add_argument(
+            '--encoding',
+            type=str,
+            default='utf-8',
+            help='File encoding',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.isfile(path):
+            raise CommandError(f'File not found: {path}')
+        
+        lines = iter_lines(path, options['encoding'])
+        if options['format'] == 'fixed':
+            try:
+                parse_layout(options['layout'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            punches = iter_fixed_punches(lines, options['layout'])
+        else:
+            punches = iter_csv_punches(lines, options['delimiter'])
+        
+        self.stdout.write(f'Importing punches from {path} ({os.path.getsize(path)} bytes)...')
+        
+        totals = {'received': 0, 'accepted': 0, 'invalid': 0, 'attendance_rows': 0}
+        unknown = set()
+        started = time.perf_counter()
+        for chunk in chunked(punches, options['chunk_size']):
+            result = PunchIngestionService.ingest(chunk)
+            for key in totals:
+                totals[key] += result[key]
+            unknown.update(result['unknown_fingerprints'])
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"  {totals['received']} rows, {totals['received'] / elapsed:.0f} rows/s"
+            )
+        
+        elapsed = time.perf_counter() - started
+        if totals['invalid']:
+            self.stdout.write(self.style.WARNING(f"Skipped {totals['invalid']} malformed rows"))
+        if unknown:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped punches for {len(unknown)} unknown fingerprint ids: {', '.join(sorted(unknown)[:20])}"
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {totals['accepted']} of {totals['received']} punches into {totals['attendance_rows']} "
+            f"attendance rows in {elapsed:.1f}s ({totals['received'] / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
@@ -0,0 +1,53 @@
+"""
+Management command to re-derive attendance from raw punches
+"""
+from django.core.management.base import BaseCommand, CommandError
+from datetime import date
+
+from hr.attendance_materializer import AttendanceMaterializer
+
+
+class Command(BaseCommand):
+    help = 'Re-derive Attendance rows from the raw punch log for a date range'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start-date',
+            type=str,
+            required=True,
+            help='First day to re-derive (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--end-date',
+            type=str,
+            help='Last day to re-derive (YYYY-MM-DD), defaults to the start date',
+        )
+        parser.add_argument(
+            '--employee',
+            type=int,
+            action='append',
+            help='Only re-derive this employee id (repeatable)',
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=7,
+            help='Days of punches processed per chunk',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start_date = date.fromisoformat(options['start_date'])
+            end_date = date.fromisoformat(options['end_date']) if options.get('end_date') else start_date
+        except ValueError:
+            raise CommandError('Dates must be YYYY-MM-DD.')
+        if end_date < start_date:
+            raise CommandError('--end-date must not be before --start-date.')
+        
+        self.stdout.write(f'Re-deriving attendance from raw punches for {start_date} to {end_date}...')
+        
+        derived = AttendanceMaterializer.rederive(
+            start_date, end_date, employee_ids=options.get('employee'), chunk_days=options['chunk_days']
+        )
+        
+        self.stdout.write(self.style.SUCCESS(f'Successfully re-derived {derived} attendance rows!'))
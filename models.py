@@ -1,8 +1,10 @@
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from datetime import timedelta
 import uuid
 import os
 
@@ -258,6 +260,7 @@ class Attendance(models.Model):
     check_out_time = models.DateTimeField(null=True, blank=True)
     work_hours = models.DecimalField(max_digits=5, decimal_places=2, default=0)
     overtime_hours = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    break_hours = models.DecimalField(max_digits=5, decimal_places=2, default=0)
     is_late = models.BooleanField(default=False)
     is_absent = models.BooleanField(default=False)
     notes = models.TextField(blank=True)
@@ -276,35 +279,185 @@ class Attendance(models.Model):
     
     def calculate_work_hours(self):
         """Calculate work hours based on check-in and check-out times"""
-        if self.check_in_time and self.check_out_time:
-            duration = self.check_out_time - self.check_in_time
-            hours = duration.total_seconds() / 3600
-            # Cap at maximum work hours (8 hours for full-time)
-            max_hours = self.employee.get_work_hours_per_day()
-            self.work_hours = min(hours, max_hours)
-            self.overtime_hours = max(0, hours - max_hours)
-        else:
-            self.work_hours = 0
-            self.overtime_hours = 0
+        from .attendance_bulk import work_hours
+        
+        # Capped at the scheduled hours per day; the excess is overtime
+        self.work_hours, self.overtime_hours = work_hours(
+            self.check_in_time, self.check_out_time, self.break_hours,
+            self.employee.work_start_time, self.employee.work_end_time,
+        )
     
     def check_lateness(self):
         """Check if employee is late based on work start time"""
-        if self.check_in_time:
-            from datetime import datetime, time
-            work_start = datetime.combine(self.date, self.employee.work_start_time)
-            work_start = timezone.make_aware(work_start)
-            # Allow 15 minutes grace period
-            grace_period = timezone.timedelta(minutes=15)
-            self.is_late = self.check_in_time > (work_start + grace_period)
-        else:
-            self.is_late = False
+        from .attendance_bulk import is_late
+        
+        # Allow 15 minutes grace period
+        self.is_late = is_late(self.check_in_time, self.date, self.employee.work_start_time)
+    
+    # Fields that feed the attendance accumulators
+    TOTALS_FIELDS = {'employee_id', 'date', 'check_in_time', 'work_hours', 'overtime_hours', 'is_late', 'is_absent'}
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        from .attendance_totals import AttendanceTotalsService
+        
+        instance = super().from_db(db, field_names, values)
+        # Remember what the stored row contributes so save() can apply a delta
+        if cls.TOTALS_FIELDS.issubset(field_names):
+            instance._totals_snapshot = AttendanceTotalsService.contribution(instance)
+        return instance
     
     def save(self, *args, **kwargs):
+        from django.db import transaction
+        from .attendance_calendar import AttendanceCalendarService
+        from .attendance_totals import AttendanceTotalsService
+        from .payroll_recalculation import PayrollRecalculationService
+        
         if self.check_in_time and self.check_out_time:
             self.calculate_work_hours()
         if self.check_in_time:
             self.check_lateness()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            previous = AttendanceTotalsService.previous_contribution(self)
+            super().save(*args, **kwargs)
+            snapshot = AttendanceTotalsService.contribution(self)
+            AttendanceTotalsService.apply_change(previous, snapshot)
+            PayrollRecalculationService.record_attendance_change(previous, snapshot)
+            AttendanceCalendarService.invalidate([self.date] + ([previous[1]] if previous else []))
+        self._totals_snapshot = snapshot
+    
+    def delete(self, *args, **kwargs):
+        from django.db import transaction
+        from .attendance_calendar import AttendanceCalendarService
+        from .attendance_totals import AttendanceTotalsService
+        from .payroll_recalculation import PayrollRecalculationService
+        
+        with transaction.atomic():
+            previous = AttendanceTotalsService.previous_contribution(self)
+            result = super().delete(*args, **kwargs)
+            AttendanceTotalsService.apply_change(previous, None)
+            PayrollRecalculationService.record_attendance_change(previous, None)
+            AttendanceCalendarService.invalidate([previous[1]] if previous else [])
+        self._totals_snapshot = None
+        return result
+
+
+class AttendanceArchive(models.Model):
+    """
+    Manifest entry for one year of attendance moved out of hr_attendance into a compressed file
+    """
+    STATUS_CHOICES = [
+        ('archived', 'Archived'),
+        ('restored', 'Restored'),
+    ]
+    
+    year = models.PositiveSmallIntegerField(unique=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='archived')
+    path = models.CharField(max_length=255)
+    row_count = models.PositiveIntegerField(default=0)
+    checksum = models.CharField(max_length=64)
+    first_date = models.DateField(null=True, blank=True)
+    last_date = models.DateField(null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+    restored_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'hr_attendance_archive'
+        verbose_name = 'Attendance Archive'
+        verbose_name_plural = 'Attendance Archives'
+        ordering = ['-year']
+    
+    def __str__(self):
+        return f"Attendance {self.year} ({self.get_status_display()}, {self.row_count} rows)"
+
+
+class RawPunch(models.Model):
+    """
+    Append-only log of every punch a terminal sends; Attendance rows are derived from it
+    """
+    # Insert-only: the FK is not indexed, reads go through the punched_at index
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='raw_punches', db_index=False)
+    punched_at = models.DateTimeField(db_index=True)
+    device_id = models.CharField(max_length=50, blank=True)
+    
+    class Meta:
+        db_table = 'hr_raw_punch'
+        verbose_name = 'Raw Punch'
+        verbose_name_plural = 'Raw Punches'
+    
+    def __str__(self):
+        return f"{self.employee_id} @ {self.punched_at}"
+
+
+class AttendancePeriodTotal(models.Model):
+    """
+    Running attendance totals per employee and pay period, kept in step with Attendance writes
+    """
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='period_totals')
+    period_start = models.DateField()
+    period_end = models.DateField()
+    days_recorded = models.IntegerField(default=0)
+    present_days = models.IntegerField(default=0)
+    late_days = models.IntegerField(default=0)
+    absent_days = models.IntegerField(default=0)
+    total_hours = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    overtime_hours = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'hr_attendance_period_total'
+        verbose_name = 'Attendance Period Total'
+        verbose_name_plural = 'Attendance Period Totals'
+        unique_together = ['employee', 'period_start']
+        ordering = ['-period_start', 'employee']
+    
+    def __str__(self):
+        return f"{self.employee} - {self.period_start} to {self.period_end}"
+
+
+class AttendanceMonthTotal(models.Model):
+    """
+    Monthly attendance rollup per employee, kept in step with Attendance writes
+    """
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='month_totals')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    days_recorded = models.IntegerField(default=0)
+    present_days = models.IntegerField(default=0)
+    late_days = models.IntegerField(default=0)
+    absent_days = models.IntegerField(default=0)
+    total_hours = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    overtime_hours = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'hr_attendance_month_total'
+        verbose_name = 'Attendance Month Total'
+        verbose_name_plural = 'Attendance Month Totals'
+        unique_together = ['employee', 'year', 'month']
+        ordering = ['-year', '-month', 'employee']
+    
+    def __str__(self):
+        return f"{self.employee} - {self.year}-{self.month:02d}"
+
+
+class AttendanceChange(models.Model):
+    """
+    Pending (employee, date) pairs whose attendance changed since payroll was last recalculated
+    """
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='attendance_changes')
+    date = models.DateField()
+    recorded_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'hr_attendance_change'
+        verbose_name = 'Attendance Change'
+        verbose_name_plural = 'Attendance Changes'
+        unique_together = ['employee', 'date']
+        ordering = ['recorded_at']
+    
+    def __str__(self):
+        return f"{self.employee_id} - {self.date}"
 
 
 class LeaveRequest(models.Model):
@@ -379,7 +532,9 @@ class Payroll(models.Model):
     """
     STATUS_CHOICES = [
         ('draft', 'Draft'),
+        ('pending', 'Pending'),
         ('approved', 'Approved'),
+        ('rejected', 'Rejected'),
         ('paid', 'Paid'),
     ]
     
@@ -398,6 +553,9 @@ class Payroll(models.Model):
     approved_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='approved_payrolls')
     approved_at = models.DateTimeField(null=True, blank=True)
     payslip_generated = models.BooleanField(default=False)
+    payslip_hash = models.CharField(max_length=64, blank=True)
+    payslip_file = models.CharField(max_length=255, blank=True)
+    needs_review = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -408,15 +566,20 @@ class Payroll(models.Model):
         unique_together = ['employee', 'pay_period_start', 'pay_period_end']
         ordering = ['-pay_period_end']
     
+    NET_SALARY_INPUTS = {'base_salary', 'hours_worked', 'overtime_hours', 'bonuses', 'deductions', 'net_salary'}
+    
     def __str__(self):
         return f"{self.employee.user.get_full_name()} - {self.pay_period_start} to {self.pay_period_end}"
     
     def calculate_net_salary(self):
         """Calculate net salary based on hours worked and deductions"""
         from decimal import Decimal
+        from .payroll_calculator import expected_period_hours, to_cents
         
-        # Base calculation for fixed 9 AM - 5 PM schedule
-        expected_hours = Decimal(str(self.employee.get_work_hours_per_day() * self.employee.work_days_per_week * 2))  # Bi-weekly
+        # Base calculation for fixed 9 AM - 5 PM schedule, cached per schedule
+        expected_hours = expected_period_hours(
+            self.employee.work_start_time, self.employee.work_end_time, self.employee.work_days_per_week
+        )  # Bi-weekly
         hourly_rate = self.base_salary / (expected_hours * Decimal('26'))  # 26 pay periods per year
         
         # Calculate pay based on actual hours worked (capped at expected hours)
@@ -429,14 +592,205 @@ class Payroll(models.Model):
         
         # Calculate net salary
         gross_pay = regular_pay + overtime_pay + self.bonuses
-        self.net_salary = gross_pay - self.deductions
+        self.net_salary = to_cents(gross_pay - self.deductions)
         return self.net_salary
     
     def save(self, *args, **kwargs):
-        self.calculate_net_salary()
+        # Skip recalculation for partial saves that do not touch salary inputs
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.calculate_net_salary()
+        elif self.NET_SALARY_INPUTS.intersection(update_fields):
+            self.calculate_net_salary()
+            kwargs['update_fields'] = set(update_fields) | {'net_salary'}
         super().save(*args, **kwargs)
 
 
+class PayrollRun(models.Model):
+    """
+    A checkpointed payroll run that can be inspected, cancelled and resumed
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('cancelling', 'Cancelling'),
+        ('cancelled', 'Cancelled'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    pay_period_start = models.DateField()
+    pay_period_end = models.DateField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    workers = models.PositiveIntegerField(default=1)
+    shard_by = models.CharField(max_length=20, default='department')
+    batch_size = models.PositiveIntegerField(default=1000)
+    total_employees = models.PositiveIntegerField(default=0)
+    processed_employees = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='payroll_runs')
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'hr_payroll_run'
+        verbose_name = 'Payroll Run'
+        verbose_name_plural = 'Payroll Runs'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Run #{self.id} {self.pay_period_start} to {self.pay_period_end} ({self.get_status_display()})"
+    
+    @staticmethod
+    def resumable_filter():
+        """
+        Runs no worker is processing: idle ones, and running ones whose heartbeat
+        is older than PAYROLL_RUN_STALE_SECONDS because their worker died
+        """
+        stale_before = timezone.now() - timedelta(seconds=getattr(settings, 'PAYROLL_RUN_STALE_SECONDS', 600))
+        return models.Q(status__in=['pending', 'cancelled', 'failed']) | models.Q(
+            models.Q(heartbeat_at__isnull=True) | models.Q(heartbeat_at__lt=stale_before), status='running'
+        )
+    
+    def is_resumable(self):
+        return PayrollRun.objects.filter(PayrollRun.resumable_filter(), id=self.id).exists()
+
+
+class PayrollRunShard(models.Model):
+    """
+    One shard of a payroll run with its last committed batch checkpoint
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('cancelled', 'Cancelled'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    run = models.ForeignKey(PayrollRun, on_delete=models.CASCADE, related_name='shards')
+    label = models.CharField(max_length=100)
+    spec = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    last_employee_id = models.BigIntegerField(null=True, blank=True)
+    batches_completed = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'hr_payroll_run_shard'
+        verbose_name = 'Payroll Run Shard'
+        verbose_name_plural = 'Payroll Run Shards'
+        unique_together = ['run', 'label']
+        ordering = ['run', 'id']
+    
+    def __str__(self):
+        return f"{self.run_id}:{self.label} ({self.get_status_display()})"
+
+
+class PayslipBatch(models.Model):
+    """
+    A queued batch of payslips rendered by the payslip workers
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    payroll_ids = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    total = models.PositiveIntegerField(default=0)
+    rendered = models.PositiveIntegerField(default=0)
+    cached = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='payslip_batches')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'hr_payslip_batch'
+        verbose_name = 'Payslip Batch'
+        verbose_name_plural = 'Payslip Batches'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Payslip batch #{self.id} ({self.get_status_display()})"
+    
+    @staticmethod
+    def claimable_filter():
+        """
+        Batches waiting for a worker: queued ones, and running ones whose heartbeat is
+        older than PAYSLIP_BATCH_STALE_SECONDS because their worker died
+        """
+        stale_before = timezone.now() - timedelta(seconds=getattr(settings, 'PAYSLIP_BATCH_STALE_SECONDS', 600))
+        return models.Q(status='queued') | models.Q(
+            models.Q(heartbeat_at__isnull=True) | models.Q(heartbeat_at__lt=stale_before), status='running'
+        )
+    
+    @property
+    def processed(self):
+        return self.rendered + self.cached + self.failed
+    
+    def progress(self):
+        return round(self.processed / self.total * 100, 1) if self.total else 100.0
+
+
+class ExportJob(models.Model):
+    """
+    A CSV export built in the background; completed files are reused while the data is unchanged
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    KIND_CHOICES = [
+        ('employees', 'Employees'),
+        ('attendance', 'Attendance'),
+        ('payroll', 'Payroll'),
+        ('leave_requests', 'Leave Requests'),
+        ('documents', 'Documents'),
+    ]
+    
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict)
+    # sha256 of kind, params and the data version the file was built from
+    cache_key = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    total_rows = models.PositiveIntegerField(default=0)
+    rows_written = models.PositiveIntegerField(default=0)
+    file_path = models.CharField(max_length=255, blank=True)
+    file_size = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='export_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'hr_export_job'
+        verbose_name = 'Export Job'
+        verbose_name_plural = 'Export Jobs'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Export #{self.id} {self.kind} ({self.get_status_display()})"
+
+
 class Document(models.Model):
     """
     Document model for employee documents
@@ -488,18 +842,40 @@ class Notification(models.Model):
         ('missed_checkout', 'Missed Check-out'),
         ('leave_approval', 'Leave Approval'),
         ('payroll_ready', 'Payroll Ready'),
+        ('payroll_approved', 'Payroll Approved'),
+        ('payroll_rejected', 'Payroll Rejected'),
+        ('payroll_paid', 'Payroll Paid'),
         ('document_expiry', 'Document Expiry'),
+        ('digest', 'Digest'),
         ('general', 'General'),
     ]
     
+    EMAIL_STATUS_CHOICES = [
+        ('none', 'Not Requested'),
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
     title = models.CharField(max_length=200)
     message = models.TextField()
     notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPE_CHOICES, default='general')
     is_read = models.BooleanField(default=False)
     is_email_sent = models.BooleanField(default=False)
+    # Email outbox: pending rows are delivered in batches by the deliver_notifications worker
+    email_status = models.CharField(max_length=10, choices=EMAIL_STATUS_CHOICES, default='none')
+    email_attempts = models.PositiveSmallIntegerField(default=0)
+    # Earliest next delivery attempt; while sending, the end of the worker's claim
+    email_next_attempt_at = models.DateTimeField(null=True, blank=True)
+    email_claim = models.CharField(max_length=32, blank=True)
+    email_sent_at = models.DateTimeField(null=True, blank=True)
+    email_error = models.TextField(blank=True)
     related_object_id = models.PositiveIntegerField(null=True, blank=True)
     related_object_type = models.CharField(max_length=50, blank=True)
+    # sha256 of (type, related object, recipient, window) for alerts that must be created once
+    dedup_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     read_at = models.DateTimeField(null=True, blank=True)
     
@@ -508,15 +884,69 @@ class Notification(models.Model):
         verbose_name = 'Notification'
         verbose_name_plural = 'Notifications'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['email_status', 'email_next_attempt_at'], name='hr_notif_outbox_idx'),
+            models.Index(fields=['recipient', '-created_at', '-id'], name='hr_notif_inbox_idx'),
+            models.Index(fields=['recipient', 'is_read'], name='hr_notif_unread_idx'),
+        ]
     
     def __str__(self):
         return f"{self.recipient.username} - {self.title}"
     
+    def save(self, *args, **kwargs):
+        from .notification_inbox import UnreadCounter
+        
+        created = self._state.adding
+        super().save(*args, **kwargs)
+        if created and not self.is_read:
+            UnreadCounter.adjust({self.recipient_id: 1})
+    
+    def delete(self, *args, **kwargs):
+        from .notification_inbox import UnreadCounter
+        
+        was_unread = not self.is_read
+        result = super().delete(*args, **kwargs)
+        if was_unread:
+            UnreadCounter.adjust({self.recipient_id: -1})
+        return result
+    
     def mark_as_read(self):
         """Mark notification as read"""
+        from .notification_inbox import UnreadCounter
+        
+        if self.is_read:
+            return
         self.is_read = True
         self.read_at = timezone.now()
-        self.save()
+        # Conditional so two concurrent reads only decrement the counter once
+        if Notification.objects.filter(pk=self.pk, is_read=False).update(is_read=True, read_at=self.read_at):
+            UnreadCounter.adjust({self.recipient_id: -1})
+
+
+class NotificationDigestItem(models.Model):
+    """
+    An alert of a digest type, held back until the recipient's next digest
+    instead of becoming a notification and an email of its own
+    """
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='digest_items')
+    notification_type = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPE_CHOICES)
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    related_object_id = models.PositiveIntegerField(null=True, blank=True)
+    related_object_type = models.CharField(max_length=50, blank=True)
+    dedup_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    # Set once the item has been merged into a digest notification
+    digest = models.ForeignKey(Notification, on_delete=models.CASCADE, null=True, blank=True, related_name='digest_items')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'hr_notification_digest_item'
+        verbose_name = 'Notification Digest Item'
+        verbose_name_plural = 'Notification Digest Items'
+        ordering = ['created_at']
+    
+    def __str__(self):
+        return f"{self.recipient.username} - {self.title}"
 
 
 class AuditLog(models.Model):
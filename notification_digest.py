@@ -0,0 +1,109 @@
+"""
+Daily digests: buffered alerts merged into one notification and email per recipient
+"""
+from django.db import IntegrityError, transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from itertools import groupby
+import logging
+import time
+
+from .models import Notification, NotificationDigestItem
+from .notification_inbox import UnreadCounter
+from .notifications import NotificationService, NOTIFICATION_BATCH_SIZE, dedup_key
+from .punch_files import chunked
+
+logger = logging.getLogger(__name__)
+
+DIGEST_TEMPLATE = 'hr/notifications/digest.txt'
+
+
+class NotificationDigestService:
+    """
+    Turn pending digest items into digest notifications. Each digest is queued
+    in the email outbox, so the whole run is delivered as batched emails.
+    """
+
+    @staticmethod
+    def pending(until=None):
+        return NotificationDigestItem.objects.filter(digest__isnull=True, created_at__lt=until or timezone.now())
+
+    @staticmethod
+    def build_digest(recipient, items, until):
+        """
+        One unsaved digest notification for a recipient's items, rendered once
+        """
+        labels = dict(Notification.NOTIFICATION_TYPE_CHOICES)
+        items = sorted(items, key=lambda item: (item.notification_type, item.created_at, item.id))
+        groups = [
+            {'label': labels.get(notification_type, notification_type), 'items': list(group)}
+            for notification_type, group in groupby(items, key=lambda item: item.notification_type)
+        ]
+        message = render_to_string(DIGEST_TEMPLATE, {
+            'recipient': recipient,
+            'groups': groups,
+            'count': len(items),
+            'until': timezone.localtime(until),
+        })
+        return NotificationService.build_notification(
+            recipient,
+            title=f"Daily digest: {len(items)} alert{'s' if len(items) != 1 else ''}",
+            message=message.strip(),
+            notification_type='digest',
+            dedup_window=timezone.localdate(until),
+        )
+
+    @staticmethod
+    def send_digests(until=None, batch_size=NOTIFICATION_BATCH_SIZE):
+        """
+        Merge every item buffered before until into one digest per recipient.
+        Recipients are handled in batches, each committed with its items linked
+        to their digest, so a rerun only picks up what is still pending. A digest
+        is keyed on recipient and day: a recipient digested already today keeps
+        their new items pending until tomorrow's run.
+        """
+        until = until or timezone.now()
+        started = time.perf_counter()
+        pending = NotificationDigestService.pending(until)
+        recipient_ids = list(pending.order_by('recipient_id').values_list('recipient_id', flat=True).distinct())
+        window = timezone.localdate(until)
+        digests_created = items_merged = 0
+
+        for recipient_chunk in chunked(recipient_ids, batch_size):
+            keys = {dedup_key('digest', recipient_id, window=window): recipient_id for recipient_id in recipient_chunk}
+            done = set(
+                Notification.objects.filter(dedup_key__in=keys).values_list('recipient_id', flat=True)
+            )
+            try:
+                with transaction.atomic():
+                    # Items locked by a concurrent run are left to it
+                    items = list(
+                        pending.filter(recipient_id__in=set(recipient_chunk) - done)
+                        .select_for_update(skip_locked=True, of=('self',)).select_related('recipient')
+                        .order_by('recipient_id', 'created_at', 'id')
+                    )
+                    grouped = [
+                        (recipient_id, list(group))
+                        for recipient_id, group in groupby(items, key=lambda item: item.recipient_id)
+                    ]
+                    digests = [
+                        NotificationDigestService.build_digest(group[0].recipient, group, until)
+                        for _, group in grouped
+                    ]
+                    Notification.objects.bulk_create(digests)
+                    UnreadCounter.created(digests)
+                    for digest, (_, group) in zip(digests, grouped):
+                        for item in group:
+                            item.digest = digest
+                    NotificationDigestItem.objects.bulk_update(items, ['digest'], batch_size=batch_size)
+            except IntegrityError:
+                # A concurrent run digested some of these recipients since the lookup;
+                # their items stay pending for the next run
+                logger.warning(f"Skipped {len(recipient_chunk)} recipients digested by a concurrent run")
+                continue
+            digests_created += len(digests)
+            items_merged += len(items)
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"Built {digests_created} digests from {items_merged} alerts in {elapsed:.2f}s")
+        return {'digests': digests_created, 'items': items_merged, 'seconds': round(elapsed, 3)}
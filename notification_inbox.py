@@ -0,0 +1,162 @@
+"""
+Notification inbox: cached unread counters, keyset-paginated listing and bulk mark-read
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from collections import Counter
+import base64
+import binascii
+import logging
+
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+UNREAD_KEY = 'notifications:unread:v1:{}'
+
+
+def _ttl():
+    return getattr(settings, 'NOTIFICATION_UNREAD_CACHE_TTL', 3600)
+
+
+class UnreadCounter:
+    """
+    Unread notification count per user, kept in the cache. Creates and reads adjust
+    the cached value after commit; a missing entry is recounted on the next read.
+    Writes that bypass these hooks (queryset deletes) are corrected when the entry expires.
+    """
+
+    @staticmethod
+    def key(user_id):
+        return UNREAD_KEY.format(user_id)
+
+    @staticmethod
+    def get(user_id):
+        count = cache.get(UnreadCounter.key(user_id))
+        if count is None:
+            count = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+            cache.add(UnreadCounter.key(user_id), count, _ttl())
+        return max(count, 0)
+
+    @staticmethod
+    def adjust(deltas):
+        """
+        Apply {user_id: delta} once the current transaction commits
+        """
+        deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        def apply():
+            for user_id, delta in deltas.items():
+                try:
+                    if delta > 0:
+                        cache.incr(UnreadCounter.key(user_id), delta)
+                    else:
+                        cache.decr(UnreadCounter.key(user_id), -delta)
+                except ValueError:
+                    # Not cached; the next read counts from the table
+                    pass
+
+        transaction.on_commit(apply)
+
+    @staticmethod
+    def created(notifications):
+        """
+        Count newly inserted notifications, e.g. after a bulk_create
+        """
+        UnreadCounter.adjust(Counter(n.recipient_id for n in notifications if not n.is_read))
+
+    @staticmethod
+    def reset(user_id):
+        transaction.on_commit(lambda: cache.delete(UnreadCounter.key(user_id)))
+
+    @staticmethod
+    def reset_many(user_ids):
+        """
+        Drop the cached counts of several users, e.g. after an insert with ignore_conflicts
+        """
+        keys = [UnreadCounter.key(user_id) for user_id in user_ids]
+        if keys:
+            transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def encode_cursor(created_at, pk):
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{pk}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from a cursor; raises ValueError when it is malformed"""
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        created_at = parse_datetime(created_at)
+        if created_at is None:
+            raise ValueError(cursor)
+        return created_at, int(pk)
+    except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def describe(notification):
+    return {
+        'id': notification.id,
+        'title': notification.title,
+        'message': notification.message,
+        'notification_type': notification.notification_type,
+        'is_read': notification.is_read,
+        'related_object_type': notification.related_object_type,
+        'related_object_id': notification.related_object_id,
+        'created_at': notification.created_at.isoformat(),
+        'read_at': notification.read_at.isoformat() if notification.read_at else None,
+    }
+
+
+class NotificationInboxService:
+    """
+    A user's inbox, newest first
+    """
+
+    @staticmethod
+    def page(user, cursor=None, limit=None, unread_only=False):
+        """
+        One page of the inbox after the given cursor. Keyset pagination on
+        (created_at, id): every page is an index range scan, however deep.
+        """
+        limit = limit or getattr(settings, 'NOTIFICATION_INBOX_PAGE_SIZE', 20)
+        notifications = Notification.objects.filter(recipient=user)
+        if unread_only:
+            notifications = notifications.filter(is_read=False)
+        if cursor:
+            created_at, pk = decode_cursor(cursor)
+            notifications = notifications.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+        rows = list(notifications.order_by('-created_at', '-id')[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'results': [describe(notification) for notification in rows],
+            'next_cursor': encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None,
+            'unread_count': UnreadCounter.get(user.id),
+        }
+
+    @staticmethod
+    def mark_read(user, ids=None):
+        """
+        Mark the given notifications, or all of them, as read in one UPDATE.
+        Returns the number of notifications that were unread.
+        """
+        unread = Notification.objects.filter(recipient=user, is_read=False)
+        if ids is not None:
+            unread = unread.filter(id__in=ids)
+        updated = unread.update(is_read=True, read_at=timezone.now())
+        if ids is None:
+            # Recount on the next read rather than trust a delta against a possibly stale entry
+            UnreadCounter.reset(user.id)
+        else:
+            UnreadCounter.adjust({user.id: -updated})
+        return updated
@@ -0,0 +1,215 @@
+"""
+Email outbox for notifications: rows are committed as pending and delivered
+in batches over one reused mail connection
+"""
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Case, Count, F, Min, PositiveSmallIntegerField, Q, When
+from django.utils import timezone
+from datetime import timedelta
+import logging
+import time
+import uuid
+
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def retry_delay(attempts):
+    """Exponential backoff after the given number of failed attempts"""
+    base = _setting('NOTIFICATION_EMAIL_RETRY_SECONDS', 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), _setting('NOTIFICATION_EMAIL_MAX_RETRY_SECONDS', 3600)))
+
+
+def _due(now):
+    # Sending rows whose claim has expired belong to a worker that died mid-batch
+    return Q(email_status__in=['pending', 'sending']) & (
+        Q(email_next_attempt_at__isnull=True) | Q(email_next_attempt_at__lte=now)
+    )
+
+
+class EmailOutboxService:
+    """
+    Drain pending notification emails. Several workers may run at once; each
+    claims its batch with a conditional UPDATE before sending.
+    """
+
+    @staticmethod
+    def claim_batch(batch_size):
+        """
+        Claim up to batch_size due notifications; returns them with their recipients
+        """
+        now = timezone.now()
+        # A takeover counts as an attempt: a row whose send kills its worker must not be retried forever
+        Notification.objects.filter(
+            email_status='sending', email_next_attempt_at__lte=now,
+            email_attempts__gte=_setting('NOTIFICATION_EMAIL_MAX_ATTEMPTS', 5) - 1,
+        ).update(
+            email_status='failed', email_attempts=F('email_attempts') + 1, email_claim='',
+            email_error='Worker stopped before the send was recorded', email_next_attempt_at=None,
+        )
+        ids = list(
+            Notification.objects.filter(_due(now)).order_by('created_at', 'id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        claim = uuid.uuid4().hex
+        Notification.objects.filter(_due(now), id__in=ids).update(
+            email_status='sending',
+            email_claim=claim,
+            email_attempts=Case(
+                When(email_status='sending', then=F('email_attempts') + 1), default=F('email_attempts'),
+                output_field=PositiveSmallIntegerField(),
+            ),
+            email_next_attempt_at=now + timedelta(seconds=_setting('NOTIFICATION_EMAIL_CLAIM_SECONDS', 300)),
+        )
+        return list(
+            Notification.objects.filter(email_claim=claim, email_status='sending')
+            .select_related('recipient').order_by('created_at', 'id')
+        )
+
+    @staticmethod
+    def build_message(notification, connection):
+        return EmailMessage(
+            subject=f"HR System: {notification.title}",
+            body=notification.message,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[notification.recipient.email],
+            connection=connection,
+        )
+
+    @staticmethod
+    def _record(claim, sent, failed, now):
+        """
+        One UPDATE for the sent rows; failures are retried with backoff until the attempts run out.
+        Rows another worker has taken over since (the claim expired) are left to that worker.
+        """
+        if sent:
+            Notification.objects.filter(id__in=[n.id for n in sent], email_claim=claim).update(
+                email_status='sent', is_email_sent=True, email_sent_at=now,
+                email_attempts=F('email_attempts') + 1, email_claim='', email_error='', email_next_attempt_at=None,
+            )
+        if failed:
+            max_attempts = _setting('NOTIFICATION_EMAIL_MAX_ATTEMPTS', 5)
+            with transaction.atomic():
+                held = set(
+                    Notification.objects.filter(id__in=[n.id for n, _ in failed], email_claim=claim)
+                    .select_for_update().values_list('id', flat=True)
+                )
+                failed = [(notification, error) for notification, error in failed if notification.id in held]
+                for notification, error in failed:
+                    notification.email_attempts += 1
+                    notification.email_error = error
+                    notification.email_claim = ''
+                    if notification.email_attempts >= max_attempts:
+                        notification.email_status = 'failed'
+                        notification.email_next_attempt_at = None
+                    else:
+                        notification.email_status = 'pending'
+                        notification.email_next_attempt_at = now + retry_delay(notification.email_attempts)
+                Notification.objects.bulk_update(
+                    [notification for notification, _ in failed],
+                    ['email_attempts', 'email_error', 'email_claim', 'email_status', 'email_next_attempt_at'],
+                )
+
+    @staticmethod
+    def deliver_batch(batch_size=None):
+        """
+        Claim and send one batch over a single connection. Returns delivery stats.
+        """
+        batch_size = batch_size or _setting('NOTIFICATION_EMAIL_BATCH_SIZE', 200)
+        started = time.perf_counter()
+        batch = EmailOutboxService.claim_batch(batch_size)
+        sent, failed = [], []
+        if batch:
+            connection = get_connection(fail_silently=False)
+            try:
+                connection.open()
+            except Exception as e:
+                logger.error(f"Could not open mail connection: {str(e)}")
+                failed = [(notification, str(e)) for notification in batch]
+            else:
+                try:
+                    for notification in batch:
+                        if not notification.recipient.email:
+                            failed.append((notification, 'Recipient has no email address'))
+                            continue
+                        try:
+                            EmailOutboxService.build_message(notification, connection).send()
+                        except Exception as e:
+                            failed.append((notification, str(e)))
+                        else:
+                            sent.append(notification)
+                finally:
+                    connection.close()
+            EmailOutboxService._record(batch[0].email_claim, sent, failed, timezone.now())
+
+        elapsed = time.perf_counter() - started
+        stats = {
+            'claimed': len(batch),
+            'sent': len(sent),
+            'failed': len(failed),
+            'seconds': round(elapsed, 3),
+            'per_second': round(len(sent) / elapsed, 1) if sent and elapsed else 0.0,
+        }
+        if batch:
+            logger.info(
+                f"Delivered {stats['sent']} of {stats['claimed']} notification emails "
+                f"in {stats['seconds']}s ({stats['per_second']}/s), {stats['failed']} failed"
+            )
+        return stats
+
+    @staticmethod
+    def drain(batch_size=None, max_batches=None):
+        """
+        Deliver batches until nothing is due; returns the combined stats
+        """
+        totals = {'batches': 0, 'claimed': 0, 'sent': 0, 'failed': 0}
+        started = time.perf_counter()
+        while max_batches is None or totals['batches'] < max_batches:
+            stats = EmailOutboxService.deliver_batch(batch_size)
+            if not stats['claimed']:
+                break
+            totals['batches'] += 1
+            for key in ('claimed', 'sent', 'failed'):
+                totals[key] += stats[key]
+        elapsed = time.perf_counter() - started
+        totals['seconds'] = round(elapsed, 3)
+        totals['per_second'] = round(totals['sent'] / elapsed, 1) if totals['sent'] and elapsed else 0.0
+        return totals
+
+    @staticmethod
+    def backlog():
+        """
+        Outbox depth per email status and the age of the oldest pending email
+        """
+        counts = {
+            row['email_status']: row['count']
+            for row in Notification.objects.exclude(email_status='none').order_by().values('email_status').annotate(
+                count=Count('id')
+            )
+        }
+        oldest = Notification.objects.filter(email_status='pending').aggregate(oldest=Min('created_at'))['oldest']
+        return {
+            'pending': counts.get('pending', 0),
+            'sending': counts.get('sending', 0),
+            'sent': counts.get('sent', 0),
+            'failed': counts.get('failed', 0),
+            'oldest_pending_seconds': int((timezone.now() - oldest).total_seconds()) if oldest else 0,
+        }
+
+    @staticmethod
+    def retry_failed(queryset=None):
+        """
+        Put permanently failed emails back in the outbox
+        """
+        queryset = queryset if queryset is not None else Notification.objects.all()
+        return queryset.filter(email_status='failed').update(
+            email_status='pending', email_attempts=0, email_next_attempt_at=None, email_error='',
+        )
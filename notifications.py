@@ -1,17 +1,81 @@
 """
 Notification system for HR alerts and reminders
 """
-from django.core.mail import send_mail
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q, QuerySet
 from django.utils import timezone
 from django.template.loader import render_to_string
 from datetime import date, timedelta
+import hashlib
 import logging
 
-from .models import Notification, Employee, Attendance, LeaveRequest, Document
+from .models import User, Notification, NotificationDigestItem, Employee, Attendance, LeaveRequest, Document
+from .notification_inbox import UnreadCounter
+from .punch_files import chunked
 
 logger = logging.getLogger(__name__)
 
+# Rows per INSERT when notifications are created in bulk
+NOTIFICATION_BATCH_SIZE = 1000
+
+
+def dedup_key(notification_type, recipient_id, related_object_type='', related_object_id=None, window=''):
+    """
+    Deterministic key of one alert: the same type, related object, recipient and
+    window always give the same key, so the unique index drops repeats
+    """
+    raw = f"{notification_type}|{related_object_type}|{related_object_id or ''}|{recipient_id}|{window}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def digest_types():
+    """Notification types buffered for the daily digest instead of sent one by one"""
+    return set(getattr(settings, 'NOTIFICATION_DIGEST_TYPES', ()))
+
+
+def digest_item(notification):
+    """The buffered digest item standing in for a built notification"""
+    return NotificationDigestItem(
+        recipient_id=notification.recipient_id,
+        notification_type=notification.notification_type,
+        title=notification.title,
+        message=notification.message,
+        related_object_id=notification.related_object_id,
+        related_object_type=notification.related_object_type,
+        dedup_key=notification.dedup_key,
+    )
+
+
+def _insert_unique(model, rows):
+    """
+    bulk_create rows, skipping those whose dedup key is stored already or repeated in rows.
+    Returns the number of rows stored.
+    """
+    keys = {row.dedup_key for row in rows if row.dedup_key}
+    seen = set(model.objects.filter(dedup_key__in=keys).values_list('dedup_key', flat=True)) if keys else set()
+    plain, keyed = [], []
+    for row in rows:
+        if not row.dedup_key:
+            plain.append(row)
+        elif row.dedup_key not in seen:
+            seen.add(row.dedup_key)
+            keyed.append(row)
+
+    model.objects.bulk_create(plain)
+    if model is Notification:
+        UnreadCounter.created(plain)
+    if not keyed:
+        return len(plain)
+
+    # A concurrent run may insert the same keys between the lookup and the insert, and
+    # ignore_conflicts does not say which rows were dropped: count the keys now stored
+    # (one raced in by the other run counts for both) and recount the affected inboxes
+    model.objects.bulk_create(keyed, ignore_conflicts=True)
+    if model is Notification:
+        UnreadCounter.reset_many({row.recipient_id for row in keyed})
+    return len(plain) + model.objects.filter(dedup_key__in=[row.dedup_key for row in keyed]).count()
+
 
 class NotificationService:
     """
@@ -19,47 +83,120 @@ class NotificationService:
     """
     
     @staticmethod
-    def create_notification(recipient, title, message, notification_type='general', 
-                          related_object=None, send_email=True):
+    def build_notification(recipient, title, message, notification_type='general',
+                           related_object=None, send_email=True, dedup_window=None):
         """
-        Create a notification for a user
+        Unsaved notification for a user; the email is queued with the row when requested.
+        With a dedup_window (a date, a week, an expiry date...) the alert is created at
+        most once per recipient, type and related object within that window.
         """
-        notification = Notification.objects.create(
+        notification = Notification(
             recipient=recipient,
             title=title,
             message=message,
             notification_type=notification_type,
             related_object_id=related_object.id if related_object else None,
-            related_object_type=related_object.__class__.__name__ if related_object else None
+            related_object_type=related_object.__class__.__name__ if related_object else '',
+            email_status='pending' if send_email and recipient.email else 'none',
         )
-        
-        if send_email:
-            NotificationService.send_email_notification(notification)
-        
+        if dedup_window is not None:
+            notification.dedup_key = dedup_key(
+                notification_type, recipient.id, notification.related_object_type,
+                notification.related_object_id, dedup_window,
+            )
         return notification
     
     @staticmethod
-    def send_email_notification(notification):
+    def save_notification(notification):
         """
-        Send email notification
+        Insert a built notification; a deduplicated one that already exists is returned instead.
+        Digest types are buffered, and the NotificationDigestItem is returned.
         """
+        if notification.notification_type in digest_types():
+            notification = digest_item(notification)
+        if not notification.dedup_key:
+            notification.save()
+            return notification
         try:
-            subject = f"HR System: {notification.title}"
-            message = notification.message
-            
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[notification.recipient.email],
-                fail_silently=False,
+            with transaction.atomic():
+                notification.save()
+        except IntegrityError:
+            return type(notification).objects.get(dedup_key=notification.dedup_key)
+        return notification
+    
+    @staticmethod
+    def create_notification(recipient, title, message, notification_type='general', 
+                          related_object=None, send_email=True, dedup_window=None):
+        """
+        Create a notification for a user. The email is only queued here; the
+        deliver_notifications worker sends it once this transaction commits.
+        """
+        notification = NotificationService.build_notification(
+            recipient, title, message, notification_type, related_object, send_email, dedup_window
+        )
+        
+        return NotificationService.save_notification(notification)
+    
+    @staticmethod
+    def bulk_create(notifications, batch_size=NOTIFICATION_BATCH_SIZE):
+        """
+        Insert unsaved notifications (from build_notification) batch by batch.
+        Accepts any iterable, so callers can stream them. Rows whose dedup key is
+        already stored are skipped, so reruns insert nothing. Digest types go to the
+        digest buffer instead. Returns the number inserted.
+        """
+        buffered = digest_types()
+        created = 0
+        for batch in chunked(notifications, batch_size):
+            items = [digest_item(n) for n in batch if n.notification_type in buffered]
+            direct = [n for n in batch if n.notification_type not in buffered]
+            if items:
+                created += _insert_unique(NotificationDigestItem, items)
+            if direct:
+                created += _insert_unique(Notification, direct)
+        return created
+    
+    @staticmethod
+    def fan_out(recipients, title, message, notification_type='general', related_object=None,
+                send_email=True, dedup_window=None, batch_size=NOTIFICATION_BATCH_SIZE):
+        """
+        Notify many users at once. recipients is a User queryset or a list of user ids;
+        title and message are strings or callables taking the recipient.
+        Returns the number of notifications created.
+        """
+        if not isinstance(recipients, QuerySet):
+            recipients = User.objects.filter(id__in=list(recipients))
+        render_title = title if callable(title) else lambda recipient: title
+        render_message = message if callable(message) else lambda recipient: message
+        return NotificationService.bulk_create((
+            NotificationService.build_notification(
+                recipient, render_title(recipient), render_message(recipient),
+                notification_type, related_object, send_email, dedup_window,
             )
-            
-            notification.is_email_sent = True
-            notification.save()
-            
-        except Exception as e:
-            logger.error(f"Failed to send email notification: {str(e)}")
+            for recipient in recipients.order_by('id').iterator(chunk_size=batch_size)
+        ), batch_size)
+    
+    @staticmethod
+    def send_email_notification(notification):
+        """
+        Queue email delivery for an existing notification
+        """
+        if notification.email_status in ('none', 'failed') and notification.recipient.email:
+            notification.email_status = 'pending'
+            notification.email_attempts = 0
+            notification.email_next_attempt_at = None
+            notification.save(update_fields=['email_status', 'email_attempts', 'email_next_attempt_at'])
+    
+    @staticmethod
+    def build_late_checkin(attendance):
+        return NotificationService.build_notification(
+            recipient=attendance.employee.user,
+            title="Late Check-in Alert",
+            message=f"You checked in late on {attendance.date}. Please ensure you arrive on time.",
+            notification_type='late_checkin',
+            related_object=attendance,
+            dedup_window=attendance.date
+        )
     
     @staticmethod
     def notify_late_checkin(attendance):
@@ -67,42 +204,37 @@ class NotificationService:
         Notify employee about late check-in
         """
         if attendance.is_late:
-            NotificationService.create_notification(
-                recipient=attendance.employee.user,
-                title="Late Check-in Alert",
-                message=f"You checked in late on {attendance.date}. Please ensure you arrive on time.",
-                notification_type='late_checkin',
-                related_object=attendance
-            )
+            NotificationService.save_notification(NotificationService.build_late_checkin(attendance))
     
     @staticmethod
-    def notify_missed_checkout(employee, date):
-        """
-        Notify employee about missed check-out
-        """
-        NotificationService.create_notification(
+    def build_missed_checkout(employee, date):
+        return NotificationService.build_notification(
             recipient=employee.user,
             title="Missed Check-out Alert",
             message=f"You forgot to check out on {date}. Please contact HR if this was an error.",
-            notification_type='missed_checkout'
+            notification_type='missed_checkout',
+            dedup_window=date
         )
     
+    @staticmethod
+    def notify_missed_checkout(employee, date):
+        """
+        Notify employee about missed check-out
+        """
+        NotificationService.save_notification(NotificationService.build_missed_checkout(employee, date))
+    
     @staticmethod
     def notify_leave_request_submitted(leave_request):
         """
         Notify HR about new leave request
         """
-        from .models import User
-        
-        hr_users = User.objects.filter(role='hr')
-        for hr_user in hr_users:
-            NotificationService.create_notification(
-                recipient=hr_user,
-                title="New Leave Request",
-                message=f"{leave_request.employee.user.get_full_name()} has submitted a leave request for {leave_request.days_requested} days.",
-                notification_type='leave_approval',
-                related_object=leave_request
-            )
+        return NotificationService.fan_out(
+            User.objects.filter(role='hr'),
+            title="New Leave Request",
+            message=f"{leave_request.employee.user.get_full_name()} has submitted a leave request for {leave_request.days_requested} days.",
+            notification_type='leave_approval',
+            related_object=leave_request
+        )
     
     @staticmethod
     def notify_leave_request_approved(leave_request):
@@ -131,16 +263,42 @@ class NotificationService:
         )
     
     @staticmethod
-    def notify_payroll_ready(payroll):
-        """
-        Notify employee about ready payroll
-        """
-        NotificationService.create_notification(
+    def build_payroll_ready(payroll):
+        return NotificationService.build_notification(
             recipient=payroll.employee.user,
             title="Payroll Ready",
             message=f"Your payroll for {payroll.pay_period_start} to {payroll.pay_period_end} is ready for review.",
             notification_type='payroll_ready',
-            related_object=payroll
+            related_object=payroll,
+            dedup_window=payroll.pay_period_start
+        )
+    
+    @staticmethod
+    def notify_payroll_ready(payroll):
+        """
+        Notify employee about ready payroll
+        """
+        NotificationService.save_notification(NotificationService.build_payroll_ready(payroll))
+    
+    @staticmethod
+    def notify_payrolls_ready(payrolls):
+        """
+        Notify the employees of many payrolls in bulk; payrolls need employee__user loaded
+        """
+        return NotificationService.bulk_create(
+            NotificationService.build_payroll_ready(payroll) for payroll in payrolls
+        )
+    
+    @staticmethod
+    def build_document_expiry(document):
+        return NotificationService.build_notification(
+            recipient=document.employee.user,
+            title="Document Expiry Alert",
+            message=f"Your {document.get_document_type_display()} ({document.title}) will expire on {document.expiry_date}.",
+            notification_type='document_expiry',
+            related_object=document,
+            # One alert per document and expiry date, however often the check runs
+            dedup_window=document.expiry_date
         )
     
     @staticmethod
@@ -152,13 +310,7 @@ class NotificationService:
             days_until_expiry = (document.expiry_date - date.today()).days
             
             if days_until_expiry <= 30:  # Notify 30 days before expiry
-                NotificationService.create_notification(
-                    recipient=document.employee.user,
-                    title="Document Expiry Alert",
-                    message=f"Your {document.get_document_type_display()} ({document.title}) will expire on {document.expiry_date}.",
-                    notification_type='document_expiry',
-                    related_object=document
-                )
+                NotificationService.save_notification(NotificationService.build_document_expiry(document))
     
     @staticmethod
     def check_daily_attendance():
@@ -171,20 +323,35 @@ class NotificationService:
         late_attendances = Attendance.objects.filter(
             date=today,
             is_late=True
-        )
+        ).select_related('employee__user')
         
-        for attendance in late_attendances:
-            NotificationService.notify_late_checkin(attendance)
+        NotificationService.bulk_create(
+            NotificationService.build_late_checkin(attendance)
+            for attendance in late_attendances.iterator(chunk_size=NOTIFICATION_BATCH_SIZE)
+        )
         
         # Check for missed check-outs (employees who checked in but didn't check out)
         employees_without_checkout = Employee.objects.filter(
             attendances__date=today,
             attendances__check_in_time__isnull=False,
             attendances__check_out_time__isnull=True
-        ).distinct()
+        ).distinct().select_related('user')
         
-        for employee in employees_without_checkout:
-            NotificationService.notify_missed_checkout(employee, today)
+        NotificationService.bulk_create(
+            NotificationService.build_missed_checkout(employee, today)
+            for employee in employees_without_checkout.iterator(chunk_size=NOTIFICATION_BATCH_SIZE)
+        )
+    
+    @staticmethod
+    def notify_expiring_documents(documents):
+        """
+        Expiry alerts for many documents in bulk; documents already alerted for
+        their current expiry date are skipped. Returns the number of new alerts.
+        """
+        return NotificationService.bulk_create(
+            NotificationService.build_document_expiry(document)
+            for document in documents.select_related('employee__user').iterator(chunk_size=NOTIFICATION_BATCH_SIZE)
+        )
     
     @staticmethod
     def check_document_expiry():
@@ -198,71 +365,62 @@ class NotificationService:
             expiry_date__gte=date.today()
         )
         
-        for document in expiring_documents:
-            NotificationService.notify_document_expiry(document)
+        return NotificationService.notify_expiring_documents(expiring_documents)
     
     @staticmethod
     def send_weekly_attendance_summary():
         """
         Send weekly attendance summary to HR
         """
-        from .models import User
-        
         end_date = date.today()
         start_date = end_date - timedelta(days=7)
         
         # Get attendance statistics
         total_employees = Employee.objects.filter(status='active').count()
-        present_employees = Attendance.objects.filter(
-            date__range=[start_date, end_date],
-            check_in_time__isnull=False
-        ).values('employee').distinct().count()
-        
-        late_employees = Attendance.objects.filter(
-            date__range=[start_date, end_date],
-            is_late=True
-        ).values('employee').distinct().count()
+        # Both counts come from one pass over the week's rows
+        week = Attendance.objects.filter(date__range=[start_date, end_date]).aggregate(
+            present=Count('employee', distinct=True, filter=Q(check_in_time__isnull=False)),
+            late=Count('employee', distinct=True, filter=Q(is_late=True)),
+        )
+        present_employees = week['present']
+        late_employees = week['late']
         
         absent_employees = total_employees - present_employees
         
+        message = f"""
+        Weekly Attendance Summary ({start_date} to {end_date}):
+        
+        Total Active Employees: {total_employees}
+        Present Employees: {present_employees}
+        Late Employees: {late_employees}
+        Absent Employees: {absent_employees}
+        
+        Attendance Rate: {(present_employees/total_employees*100):.1f}%
+        """
+        
         # Send to HR users
-        hr_users = User.objects.filter(role='hr')
-        for hr_user in hr_users:
-            message = f"""
-            Weekly Attendance Summary ({start_date} to {end_date}):
-            
-            Total Active Employees: {total_employees}
-            Present Employees: {present_employees}
-            Late Employees: {late_employees}
-            Absent Employees: {absent_employees}
-            
-            Attendance Rate: {(present_employees/total_employees*100):.1f}%
-            """
-            
-            NotificationService.create_notification(
-                recipient=hr_user,
-                title="Weekly Attendance Summary",
-                message=message.strip(),
-                notification_type='general',
-                send_email=True
-            )
+        NotificationService.fan_out(
+            User.objects.filter(role='hr'),
+            title="Weekly Attendance Summary",
+            message=message.strip(),
+            notification_type='general',
+            send_email=True,
+            dedup_window=f"weekly-summary:{end_date:%G-W%V}"
+        )
     
     @staticmethod
     def send_monthly_payroll_reminder():
         """
         Send monthly payroll reminder to HR
         """
-        from .models import User
-        
-        hr_users = User.objects.filter(role='hr')
-        for hr_user in hr_users:
-            NotificationService.create_notification(
-                recipient=hr_user,
-                title="Monthly Payroll Reminder",
-                message="It's time to process monthly payroll. Please review and approve all pending payroll records.",
-                notification_type='general',
-                send_email=True
-            )
+        NotificationService.fan_out(
+            User.objects.filter(role='hr'),
+            title="Monthly Payroll Reminder",
+            message="It's time to process monthly payroll. Please review and approve all pending payroll records.",
+            notification_type='general',
+            send_email=True,
+            dedup_window=f"payroll-reminder:{date.today():%Y-%m}"
+        )
 
 
 class NotificationScheduler:
@@ -293,6 +451,19 @@ class NotificationScheduler:
         except Exception as e:
             logger.error(f"Error in weekly notification checks: {str(e)}")
     
+    @staticmethod
+    def run_digests():
+        """
+        Merge buffered alerts into one digest per recipient
+        """
+        from .notification_digest import NotificationDigestService
+        
+        try:
+            stats = NotificationDigestService.send_digests()
+            logger.info(f"Digest run completed: {stats['digests']} digests from {stats['items']} alerts")
+        except Exception as e:
+            logger.error(f"Error in notification digests: {str(e)}")
+    
     @staticmethod
     def run_monthly_checks():
         """
@@ -0,0 +1,447 @@
+"""
+Set-based payroll engine shared by the process_payroll command and bulk views
+"""
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from decimal import Decimal
+import logging
+import time
+
+from .models import Employee, Payroll, PayrollRun, PayrollRunShard
+from .attendance_totals import AttendanceTotalsService
+from .payroll_calculator import PayrollCalculator
+
+logger = logging.getLogger(__name__)
+
+
+class PayrollRunResult:
+    """
+    Outcome of a payroll engine run
+    """
+
+    def __init__(self, start_date, end_date):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.created = []
+        self.created_employee_ids = []
+        self.skipped_employee_ids = []
+        self.timings = {}
+        self.shards = []
+
+    @property
+    def created_count(self):
+        return len(self.created_employee_ids)
+
+    @property
+    def skipped_count(self):
+        return len(self.skipped_employee_ids)
+
+    def format_timings(self):
+        return ', '.join(f'{stage}={seconds:.3f}s' for stage, seconds in self.timings.items())
+
+    def to_summary(self, label=None):
+        """
+        Picklable summary returned by shard workers
+        """
+        return {
+            'label': label,
+            'created_employee_ids': list(self.created_employee_ids),
+            'skipped_employee_ids': list(self.skipped_employee_ids),
+            'timings': dict(self.timings),
+        }
+
+    def merge(self, summary):
+        """
+        Fold a shard summary into this result
+        """
+        self.created_employee_ids.extend(summary['created_employee_ids'])
+        self.skipped_employee_ids.extend(summary['skipped_employee_ids'])
+        for stage, seconds in summary['timings'].items():
+            self.timings[stage] = self.timings.get(stage, 0) + seconds
+        self.shards.append(summary)
+
+    def load_created(self):
+        """
+        Payroll rows created by this run, loaded for notification fan-out
+        """
+        if self.created:
+            return self.created
+        return list(Payroll.objects.filter(
+            employee_id__in=self.created_employee_ids,
+            pay_period_start=self.start_date,
+            pay_period_end=self.end_date
+        ).select_related('employee__user'))
+
+
+class PayrollEngine:
+    """
+    Compute and persist payroll for many employees with a fixed number of queries
+    """
+
+    def __init__(self, start_date, end_date, created_by=None, status='draft', batch_size=1000,
+                 ignore_conflicts=False):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.created_by = created_by
+        self.status = status
+        self.batch_size = batch_size
+        # Shard workers insert with ignore_conflicts so a re-run shard cannot
+        # trip the (employee, pay_period_start, pay_period_end) unique constraint
+        self.ignore_conflicts = ignore_conflicts
+
+    def _timed(self, result, stage, started):
+        result.timings[stage] = result.timings.get(stage, 0) + (time.perf_counter() - started)
+
+    def load_attendance_totals(self, employees):
+        """
+        Work and overtime hours per employee for the period, read from the
+        pay-period accumulators plus a grouped scan of any partial edge periods
+        """
+        totals = AttendanceTotalsService.totals(employees, self.start_date, self.end_date)
+        return {
+            employee_id: (values['total_hours'], values['overtime_hours'])
+            for employee_id, values in totals.items()
+        }
+
+    def load_existing_employee_ids(self, employees):
+        """
+        Employees that already have a payroll for this exact period
+        """
+        return set(Payroll.objects.filter(
+            employee_id__in=employees.values('id'),
+            pay_period_start=self.start_date,
+            pay_period_end=self.end_date
+        ).values_list('employee_id', flat=True))
+
+    def build_payrolls(self, employees, totals, existing_ids, result):
+        """
+        Build unsaved Payroll instances with net salary computed in memory
+        """
+        payrolls = []
+        zero = (Decimal('0'), Decimal('0'))
+        for employee in employees:
+            if employee.id in existing_ids:
+                result.skipped_employee_ids.append(employee.id)
+                continue
+
+            total_hours, total_overtime = totals.get(employee.id, zero)
+            payroll = Payroll(
+                employee=employee,
+                pay_period_start=self.start_date,
+                pay_period_end=self.end_date,
+                base_salary=employee.base_salary,
+                hours_worked=total_hours,
+                overtime_hours=total_overtime,
+                deductions=Decimal('0.00'),
+                bonuses=Decimal('0.00'),
+                status=self.status,
+                created_by=self.created_by,
+            )
+            payrolls.append(payroll)
+        # bulk_create bypasses save(), so compute net salary here in one pass
+        return PayrollCalculator.apply(payrolls)
+
+    def write_payrolls(self, payrolls):
+        """
+        Insert payrolls in batches, one transaction per batch
+        """
+        for offset in range(0, len(payrolls), self.batch_size):
+            batch = payrolls[offset:offset + self.batch_size]
+            with transaction.atomic():
+                Payroll.objects.bulk_create(batch, ignore_conflicts=self.ignore_conflicts)
+
+    def load_inserted(self, payrolls):
+        """
+        The payrolls whose insert took effect. ignore_conflicts silently drops a row when
+        another writer stored the employee's payroll after load_existing_employee_ids,
+        so keep only those whose stored created_at is the one this engine stamped.
+        """
+        stored = dict(Payroll.objects.filter(
+            employee_id__in=[payroll.employee_id for payroll in payrolls],
+            pay_period_start=self.start_date,
+            pay_period_end=self.end_date
+        ).values_list('employee_id', 'created_at'))
+        return [payroll for payroll in payrolls if stored.get(payroll.employee_id) == payroll.created_at]
+
+    def run(self, employees=None):
+        """
+        Run payroll for the given employees (defaults to all active employees)
+        """
+        if employees is None:
+            employees = Employee.objects.filter(status='active')
+
+        result = PayrollRunResult(self.start_date, self.end_date)
+
+        started = time.perf_counter()
+        employee_list = list(employees.select_related('user'))
+        self._timed(result, 'load_employees', started)
+
+        started = time.perf_counter()
+        totals = self.load_attendance_totals(employees)
+        self._timed(result, 'aggregate_attendance', started)
+
+        started = time.perf_counter()
+        existing_ids = self.load_existing_employee_ids(employees)
+        self._timed(result, 'detect_existing', started)
+
+        started = time.perf_counter()
+        payrolls = self.build_payrolls(employee_list, totals, existing_ids, result)
+        self._timed(result, 'compute', started)
+
+        started = time.perf_counter()
+        self.write_payrolls(payrolls)
+        if self.ignore_conflicts:
+            inserted = self.load_inserted(payrolls)
+            inserted_ids = {payroll.employee_id for payroll in inserted}
+            result.skipped_employee_ids.extend(
+                payroll.employee_id for payroll in payrolls if payroll.employee_id not in inserted_ids
+            )
+            payrolls = inserted
+        self._timed(result, 'write', started)
+
+        result.created = [] if self.ignore_conflicts else payrolls
+        result.created_employee_ids = [payroll.employee_id for payroll in payrolls]
+        logger.info(
+            f"Payroll run {self.start_date} to {self.end_date}: created {result.created_count}, "
+            f"skipped {result.skipped_count} ({result.format_timings()})"
+        )
+        return result
+
+
+def plan_shards(employees, shard_by='department', shard_count=1):
+    """
+    Split employees into shard specs, either one per department or into contiguous id ranges
+    """
+    if shard_by == 'department':
+        department_ids = employees.order_by('department_id').values_list('department_id', flat=True).distinct()
+        return [
+            {'label': f'department:{department_id}', 'department_id': department_id}
+            for department_id in department_ids
+        ]
+
+    ids = list(employees.order_by('id').values_list('id', flat=True))
+    if not ids:
+        return []
+    shard_count = max(1, min(shard_count, len(ids)))
+    size = -(-len(ids) // shard_count)
+    return [
+        {'label': f'ids:{chunk[0]}-{chunk[-1]}', 'id_min': chunk[0], 'id_max': chunk[-1]}
+        for chunk in (ids[i:i + size] for i in range(0, len(ids), size))
+    ]
+
+
+def shard_queryset(shard):
+    """
+    Active employees belonging to a shard spec
+    """
+    employees = Employee.objects.filter(status='active')
+    if 'department_id' in shard:
+        if shard['department_id'] is None:
+            return employees.filter(department__isnull=True)
+        return employees.filter(department_id=shard['department_id'])
+    if 'id_min' in shard:
+        return employees.filter(id__gte=shard['id_min'], id__lte=shard['id_max'])
+    return employees
+
+
+@contextmanager
+def shard_transaction():
+    """
+    atomic() for one shard batch. On SQLite it opens with BEGIN IMMEDIATE, so parallel
+    shard workers queue for the write lock on the busy timeout instead of failing to
+    upgrade a read lock mid-batch. Every other transaction keeps the default deferred mode.
+    """
+    connection = transaction.get_connection()
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        with transaction.atomic():
+            yield
+        return
+    # transaction_mode is read when atomic() issues BEGIN, and reset on every connect
+    connection.ensure_connection()
+    mode, connection.transaction_mode = connection.transaction_mode, 'IMMEDIATE'
+    try:
+        with transaction.atomic():
+            connection.transaction_mode = mode
+            yield
+    finally:
+        connection.transaction_mode = mode
+
+
+def _init_worker():
+    """
+    Give each worker process its own database connections
+    """
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def execute_shard(shard_id, notify=True):
+    """
+    Process a shard batch by batch. Each batch commits its payrolls and their
+    notifications together with the shard checkpoint, so a resumed shard starts after
+    the last committed batch without re-reading attendance for employees already done.
+    """
+    from .notifications import NotificationService
+
+    shard = PayrollRunShard.objects.select_related('run__created_by').get(id=shard_id)
+    run = shard.run
+    engine = PayrollEngine(
+        run.pay_period_start, run.pay_period_end, created_by=run.created_by,
+        batch_size=run.batch_size, ignore_conflicts=True,
+    )
+    result = PayrollRunResult(run.pay_period_start, run.pay_period_end)
+    employees = shard_queryset(shard.spec).order_by('id')
+    cursor = shard.last_employee_id or 0
+    status, error = 'completed', ''
+
+    # Claim the shard so a second executor of the same run cannot process it twice
+    if not PayrollRunShard.objects.filter(id=shard.id, status__in=['pending', 'failed', 'cancelled']).update(
+        status='running', error=''
+    ):
+        logger.warning(f"Payroll run {run.id} shard {shard.label} is already claimed, skipping")
+        summary = result.to_summary(shard.label)
+        summary['status'] = PayrollRunShard.objects.get(id=shard.id).status
+        return summary
+    try:
+        while True:
+            if PayrollRun.objects.filter(id=run.id, status='cancelling').exists():
+                status = 'cancelled'
+                break
+
+            batch_ids = list(employees.filter(id__gt=cursor).values_list('id', flat=True)[:run.batch_size])
+            if not batch_ids:
+                break
+
+            with shard_transaction():
+                batch = engine.run(Employee.objects.filter(id__in=batch_ids))
+                PayrollRunShard.objects.filter(id=shard.id).update(
+                    last_employee_id=batch_ids[-1],
+                    batches_completed=F('batches_completed') + 1,
+                    created_count=F('created_count') + batch.created_count,
+                    skipped_count=F('skipped_count') + batch.skipped_count,
+                )
+                PayrollRun.objects.filter(id=run.id).update(
+                    processed_employees=F('processed_employees') + len(batch_ids),
+                    created_count=F('created_count') + batch.created_count,
+                    skipped_count=F('skipped_count') + batch.skipped_count,
+                    heartbeat_at=timezone.now(),
+                )
+                if notify:
+                    # Queued in the email outbox with the checkpoint, so neither commits without the other
+                    NotificationService.notify_payrolls_ready(batch.load_created())
+            cursor = batch_ids[-1]
+            result.merge(batch.to_summary())
+    except Exception as e:
+        logger.exception(f"Payroll run {run.id} shard {shard.label} failed")
+        status, error = 'failed', str(e)
+
+    PayrollRunShard.objects.filter(id=shard.id).update(status=status, error=error)
+    summary = result.to_summary(shard.label)
+    summary['status'] = status
+    return summary
+
+
+def run_payroll_shard(shard_id, notify=True):
+    """
+    Worker process entry point for one shard
+    """
+    try:
+        return execute_shard(shard_id, notify)
+    finally:
+        connections.close_all()
+
+
+class PayrollRunner:
+    """
+    Create, execute, resume and cancel checkpointed payroll runs
+    """
+
+    def __init__(self, run):
+        self.run = run
+
+    @classmethod
+    def create(cls, start_date, end_date, workers=1, shard_by='department', batch_size=1000, created_by=None):
+        employees = Employee.objects.filter(status='active')
+        shards = plan_shards(employees, shard_by, workers) if workers > 1 else [{'label': 'all'}]
+        with transaction.atomic():
+            run = PayrollRun.objects.create(
+                pay_period_start=start_date,
+                pay_period_end=end_date,
+                workers=workers,
+                shard_by=shard_by,
+                batch_size=batch_size,
+                total_employees=employees.count(),
+                created_by=created_by,
+            )
+            PayrollRunShard.objects.bulk_create([
+                PayrollRunShard(run=run, label=shard['label'], spec=shard) for shard in shards
+            ])
+        return cls(run)
+
+    @staticmethod
+    def cancel(run_id):
+        """
+        Ask a running run to stop after its current batch; idle runs are cancelled at once
+        """
+        # Idle runs, and running ones abandoned by a dead worker, have nobody to ask
+        if PayrollRun.objects.filter(PayrollRun.resumable_filter(), id=run_id).exclude(status='cancelled').update(
+            status='cancelled', finished_at=timezone.now()
+        ):
+            return 'cancelled'
+        if PayrollRun.objects.filter(id=run_id, status='running').update(status='cancelling'):
+            return 'cancelling'
+        return None
+
+    def execute(self, notify=True):
+        """
+        Run every shard that has not completed yet and merge their summaries.
+        Raises ValueError if another worker is still executing the run.
+        """
+        run = self.run
+        started = time.perf_counter()
+        result = PayrollRunResult(run.pay_period_start, run.pay_period_end)
+        if not PayrollRun.objects.filter(PayrollRun.resumable_filter(), id=run.id).update(
+            status='running', error='', finished_at=None,
+            started_at=run.started_at or timezone.now(), heartbeat_at=timezone.now(),
+        ):
+            raise ValueError(f"Payroll run {run.id} is being processed by another worker")
+        # Shards still marked running were left behind by the worker that abandoned the run
+        run.shards.filter(status='running').update(status='failed', error='Worker stopped responding')
+        shard_ids = list(run.shards.exclude(status='completed').values_list('id', flat=True))
+
+        if run.workers > 1 and len(shard_ids) > 1:
+            # Forked workers must not share the parent's open connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=run.workers, initializer=_init_worker) as pool:
+                futures = [pool.submit(run_payroll_shard, shard_id, notify) for shard_id in shard_ids]
+                for future in futures:
+                    result.merge(future.result())
+        else:
+            for shard_id in shard_ids:
+                result.merge(execute_shard(shard_id, notify))
+
+        statuses = set(run.shards.values_list('status', flat=True))
+        if statuses <= {'completed'}:
+            status = 'completed'
+        elif 'failed' in statuses:
+            status = 'failed'
+        else:
+            status = 'cancelled'
+        errors = [shard['label'] for shard in result.shards if shard.get('status') == 'failed']
+        PayrollRun.objects.filter(id=run.id).update(
+            status=status,
+            finished_at=timezone.now(),
+            error=f"Failed shards: {', '.join(errors)}" if errors else '',
+        )
+        run.refresh_from_db()
+
+        result.timings['wall'] = time.perf_counter() - started
+        logger.info(
+            f"Payroll run {run.id} {run.pay_period_start} to {run.pay_period_end} {status}: "
+            f"created {result.created_count}, skipped {result.skipped_count} over {len(shard_ids)} shards"
+        )
+        return result
@@ -0,0 +1,144 @@
+"""
+Retroactive payroll recalculation driven by tracked attendance changes
+"""
+from django.db import transaction
+from django.utils import timezone
+import logging
+
+from .models import AttendanceChange, Payroll
+from .attendance_totals import AttendanceTotalsService, HOUR_FIELDS
+from .payroll_calculator import PayrollCalculator
+
+logger = logging.getLogger(__name__)
+
+# Payrolls still open for edits are recalculated; settled ones are only flagged
+RECALCULABLE_STATUSES = ('draft', 'pending')
+REVIEW_STATUSES = ('approved', 'paid')
+
+
+class PayrollRecalculationService:
+    """
+    Track attendance corrections and recompute only the affected payrolls
+    """
+
+    @staticmethod
+    def record_changes(pairs):
+        """
+        Record (employee_id, date) pairs; re-recording an existing pair bumps its timestamp
+        """
+        now = timezone.now()
+        changes = [AttendanceChange(employee_id=employee_id, date=day, recorded_at=now) for employee_id, day in pairs]
+        if changes:
+            AttendanceChange.objects.bulk_create(
+                changes,
+                update_conflicts=True,
+                unique_fields=['employee', 'date'],
+                update_fields=['recorded_at'],
+            )
+
+    @staticmethod
+    def record_attendance_change(old, new):
+        """
+        Record the pairs touched by a single attendance write if payable hours moved
+        """
+        if old is not None and new is not None and old[:2] == new[:2]:
+            if all(old[2][field] == new[2][field] for field in HOUR_FIELDS):
+                return
+        PayrollRecalculationService.record_changes(
+            {contribution[:2] for contribution in (old, new) if contribution is not None}
+        )
+
+    @staticmethod
+    def affected_payrolls(pairs):
+        """
+        Payrolls whose period covers any of the changed (employee_id, date) pairs
+        """
+        dates_by_employee = {}
+        for employee_id, day in pairs:
+            dates_by_employee.setdefault(employee_id, []).append(day)
+        if not dates_by_employee:
+            return []
+
+        all_dates = [day for days in dates_by_employee.values() for day in days]
+        candidates = Payroll.objects.filter(
+            employee_id__in=list(dates_by_employee),
+            pay_period_start__lte=max(all_dates),
+            pay_period_end__gte=min(all_dates),
+        ).select_related('employee')
+
+        return [
+            payroll for payroll in candidates
+            if any(payroll.pay_period_start <= day <= payroll.pay_period_end
+                   for day in dates_by_employee[payroll.employee_id])
+        ]
+
+    @staticmethod
+    def recalculate(payrolls):
+        """
+        Recompute hours and net salary for draft payrolls in bulk
+        """
+        by_period = {}
+        for payroll in payrolls:
+            by_period.setdefault((payroll.pay_period_start, payroll.pay_period_end), []).append(payroll)
+
+        now = timezone.now()
+        for (start_date, end_date), period_payrolls in by_period.items():
+            totals = AttendanceTotalsService.totals(
+                [payroll.employee_id for payroll in period_payrolls], start_date, end_date
+            )
+            for payroll in period_payrolls:
+                values = totals.get(payroll.employee_id, {})
+                payroll.hours_worked = values.get('total_hours', 0)
+                payroll.overtime_hours = values.get('overtime_hours', 0)
+                payroll.updated_at = now
+            PayrollCalculator.apply(period_payrolls)
+
+        Payroll.objects.bulk_update(
+            payrolls, ['hours_worked', 'overtime_hours', 'net_salary', 'updated_at'], batch_size=1000
+        )
+        return len(payrolls)
+
+    @staticmethod
+    def process_changes(batch_size=5000):
+        """
+        Drain recorded changes: recalculate affected draft payrolls and flag
+        approved or paid ones for review. Returns (recalculated, flagged, changes).
+        """
+        recalculated = flagged = processed = 0
+        while True:
+            snapshot = timezone.now()
+            changes = list(
+                AttendanceChange.objects.filter(recorded_at__lte=snapshot).order_by('recorded_at', 'id').values_list(
+                    'id', 'employee_id', 'date'
+                )[:batch_size]
+            )
+            if not changes:
+                break
+
+            payrolls = PayrollRecalculationService.affected_payrolls(
+                (employee_id, day) for _, employee_id, day in changes
+            )
+            open_payrolls = [payroll for payroll in payrolls if payroll.status in RECALCULABLE_STATUSES]
+            closed_ids = [payroll.id for payroll in payrolls if payroll.status in REVIEW_STATUSES]
+
+            with transaction.atomic():
+                if open_payrolls:
+                    recalculated += PayrollRecalculationService.recalculate(open_payrolls)
+                if closed_ids:
+                    flagged += Payroll.objects.filter(id__in=closed_ids, needs_review=False).update(
+                        needs_review=True, updated_at=timezone.now()
+                    )
+                # A pair re-recorded while we worked has a newer timestamp and stays queued
+                AttendanceChange.objects.filter(
+                    id__in=[change_id for change_id, _, _ in changes], recorded_at__lte=snapshot
+                ).delete()
+            processed += len(changes)
+
+            if len(changes) < batch_size:
+                break
+
+        logger.info(
+            f"Processed {processed} attendance changes: recalculated {recalculated} payrolls, "
+            f"flagged {flagged} for review"
+        )
+        return recalculated, flagged, processed
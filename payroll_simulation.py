@@ -0,0 +1,169 @@
+"""
+In-memory payroll simulation for dry runs and what-if reports
+"""
+from django.db.models import Count, Sum
+from datetime import timedelta
+from decimal import Decimal
+import logging
+import time
+
+from .models import Employee, Payroll
+from .payroll_engine import PayrollEngine, PayrollRunResult
+from .payroll_calculator import to_cents
+
+logger = logging.getLogger(__name__)
+
+SPEND_FIELDS = ('base_salary', 'hours_worked', 'overtime_hours', 'net_salary')
+
+
+def _empty_spend():
+    spend = {field: Decimal('0') for field in SPEND_FIELDS}
+    spend['employees'] = 0
+    return spend
+
+
+class PayrollSimulator:
+    """
+    Run the payroll engine for a period without writing anything
+    """
+
+    def __init__(self, start_date, end_date):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.engine = PayrollEngine(start_date, end_date)
+
+    def previous_period(self):
+        """
+        The period of the same length ending the day before this one starts
+        """
+        length = (self.end_date - self.start_date).days + 1
+        return self.start_date - timedelta(days=length), self.start_date - timedelta(days=1)
+
+    def compute(self, employees):
+        """
+        Unsaved payrolls for every employee, including those already paid for this period
+        """
+        employee_list = list(employees.select_related('department'))
+        totals = self.engine.load_attendance_totals(employees)
+        result = PayrollRunResult(self.start_date, self.end_date)
+        return self.engine.build_payrolls(employee_list, totals, set(), result)
+
+    def existing_payrolls(self, employees):
+        return {
+            row['employee_id']: row
+            for row in Payroll.objects.filter(
+                employee_id__in=employees.values('id'),
+                pay_period_start=self.start_date,
+                pay_period_end=self.end_date,
+            ).values('id', 'employee_id', 'status', *SPEND_FIELDS)
+        }
+
+    def diff(self, payrolls, existing):
+        """
+        Compare simulated payrolls with the rows already stored for the period
+        """
+        changes = []
+        new = unchanged = 0
+        simulated_ids = set()
+        for payroll in payrolls:
+            simulated_ids.add(payroll.employee_id)
+            stored = existing.get(payroll.employee_id)
+            if stored is None:
+                new += 1
+                continue
+            deltas = {
+                field: getattr(payroll, field) - stored[field]
+                for field in SPEND_FIELDS
+                if getattr(payroll, field) != stored[field]
+            }
+            if not deltas:
+                unchanged += 1
+                continue
+            changes.append({
+                'payroll_id': stored['id'],
+                'employee_id': payroll.employee_id,
+                'status': stored['status'],
+                'stored_net_salary': stored['net_salary'],
+                'simulated_net_salary': payroll.net_salary,
+                'deltas': deltas,
+            })
+        return {
+            'new': new,
+            'changed': len(changes),
+            'unchanged': unchanged,
+            # Stored rows for employees outside the simulation, e.g. since deactivated
+            'not_simulated': sorted(set(existing) - simulated_ids),
+            'changes': changes,
+        }
+
+    def previous_spend(self, employees):
+        """
+        Stored payroll spend per department for the previous period
+        """
+        previous_start, previous_end = self.previous_period()
+        rows = Payroll.objects.filter(
+            employee_id__in=employees.values('id'),
+            pay_period_start__gte=previous_start,
+            pay_period_end__lte=previous_end,
+        ).values('employee__department__name').annotate(
+            employees=Count('employee_id', distinct=True),
+            **{field: Sum(field) for field in SPEND_FIELDS}
+        ).order_by()
+
+        total = _empty_spend()
+        by_department = {}
+        for row in rows:
+            # Database sums can carry float noise on SQLite; stored values are whole cents
+            spend = {field: to_cents(Decimal(str(row[field] or 0))) for field in SPEND_FIELDS}
+            spend['employees'] = row['employees']
+            by_department[row['employee__department__name'] or 'Unassigned'] = spend
+            for field in (*SPEND_FIELDS, 'employees'):
+                total[field] += spend[field]
+        return {'start_date': previous_start, 'end_date': previous_end, 'totals': total, 'by_department': by_department}
+
+    def simulate(self, employees=None):
+        """
+        Totals, per-department spend, the diff against stored rows and the
+        change against the previous period, all computed in memory
+        """
+        if employees is None:
+            employees = Employee.objects.filter(status='active')
+
+        started = time.perf_counter()
+        payrolls = self.compute(employees)
+
+        totals = _empty_spend()
+        by_department = {}
+        for payroll in payrolls:
+            department = payroll.employee.department
+            name = department.name if department else 'Unassigned'
+            spend = by_department.get(name)
+            if spend is None:
+                spend = by_department[name] = _empty_spend()
+                spend['budget'] = department.budget if department else None
+            for target in (spend, totals):
+                target['employees'] += 1
+                for field in SPEND_FIELDS:
+                    target[field] += getattr(payroll, field)
+
+        previous = self.previous_spend(employees)
+        previous['net_salary_change'] = totals['net_salary'] - previous['totals']['net_salary']
+        for name, spend in by_department.items():
+            before = previous['by_department'].get(name)
+            spend['previous_net_salary'] = before['net_salary'] if before else Decimal('0')
+            spend['net_salary_change'] = spend['net_salary'] - spend['previous_net_salary']
+
+        simulation = {
+            'start_date': self.start_date,
+            'end_date': self.end_date,
+            'totals': totals,
+            'by_department': dict(sorted(by_department.items())),
+            'diff': self.diff(payrolls, self.existing_payrolls(employees)),
+            'previous_period': previous,
+            'elapsed_seconds': round(time.perf_counter() - started, 3),
+        }
+        logger.info(
+            f"Simulated payroll {self.start_date} to {self.end_date} for {totals['employees']} employees: "
+            f"net {totals['net_salary']} in {simulation['elapsed_seconds']}s"
+        )
+        return simulation
@@ -0,0 +1,97 @@
+"""
+Bulk payroll status transitions
+"""
+from django.db import transaction
+from django.utils import timezone
+import logging
+
+from .models import Payroll, Notification, AuditLog
+from .notification_inbox import UnreadCounter
+
+logger = logging.getLogger(__name__)
+
+# action: (allowed source statuses, target status)
+TRANSITIONS = {
+    'approve': (('draft', 'pending'), 'approved'),
+    'reject': (('draft', 'pending'), 'rejected'),
+    'mark_paid': (('approved',), 'paid'),
+}
+
+AUDIT_ACTIONS = {
+    'approve': 'approve_payroll',
+    'reject': 'reject_payroll',
+    'mark_paid': 'mark_payroll_paid',
+}
+
+NOTIFICATIONS = {
+    'approve': ('Payroll Approved', 'payroll_approved', 'has been approved.'),
+    'reject': ('Payroll Rejected', 'payroll_rejected', 'has been rejected.'),
+    'mark_paid': ('Payroll Paid', 'payroll_paid', 'has been paid.'),
+}
+
+
+class PayrollTransitionService:
+    """
+    Move many payrolls between statuses with one conditional UPDATE
+    """
+
+    @staticmethod
+    def transition(payroll_ids, action, user=None, reason='', batch_size=1000):
+        """
+        Apply a transition to every payroll currently in a valid source status.
+        Returns a dict of per-id outcomes: the new status, 'invalid_status' or 'not_found'.
+        """
+        if action not in TRANSITIONS:
+            raise ValueError(f"Unknown payroll transition: {action}")
+        sources, target = TRANSITIONS[action]
+        ids = sorted({int(payroll_id) for payroll_id in payroll_ids})
+        now = timezone.now()
+
+        changes = {'status': target, 'updated_at': now}
+        if action in ('approve', 'reject'):
+            changes.update(approved_by=user, approved_at=now)
+
+        with transaction.atomic():
+            # Lock the eligible rows so the UPDATE below touches exactly these
+            rows = list(
+                Payroll.objects.select_for_update().filter(id__in=ids).values_list(
+                    'id', 'status', 'employee__user_id', 'pay_period_start', 'pay_period_end'
+                )
+            )
+            eligible = [row for row in rows if row[1] in sources]
+            updated = Payroll.objects.filter(
+                id__in=[row[0] for row in eligible], status__in=sources
+            ).update(**changes)
+
+            title, notification_type, verb = NOTIFICATIONS[action]
+            suffix = f' Reason: {reason}' if reason else ''
+            notifications = Notification.objects.bulk_create([
+                Notification(
+                    recipient_id=user_id,
+                    title=title,
+                    message=f'Your payroll for {start} to {end} {verb}{suffix}',
+                    notification_type=notification_type,
+                    related_object_id=payroll_id,
+                    related_object_type='payroll',
+                )
+                for payroll_id, _, user_id, start, end in eligible
+            ], batch_size=batch_size)
+            UnreadCounter.created(notifications)
+            AuditLog.objects.bulk_create([
+                AuditLog(
+                    user=user,
+                    action=AUDIT_ACTIONS[action],
+                    model_name='Payroll',
+                    object_id=payroll_id,
+                    object_repr=f'Payroll {payroll_id} ({start} to {end})',
+                    changes=f'Status changed from {status} to {target}.{suffix}',
+                )
+                for payroll_id, status, _, start, end in eligible
+            ], batch_size=batch_size)
+
+        outcomes = {payroll_id: 'not_found' for payroll_id in ids}
+        for payroll_id, status, *_ in rows:
+            outcomes[payroll_id] = target if status in sources else 'invalid_status'
+
+        logger.info(f"Payroll {action}: {updated} of {len(ids)} payrolls moved to {target}")
+        return outcomes
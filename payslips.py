@@ -0,0 +1,216 @@
+"""
+Payslip rendering pipeline with a content-addressed artifact cache
+"""
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import logging
+
+from .models import Payroll, PayslipBatch, Notification
+from .notification_inbox import UnreadCounter
+
+logger = logging.getLogger(__name__)
+
+PAYSLIP_TEMPLATE = 'hr/payroll/payslip.html'
+# Bump when the template or context changes so cached payslips are re-rendered
+PAYSLIP_TEMPLATE_VERSION = '2'
+
+try:
+    from weasyprint import HTML
+    PAYSLIP_FORMAT = 'pdf'
+except ImportError:  # PDF rendering is optional; fall back to storing the HTML
+    HTML = None
+    PAYSLIP_FORMAT = 'html'
+
+
+def payslip_context(payroll):
+    """
+    Template context for a payroll, as plain strings so it hashes deterministically.
+    Workflow state such as the status stays out, so marking a payroll paid keeps its payslip.
+    """
+    employee = payroll.employee
+    return {
+        'payroll_id': payroll.id,
+        'employee_name': employee.user.get_full_name(),
+        'employee_id': employee.employee_id,
+        'department': employee.department.name if employee.department else '',
+        'position': employee.position.title if employee.position else '',
+        'pay_period_start': str(payroll.pay_period_start),
+        'pay_period_end': str(payroll.pay_period_end),
+        'base_salary': str(payroll.base_salary),
+        'hours_worked': str(payroll.hours_worked),
+        'overtime_hours': str(payroll.overtime_hours),
+        'bonuses': str(payroll.bonuses),
+        'deductions': str(payroll.deductions),
+        'net_salary': str(payroll.net_salary),
+    }
+
+
+def payslip_hash(context):
+    """
+    Content hash of everything that goes into a payslip document
+    """
+    payload = json.dumps(
+        {'template': PAYSLIP_TEMPLATE_VERSION, 'format': PAYSLIP_FORMAT, 'context': context},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def payslip_path(content_hash):
+    return f'payslips/{content_hash[:2]}/{content_hash}.{PAYSLIP_FORMAT}'
+
+
+def render_payslip(context):
+    html = render_to_string(PAYSLIP_TEMPLATE, context)
+    if HTML is not None:
+        return HTML(string=html).write_pdf()
+    return html.encode('utf-8')
+
+
+def render_payslip_chunk(payroll_ids):
+    """
+    Render a chunk of payslips, skipping any whose content hash is already stored.
+    Runs inside worker processes and returns picklable outcomes.
+    """
+    outcomes = []
+    payrolls = Payroll.objects.filter(id__in=payroll_ids).select_related(
+        'employee__user', 'employee__department', 'employee__position'
+    )
+    for payroll in payrolls:
+        try:
+            context = payslip_context(payroll)
+            content_hash = payslip_hash(context)
+            path = payslip_path(content_hash)
+            cached = default_storage.exists(path)
+            if not cached:
+                default_storage.save(path, ContentFile(render_payslip(context)))
+            outcomes.append({'id': payroll.id, 'hash': content_hash, 'path': path, 'cached': cached})
+        except Exception as e:
+            logger.error(f"Failed to render payslip for payroll {payroll.id}: {str(e)}")
+            outcomes.append({'id': payroll.id, 'error': str(e)})
+    return outcomes
+
+
+def _init_worker():
+    """
+    Give each worker process its own database connections
+    """
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def _render_in_worker(payroll_ids):
+    try:
+        return render_payslip_chunk(payroll_ids)
+    finally:
+        connections.close_all()
+
+
+class PayslipService:
+    """
+    Queue payslip batches and render them with a pool of worker processes
+    """
+
+    @staticmethod
+    def enqueue(payroll_ids, requested_by=None):
+        """
+        Queue approved payrolls for rendering and return the batch
+        """
+        ids = list(Payroll.objects.filter(id__in=payroll_ids, status='approved').values_list('id', flat=True))
+        return PayslipBatch.objects.create(payroll_ids=ids, total=len(ids), requested_by=requested_by)
+
+    @staticmethod
+    def claim_next():
+        """
+        Atomically move the oldest claimable batch to running. A batch abandoned by a dead
+        worker starts over; payslips it already rendered come back from the cache.
+        """
+        claimable = PayslipBatch.objects.filter(PayslipBatch.claimable_filter())
+        for batch_id in claimable.order_by('created_at').values_list('id', flat=True)[:5]:
+            now = timezone.now()
+            if claimable.filter(id=batch_id).update(
+                status='running', started_at=now, heartbeat_at=now, rendered=0, cached=0, failed=0, error='',
+            ):
+                return PayslipBatch.objects.get(id=batch_id)
+        return None
+
+    @staticmethod
+    def record_outcomes(batch, outcomes):
+        """
+        Persist one chunk of outcomes and advance batch progress
+        """
+        done = [outcome for outcome in outcomes if 'error' not in outcome]
+        failed = len(outcomes) - len(done)
+        payrolls = Payroll.objects.filter(id__in=[outcome['id'] for outcome in done]).select_related('employee')
+        first_time = []
+        by_id = {outcome['id']: outcome for outcome in done}
+        for payroll in payrolls:
+            if not payroll.payslip_generated:
+                first_time.append(payroll)
+            payroll.payslip_hash = by_id[payroll.id]['hash']
+            payroll.payslip_file = by_id[payroll.id]['path']
+            payroll.payslip_generated = True
+
+        with transaction.atomic():
+            Payroll.objects.bulk_update(payrolls, ['payslip_hash', 'payslip_file', 'payslip_generated'])
+            notifications = Notification.objects.bulk_create([
+                Notification(
+                    recipient_id=payroll.employee.user_id,
+                    title='Payslip Available',
+                    message=f'Your payslip for {payroll.pay_period_start} to {payroll.pay_period_end} is now available.',
+                    notification_type='payslip_available',
+                    related_object_id=payroll.id,
+                    related_object_type='payroll',
+                )
+                for payroll in first_time
+            ])
+            UnreadCounter.created(notifications)
+            PayslipBatch.objects.filter(id=batch.id).update(
+                rendered=F('rendered') + sum(1 for outcome in done if not outcome['cached']),
+                cached=F('cached') + sum(1 for outcome in done if outcome['cached']),
+                failed=F('failed') + failed,
+                heartbeat_at=timezone.now(),
+            )
+
+    @staticmethod
+    def process_batch(batch, workers=4, chunk_size=200):
+        ids = list(batch.payroll_ids)
+        chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+        try:
+            if workers > 1 and len(chunks) > 1:
+                # Forked workers must not share the parent's open connections
+                connections.close_all()
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                    for outcomes in pool.map(_render_in_worker, chunks):
+                        PayslipService.record_outcomes(batch, outcomes)
+            else:
+                for chunk in chunks:
+                    PayslipService.record_outcomes(batch, render_payslip_chunk(chunk))
+            status, error = 'completed', ''
+        except Exception as e:
+            logger.exception(f"Payslip batch {batch.id} failed")
+            status, error = 'failed', str(e)
+
+        PayslipBatch.objects.filter(id=batch.id).update(status=status, error=error, finished_at=timezone.now())
+        batch.refresh_from_db()
+        return batch
+
+    @staticmethod
+    def process_queued(workers=4, chunk_size=200):
+        """
+        Drain the queue, returning the processed batches
+        """
+        processed = []
+        while True:
+            batch = PayslipService.claim_next()
+            if batch is None:
+                return processed
+            processed.append(PayslipService.process_batch(batch, workers, chunk_size))
@@ -0,0 +1,192 @@
+"""
+Live presence board: one in-memory map of today's check-ins per process,
+fanned out to server-sent event streams
+"""
+from django.conf import settings
+from django.utils import timezone
+from asgiref.sync import sync_to_async
+from datetime import timedelta
+import asyncio
+import json
+import logging
+
+from .models import Attendance
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_FIELDS = (
+    'employee_id', 'employee__employee_id', 'employee__user__first_name', 'employee__user__last_name',
+    'check_in_time', 'check_out_time', 'is_absent', 'updated_at',
+)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def presence_entry(row):
+    """Board entry for one attendance values() row"""
+    if row['is_absent']:
+        status = 'absent'
+    elif row['check_out_time']:
+        status = 'out'
+    elif row['check_in_time']:
+        status = 'in'
+    else:
+        status = 'unknown'
+    return {
+        'id': row['employee_id'],
+        'employee_id': row['employee__employee_id'],
+        'name': f"{row['employee__user__first_name']} {row['employee__user__last_name']}".strip(),
+        'status': status,
+        'check_in': row['check_in_time'].isoformat() if row['check_in_time'] else None,
+        'check_out': row['check_out_time'].isoformat() if row['check_out_time'] else None,
+    }
+
+
+class PresenceBoard:
+    """
+    Today's presence per employee, shared by every stream in the process.
+    A single poller reads only rows updated since its last pass, diffs them
+    against the map and pushes the changed entries to each subscriber queue.
+    """
+
+    def __init__(self):
+        self.day = None
+        self.entries = {}
+        self.cursor = None
+        # (attendance id, updated_at) of rows read within the overlap window
+        self.seen = set()
+        self.subscribers = set()
+        self.poller = None
+        self.loop = None
+        self.wake = None
+
+    def _refresh(self):
+        """
+        Bring the map up to date. Returns ('snapshot', entries) when the day rolled
+        over and the map was reloaded, otherwise ('delta', changed entries).
+        """
+        today = timezone.localdate()
+        overlap = timedelta(seconds=_setting('PRESENCE_POLL_OVERLAP_SECONDS', 30))
+        rows = Attendance.objects.filter(date=today)
+        reset = today != self.day
+        if reset:
+            self.day, self.entries, self.cursor, self.seen = today, {}, None, set()
+        elif self.cursor is not None:
+            # updated_at is stamped before the write commits, so a slow transaction can land
+            # behind the cursor: re-read an overlap window and skip the row versions already seen
+            rows = rows.filter(updated_at__gte=self.cursor - overlap)
+
+        changed = []
+        for row in rows.order_by('updated_at').values('id', *PRESENCE_FIELDS):
+            version = (row['id'], row['updated_at'])
+            if version in self.seen:
+                continue
+            self.seen.add(version)
+            entry = presence_entry(row)
+            if self.entries.get(entry['id']) != entry:
+                self.entries[entry['id']] = entry
+                changed.append(entry)
+            self.cursor = max(self.cursor or row['updated_at'], row['updated_at'])
+        if self.cursor is not None:
+            self.seen = {version for version in self.seen if version[1] >= self.cursor - overlap}
+        if reset:
+            return 'snapshot', list(self.entries.values())
+        return 'delta', changed
+
+    def _broadcast(self, event, entries):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait((event, entries))
+            except asyncio.QueueFull:
+                # A stalled client is dropped; it reconnects and starts from a fresh snapshot
+                self.subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    def _snapshot(self):
+        event, entries = self._refresh()
+        return event, entries, list(self.entries.values())
+
+    async def _poll(self):
+        interval = _setting('PRESENCE_POLL_SECONDS', 2)
+        try:
+            while self.subscribers:
+                try:
+                    await asyncio.wait_for(self.wake.wait(), timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
+                self.wake.clear()
+                try:
+                    event, entries = await sync_to_async(self._refresh)()
+                except Exception as e:
+                    logger.error(f"Presence board refresh failed: {str(e)}")
+                    continue
+                if entries or event == 'snapshot':
+                    self._broadcast(event, entries)
+        finally:
+            self.poller = None
+
+    async def subscribe(self):
+        """
+        Register a stream. Returns its queue and the current snapshot.
+        """
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop, self.wake, self.poller = loop, asyncio.Event(), None
+        # The map is only touched from the ORM thread, so the snapshot is copied there too
+        if self.poller is not None and self.day == timezone.localdate():
+            # A running poller keeps the map at most one interval behind; no query needed
+            snapshot = await sync_to_async(lambda: list(self.entries.values()))()
+        else:
+            event, entries, snapshot = await sync_to_async(self._snapshot)()
+            if entries or event == 'snapshot':
+                # Changes picked up here would otherwise never reach the streams already open
+                self._broadcast(event, entries)
+        queue = asyncio.Queue(maxsize=_setting('PRESENCE_QUEUE_SIZE', 1000))
+        self.subscribers.add(queue)
+        if self.poller is None:
+            self.poller = loop.create_task(self._poll())
+        return queue, snapshot
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def notify(self):
+        """
+        Wake the poller now; safe to call from the sync threads that ingest punches
+        """
+        if self.loop is not None and self.wake is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.wake.set)
+
+
+presence_board = PresenceBoard()
+
+
+def sse_message(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def presence_events():
+    """
+    Server-sent event stream: a snapshot, then deltas as attendance changes,
+    with comment heartbeats so proxies keep the connection open
+    """
+    queue, snapshot = await presence_board.subscribe()
+    heartbeat = _setting('PRESENCE_HEARTBEAT_SECONDS', 15)
+    try:
+        yield sse_message('snapshot', snapshot)
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            if item is None:
+                return
+            event, entries = item
+            yield sse_message(event, entries)
+    finally:
+        presence_board.unsubscribe(queue)
@@ -0,0 +1,32 @@
+"""
+Management command to build queued export jobs
+"""
+from django.core.management.base import BaseCommand
+import time
+
+from hr.export_jobs import ExportJobService
+
+
+class Command(BaseCommand):
+    help = 'Build queued CSV export jobs and store their files for download'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll',
+            type=int,
+            default=0,
+            help='Keep running and check the queue every N seconds',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            for job in ExportJobService.process_queued():
+                if job.status == 'completed':
+                    self.stdout.write(self.style.SUCCESS(
+                        f'Export #{job.id} {job.kind}: {job.rows_written} rows, {job.file_size} bytes in {job.file_path}'
+                    ))
+                else:
+                    self.stdout.write(self.style.ERROR(f'Export #{job.id} {job.kind} failed: {job.error}'))
+            if not options['poll']:
+                break
+            time.sleep(options['poll'])
@@ -1,13 +1,12 @@
 """
 Management command to process payroll
 """
-from django.core.management.base import BaseCommand
-from django.utils import timezone
+from django.core.management.base import BaseCommand, CommandError
 from datetime import date, timedelta
-from decimal import Decimal
 
-from hr.models import Employee, Payroll, Attendance
-from hr.notifications import NotificationService
+from hr.models import PayrollRun
+from hr.payroll_engine import PayrollRunner
+from hr.payroll_simulation import PayrollSimulator
 
 
 class Command(BaseCommand):
@@ -31,74 +30,178 @@ class Command(BaseCommand):
             type=str,
             help='End date for payroll period (YYYY-MM-DD)',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker processes (1 runs in-process)',
+        )
+        parser.add_argument(
+            '--shard-by',
+            type=str,
+            choices=['department', 'id'],
+            default='department',
+            help='How to split employees across workers',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Employees per committed batch (one checkpoint per batch)',
+        )
+        parser.add_argument(
+            '--resume',
+            type=int,
+            metavar='RUN_ID',
+            help='Resume an interrupted payroll run from its last committed batch',
+        )
+        parser.add_argument(
+            '--cancel',
+            type=int,
+            metavar='RUN_ID',
+            help='Cancel a payroll run after its current batch',
+        )
+        parser.add_argument(
+            '--status',
+            type=int,
+            metavar='RUN_ID',
+            help='Show progress of a payroll run',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Simulate the run in memory and report totals without writing payrolls',
+        )
 
     def handle(self, *args, **options):
-        period = options['period']
-        start_date_str = options.get('start_date')
-        end_date_str = options.get('end_date')
+        if options.get('status'):
+            return self.show_status(options['status'])
         
-        if start_date_str and end_date_str:
-            start_date = date.fromisoformat(start_date_str)
-            end_date = date.fromisoformat(end_date_str)
+        if options.get('cancel'):
+            outcome = PayrollRunner.cancel(options['cancel'])
+            if outcome is None:
+                raise CommandError(f"Payroll run {options['cancel']} cannot be cancelled.")
+            self.stdout.write(self.style.SUCCESS(f"Payroll run {options['cancel']} {outcome}."))
+            return
+        
+        if options['dry_run']:
+            start_date, end_date = self.get_period_dates(
+                options['period'], options.get('start_date'), options.get('end_date')
+            )
+            return self.show_simulation(PayrollSimulator(start_date, end_date).simulate())
+        
+        if options.get('resume'):
+            run = PayrollRun.objects.filter(id=options['resume']).first()
+            if run is None or not run.is_resumable():
+                raise CommandError(f"Payroll run {options['resume']} cannot be resumed.")
+            runner = PayrollRunner(run)
+            self.stdout.write(
+                f'Resuming payroll run {run.id} from {run.pay_period_start} to {run.pay_period_end} '
+                f'({run.processed_employees}/{run.total_employees} employees done)...'
+            )
         else:
-            # Calculate default dates based on period
-            today = date.today()
-            if period == 'weekly':
-                start_date = today - timedelta(days=7)
-                end_date = today
-            elif period == 'biweekly':
-                start_date = today - timedelta(days=14)
-                end_date = today
-            else:  # monthly
-                start_date = today.replace(day=1) - timedelta(days=1)
-                start_date = start_date.replace(day=1)
-                end_date = today
+            period = options['period']
+            start_date, end_date = self.get_period_dates(period, options.get('start_date'), options.get('end_date'))
+            runner = PayrollRunner.create(
+                start_date, end_date,
+                workers=options['workers'],
+                shard_by=options['shard_by'],
+                batch_size=options['batch_size'],
+            )
+            self.stdout.write(
+                f'Processing {period} payroll from {start_date} to {end_date} (run {runner.run.id})...'
+            )
         
-        self.stdout.write(f'Processing {period} payroll from {start_date} to {end_date}...')
+        try:
+            result = runner.execute()
+        except ValueError as e:
+            raise CommandError(str(e))
+        run = runner.run
         
-        employees = Employee.objects.filter(status='active')
-        processed_count = 0
+        for shard in result.shards:
+            self.stdout.write(
+                f"Shard {shard['label']}: {shard['status']}, created {len(shard['created_employee_ids'])}, "
+                f"skipped {len(shard['skipped_employee_ids'])}"
+            )
+        
+        if result.skipped_count:
+            self.stdout.write(f'Payroll already exists for {result.skipped_count} employees')
+        
+        self.stdout.write(f'Stage timings: {result.format_timings()}')
         
-        for employee in employees:
-            # Check if payroll already exists for this period
-            existing_payroll = Payroll.objects.filter(
-                employee=employee,
-                pay_period_start=start_date,
-                pay_period_end=end_date
-            ).first()
-            
-            if existing_payroll:
-                self.stdout.write(f'Payroll already exists for {employee.user.get_full_name()}')
-                continue
-            
-            # Calculate hours worked from attendance
-            attendances = Attendance.objects.filter(
-                employee=employee,
-                date__range=[start_date, end_date]
+        if run.status != 'completed':
+            raise CommandError(
+                f'Payroll run {run.id} {run.status} after {run.processed_employees}/{run.total_employees} '
+                f'employees. Resume with --resume {run.id}. {run.error}'.strip()
             )
-            
-            total_hours = sum(attendance.work_hours for attendance in attendances)
-            total_overtime = sum(attendance.overtime_hours for attendance in attendances)
-            
-            # Create payroll record
-            payroll = Payroll.objects.create(
-                employee=employee,
-                pay_period_start=start_date,
-                pay_period_end=end_date,
-                base_salary=employee.base_salary,
-                hours_worked=total_hours,
-                overtime_hours=total_overtime,
-                deductions=Decimal('0.00'),
-                bonuses=Decimal('0.00'),
-                status='draft',
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully processed payroll for {result.created_count} employees!')
+        )
+
+    def get_period_dates(self, period, start_date_str, end_date_str):
+        if start_date_str and end_date_str:
+            return date.fromisoformat(start_date_str), date.fromisoformat(end_date_str)
+        
+        # Calculate default dates based on period
+        today = date.today()
+        if period == 'weekly':
+            return today - timedelta(days=7), today
+        elif period == 'biweekly':
+            return today - timedelta(days=14), today
+        else:  # monthly
+            start_date = today.replace(day=1) - timedelta(days=1)
+            return start_date.replace(day=1), today
+
+    def show_status(self, run_id):
+        run = PayrollRun.objects.filter(id=run_id).first()
+        if run is None:
+            raise CommandError(f'Payroll run {run_id} does not exist.')
+        
+        self.stdout.write(str(run))
+        self.stdout.write(
+            f'Employees: {run.processed_employees}/{run.total_employees}, '
+            f'created {run.created_count}, skipped {run.skipped_count}'
+        )
+        self.stdout.write(f'Started: {run.started_at}, last heartbeat: {run.heartbeat_at}, finished: {run.finished_at}')
+        if run.error:
+            self.stdout.write(f'Error: {run.error}')
+        for shard in run.shards.all():
+            self.stdout.write(
+                f'  {shard.label}: {shard.get_status_display()}, {shard.batches_completed} batches, '
+                f'checkpoint employee {shard.last_employee_id or "-"}, created {shard.created_count}'
+                + (f', error: {shard.error}' if shard.error else '')
             )
-            
-            # Send notification
-            NotificationService.notify_payroll_ready(payroll)
-            
-            processed_count += 1
-            self.stdout.write(f'Processed payroll for {employee.user.get_full_name()}')
+
+    def show_simulation(self, simulation):
+        totals = simulation['totals']
+        diff = simulation['diff']
+        previous = simulation['previous_period']
         
         self.stdout.write(
-            self.style.SUCCESS(f'Successfully processed payroll for {processed_count} employees!')
+            f"Dry run for {simulation['start_date']} to {simulation['end_date']} "
+            f"({simulation['elapsed_seconds']}s, nothing written)"
         )
+        self.stdout.write(
+            f"Employees: {totals['employees']}, hours {totals['hours_worked']}, "
+            f"overtime {totals['overtime_hours']}, net salary {totals['net_salary']}"
+        )
+        for name, spend in simulation['by_department'].items():
+            self.stdout.write(
+                f"  {name}: {spend['employees']} employees, net {spend['net_salary']} "
+                f"({spend['net_salary_change']:+} vs previous period)"
+            )
+        self.stdout.write(
+            f"Previous period {previous['start_date']} to {previous['end_date']}: "
+            f"net {previous['totals']['net_salary']} ({previous['net_salary_change']:+})"
+        )
+        self.stdout.write(
+            f"Against stored payrolls: {diff['new']} new, {diff['changed']} changed, "
+            f"{diff['unchanged']} unchanged, {len(diff['not_simulated'])} not simulated"
+        )
+        for change in diff['changes']:
+            self.stdout.write(
+                f"  payroll {change['payroll_id']} ({change['status']}): "
+                f"{change['stored_net_salary']} -> {change['simulated_net_salary']} "
+                f"({', '.join(f'{field} {delta:+}' for field, delta in change['deltas'].items())})"
+            )
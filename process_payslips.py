@@ -0,0 +1,43 @@
+"""
+Management command to render queued payslip batches
+"""
+from django.core.management.base import BaseCommand
+import time
+
+from hr.payslips import PayslipService
+
+
+class Command(BaseCommand):
+    help = 'Render queued payslip batches with a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of worker processes rendering payslips',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=200,
+            help='Payslips handed to a worker at a time',
+        )
+        parser.add_argument(
+            '--poll',
+            type=int,
+            default=0,
+            help='Keep running and check the queue every N seconds',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            for batch in PayslipService.process_queued(options['workers'], options['chunk_size']):
+                style = self.style.SUCCESS if batch.status == 'completed' else self.style.ERROR
+                self.stdout.write(style(
+                    f'Batch #{batch.id} {batch.status}: {batch.rendered} rendered, '
+                    f'{batch.cached} cached, {batch.failed} failed of {batch.total}'
+                ))
+            if not options['poll']:
+                break
+            time.sleep(options['poll'])
@@ -0,0 +1,112 @@
+"""
+Streaming readers for scanner punch export files
+"""
+from itertools import islice
+import csv
+import mmap
+
+FIELD_ALIASES = {
+    'fingerprint_id': ('fingerprint_id', 'fingerprint', 'fp_id', 'user_id', 'badge'),
+    'timestamp': ('timestamp', 'punched_at', 'datetime', 'time_stamp'),
+    'date': ('date', 'punch_date'),
+    'time': ('time', 'punch_time'),
+    'device_id': ('device_id', 'device', 'terminal', 'terminal_id'),
+}
+
+# fingerprint_id in columns 0-20, timestamp 20-39 (YYYY-MM-DD HH:MM:SS), device_id 39-59
+DEFAULT_FIXED_LAYOUT = 'fingerprint_id:0-20,timestamp:20-39,device_id:39-59'
+
+
+def iter_lines(path, encoding='utf-8'):
+    """
+    Yield decoded lines from a memory-mapped file without reading it into memory
+    """
+    with open(path, 'rb') as handle:
+        try:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty files cannot be mapped
+            return
+        with mapped:
+            for line in iter(mapped.readline, b''):
+                yield line.decode(encoding, errors='replace').rstrip('\r\n')
+
+
+def chunked(iterable, size):
+    """
+    Yield lists of up to size items from any iterable
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _punch(values):
+    timestamp = values.get('timestamp')
+    if not timestamp and values.get('date') and values.get('time'):
+        timestamp = f"{values['date']}T{values['time']}"
+    return (values.get('fingerprint_id') or '').strip(), (timestamp or '').strip(), (values.get('device_id') or '').strip()
+
+
+def _header_columns(row):
+    """
+    Map canonical field names to column positions, or None if the row is not a header
+    """
+    names = [name.strip().lower() for name in row]
+    columns = {}
+    for field, aliases in FIELD_ALIASES.items():
+        for alias in aliases:
+            if alias in names:
+                columns[field] = names.index(alias)
+                break
+    if 'fingerprint_id' in columns and ('timestamp' in columns or {'date', 'time'} <= set(columns)):
+        return columns
+    return None
+
+
+def iter_csv_punches(lines, delimiter=','):
+    """
+    Yield (fingerprint_id, timestamp, device_id) from delimited lines. A header row
+    naming the columns is honoured; otherwise columns are fingerprint_id, timestamp, device_id.
+    """
+    rows = csv.reader((line for line in lines if line.strip()), delimiter=delimiter)
+    first = next(rows, None)
+    if first is None:
+        return
+    columns = _header_columns(first)
+    if columns is None:
+        columns = {'fingerprint_id': 0, 'timestamp': 1, 'device_id': 2}
+        rows = _prepend(first, rows)
+    for row in rows:
+        yield _punch({field: row[index] for field, index in columns.items() if index < len(row)})
+
+
+def _prepend(first, rows):
+    yield first
+    yield from rows
+
+
+def parse_layout(layout):
+    """
+    Parse 'field:start-end,...' into [(field, start, end)]
+    """
+    spans = []
+    for part in layout.split(','):
+        field, _, span = part.partition(':')
+        start, _, end = span.partition('-')
+        if field.strip() not in FIELD_ALIASES or not start.isdigit() or not end.isdigit():
+            raise ValueError(f"Invalid fixed-width column spec: {part!r}")
+        spans.append((field.strip(), int(start), int(end)))
+    return spans
+
+
+def iter_fixed_punches(lines, layout=DEFAULT_FIXED_LAYOUT):
+    """
+    Yield (fingerprint_id, timestamp, device_id) from fixed-width lines
+    """
+    spans = parse_layout(layout)
+    for line in lines:
+        if line.strip():
+            yield _punch({field: line[start:end] for field, start, end in spans})
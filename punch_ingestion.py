@@ -0,0 +1,146 @@
+"""
+Batch ingestion of fingerprint scanner punches into Attendance
+"""
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+import logging
+import time
+
+from .models import Employee, RawPunch
+from .attendance_materializer import AttendanceMaterializer
+from .presence import presence_board
+
+logger = logging.getLogger(__name__)
+
+
+class FingerprintIndex:
+    """
+    In-memory fingerprint_id -> employee_id lookup shared by requests in a process.
+    Entries expire after PUNCH_INDEX_TTL seconds; unknown ids are loaded on demand,
+    and ids still unknown are not looked up again for PUNCH_INDEX_MISS_TTL seconds.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.misses = {}
+        self.loaded_at = 0
+
+    def _ttl(self):
+        return getattr(settings, 'PUNCH_INDEX_TTL', 300)
+
+    def _miss_ttl(self):
+        return getattr(settings, 'PUNCH_INDEX_MISS_TTL', 30)
+
+    def _load(self, fingerprint_ids=None):
+        employees = Employee.objects.filter(fingerprint_id__isnull=False, status='active')
+        if fingerprint_ids is not None:
+            employees = employees.filter(fingerprint_id__in=fingerprint_ids)
+        self.entries.update(employees.values_list('fingerprint_id', 'id'))
+
+    def resolve(self, fingerprint_ids):
+        """
+        Map fingerprint ids to employee ids; unknown ids are omitted
+        """
+        fingerprint_ids = set(fingerprint_ids)
+        now = time.monotonic()
+        if now - self.loaded_at > self._ttl():
+            self.entries = {}
+            self.misses = {}
+            self._load()
+            self.loaded_at = now
+        # A terminal resending an unenrolled finger should not cost a query per request
+        missing = [
+            fingerprint_id for fingerprint_id in fingerprint_ids
+            if fingerprint_id not in self.entries and self.misses.get(fingerprint_id, 0) <= now
+        ]
+        if missing:
+            self._load(missing)
+            retry_at = now + self._miss_ttl()
+            self.misses.update(
+                (fingerprint_id, retry_at) for fingerprint_id in missing if fingerprint_id not in self.entries
+            )
+        return {
+            fingerprint_id: self.entries[fingerprint_id]
+            for fingerprint_id in fingerprint_ids
+            if fingerprint_id in self.entries
+        }
+
+    def invalidate(self):
+        self.loaded_at = 0
+
+
+fingerprint_index = FingerprintIndex()
+
+
+def parse_punch(punch):
+    """
+    Accept {'fingerprint_id', 'timestamp', 'device_id'} or a [fingerprint_id, timestamp, device_id]
+    triple and return (fingerprint_id, aware datetime, device_id), or None if malformed
+    """
+    if isinstance(punch, dict):
+        fingerprint_id, timestamp, device_id = punch.get('fingerprint_id'), punch.get('timestamp'), punch.get('device_id')
+    elif isinstance(punch, (list, tuple)) and len(punch) == 3:
+        fingerprint_id, timestamp, device_id = punch
+    else:
+        return None
+    if fingerprint_id in (None, '') or not isinstance(timestamp, str):
+        return None
+    try:
+        punched_at = parse_datetime(timestamp)
+    except ValueError:  # Well formed but not a real date or time, e.g. month 13
+        return None
+    if punched_at is None:
+        return None
+    if timezone.is_naive(punched_at):
+        punched_at = timezone.make_aware(punched_at)
+    return str(fingerprint_id), punched_at, device_id
+
+
+class PunchIngestionService:
+    """
+    Append bursts of punches to the raw log and derive the touched Attendance rows
+    """
+
+    @staticmethod
+    def ingest(punches, batch_size=1000):
+        """
+        Ingest a batch of raw punches. Every punch is kept in RawPunch; the employee-days
+        they touch are then re-derived from the full log, so resent punches are harmless.
+        """
+        started = time.perf_counter()
+        parsed = [parse_punch(punch) for punch in punches]
+        valid = [punch for punch in parsed if punch is not None]
+        index = fingerprint_index.resolve(fingerprint_id for fingerprint_id, _, _ in valid)
+
+        raw = []
+        unknown = set()
+        for fingerprint_id, punched_at, device_id in valid:
+            employee_id = index.get(fingerprint_id)
+            if employee_id is None:
+                unknown.add(fingerprint_id)
+                continue
+            raw.append(RawPunch(employee_id=employee_id, punched_at=punched_at, device_id=str(device_id or '')[:50]))
+
+        RawPunch.objects.bulk_create(raw, batch_size=batch_size)
+        derived = AttendanceMaterializer.materialize(
+            {(punch.employee_id, timezone.localtime(punch.punched_at).date()) for punch in raw},
+            batch_size=batch_size,
+        )
+        if derived:
+            presence_board.notify()
+
+        elapsed = time.perf_counter() - started
+        result = {
+            'received': len(parsed),
+            'accepted': len(raw),
+            'invalid': len(parsed) - len(valid),
+            'unknown_fingerprints': sorted(unknown),
+            'attendance_rows': derived,
+            'elapsed_seconds': round(elapsed, 3),
+        }
+        logger.info(
+            f"Ingested {result['accepted']}/{result['received']} punches into {result['attendance_rows']} "
+            f"attendance rows in {elapsed:.3f}s"
+        )
+        return result
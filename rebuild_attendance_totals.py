@@ -0,0 +1,51 @@
+"""
+Management command to rebuild and check attendance period and month totals
+"""
+from django.core.management.base import BaseCommand, CommandError
+from datetime import date
+
+from hr.attendance_totals import AttendanceTotalsService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild attendance period and month totals from raw attendance, or check them for drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start-date',
+            type=str,
+            help='First date to rebuild (YYYY-MM-DD), defaults to the earliest attendance',
+        )
+        parser.add_argument(
+            '--end-date',
+            type=str,
+            help='Last date to rebuild (YYYY-MM-DD), defaults to the latest attendance',
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only compare totals with raw attendance and report mismatches',
+        )
+
+    def handle(self, *args, **options):
+        start_date = date.fromisoformat(options['start_date']) if options.get('start_date') else None
+        end_date = date.fromisoformat(options['end_date']) if options.get('end_date') else None
+        
+        if options['check']:
+            self.stdout.write('Checking attendance totals...')
+            mismatches = AttendanceTotalsService.check(start_date, end_date)
+            for mismatch in mismatches:
+                self.stdout.write(
+                    f"Employee {mismatch['employee_id']} {mismatch['total']} from {mismatch['period_start']}: "
+                    f"{mismatch['field']} expected {mismatch['expected']}, stored {mismatch['stored']}"
+                )
+            if mismatches:
+                raise CommandError(f'Found {len(mismatches)} mismatched attendance totals.')
+            self.stdout.write(self.style.SUCCESS('Attendance totals are consistent.'))
+            return
+        
+        self.stdout.write('Rebuilding attendance totals...')
+        rebuilt = AttendanceTotalsService.rebuild(start_date, end_date)
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt {rebuilt} attendance totals!')
+        )
@@ -0,0 +1,30 @@
+"""
+Management command to recalculate payrolls affected by attendance corrections
+"""
+from django.core.management.base import BaseCommand
+
+from hr.payroll_recalculation import PayrollRecalculationService
+
+
+class Command(BaseCommand):
+    help = 'Recalculate draft payrolls affected by attendance changes and flag approved/paid ones for review'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Attendance changes processed per transaction',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Recalculating payrolls for attendance changes...')
+        
+        recalculated, flagged, processed = PayrollRecalculationService.process_changes(options['batch_size'])
+        
+        self.stdout.write(f'Processed {processed} attendance changes')
+        if flagged:
+            self.stdout.write(self.style.WARNING(f'Flagged {flagged} approved or paid payrolls for review'))
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully recalculated {recalculated} payrolls!')
+        )
@@ -0,0 +1,31 @@
+"""
+Management command to load an archived year of attendance back into the database
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from hr.attendance_archive import AttendanceArchiveService
+from hr.models import AttendanceArchive
+
+
+class Command(BaseCommand):
+    help = 'Restore an archived year of attendance into hr_attendance'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'year',
+            type=int,
+            help='Archived year to restore',
+        )
+
+    def handle(self, *args, **options):
+        year = options['year']
+        if not AttendanceArchive.objects.filter(year=year, status='archived').exists():
+            raise CommandError(f'No archived attendance for {year}.')
+        
+        self.stdout.write(f'Restoring attendance for {year}...')
+        try:
+            restored = AttendanceArchiveService.restore(year)
+        except ValueError as e:
+            raise CommandError(str(e))
+        
+        self.stdout.write(self.style.SUCCESS(f'Successfully restored {restored} attendance rows!'))
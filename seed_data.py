@@ -11,6 +11,7 @@ from hr.models import (
     Department, JobPosition, Employee, Attendance, 
     LeaveRequest, Payroll, Document, Notification
 )
+from hr.attendance_bulk import AttendanceBulkService
 
 User = get_user_model()
 
@@ -251,10 +252,11 @@ class Command(BaseCommand):
         """Create sample attendance records"""
         self.stdout.write('Creating attendance records...')
         
-        employees = Employee.objects.all()
+        employee_ids = Employee.objects.values_list('id', flat=True)
         start_date = date.today() - timedelta(days=30)
         
-        for employee in employees:
+        records = []
+        for employee_id in employee_ids:
             for i in range(30):
                 current_date = start_date + timedelta(days=i)
                 
@@ -272,21 +274,16 @@ class Command(BaseCommand):
                         datetime.combine(current_date, datetime.min.time().replace(hour=17, minute=random.randint(0, 30)))
                     )
                     
-                    attendance, created = Attendance.objects.get_or_create(
-                        employee=employee,
+                    records.append(Attendance(
+                        employee_id=employee_id,
                         date=current_date,
-                        defaults={
-                            'check_in_time': check_in_time,
-                            'check_out_time': check_out_time,
-                            'work_hours': 8.0,
-                            'is_late': check_in_time.hour > 9 or (check_in_time.hour == 9 and check_in_time.minute > 15),
-                            'is_absent': False,
-                        }
-                    )
-                    if created:
-                        attendance.calculate_work_hours()
-                        attendance.check_lateness()
-                        attendance.save()
+                        check_in_time=check_in_time,
+                        check_out_time=check_out_time,
+                        is_absent=False,
+                    ))
+        
+        # Hours and lateness are computed in one pass; existing days are left as they are
+        AttendanceBulkService.create(records, ignore_conflicts=True)
 
     def create_leave_requests(self):
         """Create sample leave requests"""
@@ -15,7 +15,7 @@ class Command(BaseCommand):
         parser.add_argument(
             '--type',
             type=str,
-            choices=['daily', 'weekly', 'monthly'],
+            choices=['daily', 'weekly', 'monthly', 'digest'],
             default='daily',
             help='Type of notifications to send',
         )
@@ -31,6 +31,8 @@ class Command(BaseCommand):
             NotificationScheduler.run_weekly_checks()
         elif notification_type == 'monthly':
             NotificationScheduler.run_monthly_checks()
+        elif notification_type == 'digest':
+            NotificationScheduler.run_digests()
         
         self.stdout.write(
             self.style.SUCCESS(f'Successfully sent {notification_type} notifications!')
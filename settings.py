@@ -79,6 +79,11 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Let parallel payroll workers wait for the write lock instead of failing.
+        # Only payroll shard batches open with BEGIN IMMEDIATE (see payroll_engine.shard_transaction).
+        'OPTIONS': {
+            'timeout': 20,
+        },
     }
 }
 
@@ -174,6 +179,60 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
 }
 
+# Payroll Settings
+# Attendance totals are accumulated per pay period of PAYROLL_PERIOD_DAYS days,
+# counted from PAYROLL_PERIOD_ANCHOR (the first day of some pay period)
+PAYROLL_PERIOD_DAYS = 14
+PAYROLL_PERIOD_ANCHOR = '2025-01-06'
+# Seconds without a batch heartbeat before a running payroll run is treated as abandoned and may be resumed
+PAYROLL_RUN_STALE_SECONDS = 600
+# Seconds without a chunk heartbeat before a running payslip batch is treated as abandoned and reclaimed
+PAYSLIP_BATCH_STALE_SECONDS = 600
+
+# Fingerprint Terminal Settings
+# Shared secret sent by terminals as "Authorization: Bearer <token>"; empty disables ingestion
+PUNCH_INGEST_TOKEN = ''
+# Seconds before the in-memory fingerprint index is reloaded
+PUNCH_INDEX_TTL = 300
+# Seconds an unknown fingerprint id is remembered as unknown before it is looked up again
+PUNCH_INDEX_MISS_TTL = 30
+
+# Attendance Calendar Settings
+# Seconds a month's per-day status counts are cached
+ATTENDANCE_CALENDAR_CACHE_TTL = 300
+
+# Presence Board Settings
+# Seconds between presence polls per process; punches ingested in the same process wake it early
+PRESENCE_POLL_SECONDS = 2
+# Seconds each poll looks back before its cursor, to catch writes whose transaction commits late
+PRESENCE_POLL_OVERLAP_SECONDS = 30
+# Seconds between keep-alive comments on idle presence streams
+PRESENCE_HEARTBEAT_SECONDS = 15
+# Pending updates a stream may buffer before it is dropped as stalled
+PRESENCE_QUEUE_SIZE = 1000
+
+# Notification Email Outbox Settings
+# Emails sent per batch; each batch reuses one mail connection
+NOTIFICATION_EMAIL_BATCH_SIZE = 200
+# Failed sends are retried after 60s, 120s, 240s... capped at NOTIFICATION_EMAIL_MAX_RETRY_SECONDS
+NOTIFICATION_EMAIL_RETRY_SECONDS = 60
+NOTIFICATION_EMAIL_MAX_RETRY_SECONDS = 3600
+# Attempts before an email is marked failed
+NOTIFICATION_EMAIL_MAX_ATTEMPTS = 5
+# Seconds a worker holds its claimed batch before another worker may take it over
+NOTIFICATION_EMAIL_CLAIM_SECONDS = 300
+
+# Notification Digest Settings
+# Alerts of these types are buffered and sent as one daily digest per recipient
+# (send_notifications --type digest) instead of one notification and email each
+NOTIFICATION_DIGEST_TYPES = ['late_checkin', 'missed_checkout']
+
+# Notification Inbox Settings
+# Seconds a user's cached unread count lives before it is recounted
+NOTIFICATION_UNREAD_CACHE_TTL = 3600
+# Default page size of the inbox API
+NOTIFICATION_INBOX_PAGE_SIZE = 20
+
 # Email Settings (for notifications)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # For development
 # EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'  # For production
@@ -1,3 +1,681 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from smtplib import SMTPException
+from unittest import mock
+import os
+import random
+import tempfile
 
-# Create your tests here.
+from .absence_detection import AbsenceDetectionService
+from .attendance_archive import AttendanceArchiveService
+from .attendance_calendar import AttendanceCalendarService
+from .attendance_totals import AttendanceTotalsService
+from .models import (
+    Attendance, AttendanceChange, AuditLog, AttendanceMonthTotal, AttendancePeriodTotal, Employee, LeaveRequest, Notification,
+    Payroll, PayrollRun, PayslipBatch, RawPunch, User,
+)
+from .exports import attendance_rows
+from .notification_digest import NotificationDigestService
+from .notification_inbox import NotificationInboxService, UnreadCounter
+from .notification_outbox import EmailOutboxService
+from .notifications import NotificationService
+from .payroll_calculator import PayrollCalculator
+from .payroll_engine import PayrollEngine, PayrollRunner
+from .payroll_recalculation import PayrollRecalculationService
+from .payroll_transitions import PayrollTransitionService
+from .payslips import PayslipService, payslip_context, payslip_hash
+from .punch_ingestion import FingerprintIndex, fingerprint_index
+
+
+def make_employee(username, **fields):
+    user = User.objects.create_user(username=username, email=f'{username}@example.com', first_name=username.title())
+    fields.setdefault('hire_date', date(2024, 1, 1))
+    fields.setdefault('base_salary', Decimal('5000.00'))
+    return Employee.objects.create(user=user, **fields)
+
+
+class PayrollCalculatorTests(TestCase):
+    """
+    Net salary, per row and in batch, against cents worked out by hand
+    """
+
+    # (schedule, base salary, hours, overtime, bonuses, deductions, expected net salary)
+    CASES = [
+        # 8h x 5 days = 80h a period, 52000 / (80 x 26) = 25.00 an hour
+        (('09:00', '17:00', 5), '52000.00', '80.00', '0.00', '0.00', '0.00', '2000.00'),
+        # hours capped at 80; 4h overtime at 37.50; + 100 bonus - 50.55 deductions
+        (('09:00', '17:00', 5), '52000.00', '87.00', '4.00', '100.00', '50.55', '2199.45'),
+        # 50000 / 2080 = 24.0384615...; 37.5h = 901.4423... rounds to 901.44
+        (('09:00', '17:00', 5), '50000.00', '37.50', '0.00', '0.00', '0.00', '901.44'),
+        # 4h x 3 days = 24h a period at 50.00; capped at 24h plus 1.5h overtime at 75.00
+        (('08:00', '12:00', 3), '31200.00', '30.00', '1.50', '0.00', '0.00', '1312.50'),
+        # overnight 22:00-06:00 is still 8h a day
+        (('22:00', '06:00', 5), '52000.00', '40.00', '0.00', '0.00', '0.00', '1000.00'),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.expected = {}
+        for index, (schedule, base, hours, overtime, bonuses, deductions, net) in enumerate(cls.CASES):
+            start, end, days = schedule
+            employee = make_employee(
+                f'payee{index}', base_salary=Decimal(base), work_start_time=start, work_end_time=end,
+                work_days_per_week=days,
+            )
+            employee.refresh_from_db()
+            payroll = Payroll.objects.create(
+                employee=employee, pay_period_start=date(2025, 1, 6), pay_period_end=date(2025, 1, 19),
+                base_salary=Decimal(base), hours_worked=Decimal(hours), overtime_hours=Decimal(overtime),
+                bonuses=Decimal(bonuses), deductions=Decimal(deductions), net_salary=Decimal('0'),
+            )
+            cls.expected[payroll.id] = Decimal(net)
+
+    def test_per_row_calculation(self):
+        for payroll in Payroll.objects.select_related('employee'):
+            self.assertEqual(payroll.calculate_net_salary(), self.expected[payroll.id], payroll)
+
+    def test_batch_calculation(self):
+        payrolls = list(Payroll.objects.select_related('employee'))
+        for payroll in payrolls:
+            payroll.net_salary = None
+        PayrollCalculator.apply(payrolls)
+
+        for payroll in payrolls:
+            self.assertEqual(payroll.net_salary, self.expected[payroll.id], payroll)
+
+    def test_batch_matches_per_row_on_seeded_payrolls(self):
+        random.seed(3)
+        call_command('seed_data', stdout=StringIO())
+        payrolls = list(Payroll.objects.select_related('employee'))
+        self.assertGreater(len(payrolls), len(self.CASES))
+
+        PayrollCalculator.apply(payrolls)
+
+        for payroll in payrolls:
+            self.assertEqual(payroll.net_salary, payroll.calculate_net_salary(), payroll)
+
+    def test_recalculate_persists_batch_results(self):
+        Payroll.objects.update(net_salary=0)
+        updated = PayrollCalculator.recalculate(Payroll.objects.all())
+
+        self.assertEqual(updated, len(self.CASES))
+        for payroll_id, net_salary in Payroll.objects.values_list('id', 'net_salary'):
+            self.assertEqual(net_salary, self.expected[payroll_id])
+
+
+class PayrollEngineTests(TestCase):
+    """
+    Checkpointed runs resume after their last committed batch without duplicating payrolls
+    """
+
+    start_date, end_date = date(2025, 1, 6), date(2025, 1, 19)
+
+    def setUp(self):
+        self.employees = [make_employee(f'staff{index}') for index in range(5)]
+        for employee in self.employees:
+            employee.refresh_from_db()
+        Payroll.objects.create(
+            employee=self.employees[0], pay_period_start=self.start_date, pay_period_end=self.end_date,
+            base_salary=Decimal('5000.00'),
+        )
+
+    def test_run_derives_hours_from_attendance_and_skips_existing(self):
+        worker = self.employees[1]
+        for day in (date(2025, 1, 6), date(2025, 1, 7)):
+            Attendance.objects.create(
+                employee=worker, date=day, check_in_time=timezone.make_aware(datetime.combine(day, time(9))),
+                check_out_time=timezone.make_aware(datetime.combine(day, time(19))),
+            )
+
+        result = PayrollEngine(self.start_date, self.end_date).run()
+
+        self.assertEqual(result.skipped_employee_ids, [self.employees[0].id])
+        self.assertEqual(result.created_count, 4)
+        payroll = Payroll.objects.select_related('employee').get(employee=worker)
+        # 10h days against an 8h schedule: 16h regular plus 4h overtime
+        self.assertEqual((payroll.hours_worked, payroll.overtime_hours), (Decimal('16.00'), Decimal('4.00')))
+        self.assertEqual(payroll.net_salary, payroll.calculate_net_salary())
+
+    def test_run_query_count_does_not_grow_with_employees(self):
+        def queries(employees):
+            Payroll.objects.exclude(employee=self.employees[0]).delete()
+            with CaptureQueriesContext(connection) as captured:
+                PayrollEngine(self.start_date, self.end_date).run(Employee.objects.filter(id__in=employees))
+            return len(captured)
+
+        self.assertEqual(
+            queries([employee.id for employee in self.employees[:2]]),
+            queries([employee.id for employee in self.employees]),
+        )
+
+    def test_resume_continues_after_the_checkpoint(self):
+        run = PayrollRunner.create(self.start_date, self.end_date, batch_size=2).run
+        run_batch = PayrollEngine.run
+
+        def dies_after_first_batch(engine, employees=None):
+            if PayrollRun.objects.get(id=run.id).processed_employees:
+                raise RuntimeError('worker died')
+            return run_batch(engine, employees)
+
+        with mock.patch.object(PayrollEngine, 'run', dies_after_first_batch):
+            PayrollRunner(run).execute()
+        run.refresh_from_db()
+        shard = run.shards.get()
+        self.assertEqual((run.status, shard.status), ('failed', 'failed'))
+        self.assertEqual(shard.last_employee_id, self.employees[1].id)
+        self.assertEqual(Payroll.objects.count(), 2)
+        self.assertEqual(Notification.objects.filter(notification_type='payroll_ready').count(), 1)
+
+        result = PayrollRunner(run).execute()
+
+        run.refresh_from_db()
+        self.assertEqual(run.status, 'completed')
+        self.assertEqual((run.created_count, run.skipped_count, run.processed_employees), (4, 1, 5))
+        self.assertEqual(result.created_count, 3)
+        self.assertEqual(Payroll.objects.count(), 5)
+        self.assertEqual(
+            sorted(Payroll.objects.values_list('employee_id', flat=True)), [employee.id for employee in self.employees]
+        )
+        self.assertEqual(Notification.objects.filter(notification_type='payroll_ready').count(), 4)
+
+    def test_conflicting_insert_is_skipped_not_created(self):
+        engine = PayrollEngine(self.start_date, self.end_date, ignore_conflicts=True)
+
+        # As if the existing payroll was stored after the engine looked for it
+        with mock.patch.object(PayrollEngine, 'load_existing_employee_ids', return_value=set()):
+            result = engine.run(Employee.objects.filter(id__in=[self.employees[0].id, self.employees[1].id]))
+
+        self.assertEqual(result.created_employee_ids, [self.employees[1].id])
+        self.assertEqual(result.skipped_employee_ids, [self.employees[0].id])
+
+
+@override_settings(PAYROLL_PERIOD_ANCHOR='2025-01-06', PAYROLL_PERIOD_DAYS=14)
+class PayrollRecalculationTests(TestCase):
+    """
+    Attendance corrections recompute draft payrolls and flag approved ones for review
+    """
+
+    def setUp(self):
+        self.employee = make_employee('corrected')
+        self.employee.refresh_from_db()
+        self.approved = Payroll.objects.create(
+            employee=self.employee, pay_period_start=date(2024, 12, 23), pay_period_end=date(2025, 1, 5),
+            base_salary=Decimal('52000.00'), status='approved',
+        )
+        self.draft = Payroll.objects.create(
+            employee=self.employee, pay_period_start=date(2025, 1, 6), pay_period_end=date(2025, 1, 19),
+            base_salary=Decimal('52000.00'),
+        )
+
+    def correct(self, day):
+        Attendance.objects.create(
+            employee=self.employee, date=day, check_in_time=timezone.make_aware(datetime.combine(day, time(9))),
+            check_out_time=timezone.make_aware(datetime.combine(day, time(17))),
+        )
+
+    def test_changes_recalculate_drafts_and_flag_approved(self):
+        self.correct(date(2025, 1, 2))
+        self.correct(date(2025, 1, 7))
+
+        recalculated, flagged, processed = PayrollRecalculationService.process_changes()
+
+        self.assertEqual((recalculated, flagged, processed), (1, 1, 2))
+        self.draft.refresh_from_db()
+        self.assertEqual(self.draft.hours_worked, Decimal('8.00'))
+        # 52000 / (80 x 26) = 25.00 an hour
+        self.assertEqual(self.draft.net_salary, Decimal('200.00'))
+        self.approved.refresh_from_db()
+        self.assertTrue(self.approved.needs_review)
+        self.assertEqual(self.approved.hours_worked, Decimal('0.00'))
+        self.assertFalse(AttendanceChange.objects.exists())
+
+    def test_unrelated_dates_touch_nothing(self):
+        self.correct(date(2025, 2, 3))
+
+        self.assertEqual(PayrollRecalculationService.process_changes(), (0, 0, 1))
+        self.draft.refresh_from_db()
+        self.assertEqual(self.draft.hours_worked, Decimal('0.00'))
+
+
+class PayrollTransitionTests(TestCase):
+    """
+    Bulk transitions move only payrolls in a valid source status and report every id
+    """
+
+    def setUp(self):
+        self.approver = User.objects.create_user(username='approver', role='hr')
+        employee = make_employee('transitioned')
+        employee.refresh_from_db()
+        self.payrolls = {
+            status: Payroll.objects.create(
+                employee=employee, pay_period_start=start, pay_period_end=start + timedelta(days=13),
+                base_salary=Decimal('5000.00'), status=status,
+            )
+            for status, start in (
+                ('draft', date(2025, 1, 6)), ('pending', date(2025, 1, 20)), ('approved', date(2025, 2, 3)),
+            )
+        }
+
+    def test_approve_reports_per_id_outcomes(self):
+        ids = [payroll.id for payroll in self.payrolls.values()]
+
+        outcomes = PayrollTransitionService.transition([*ids, 999999], 'approve', user=self.approver)
+
+        self.assertEqual(outcomes, {
+            self.payrolls['draft'].id: 'approved',
+            self.payrolls['pending'].id: 'approved',
+            self.payrolls['approved'].id: 'invalid_status',
+            999999: 'not_found',
+        })
+        self.assertEqual(Payroll.objects.filter(status='approved', approved_by=self.approver).count(), 2)
+        self.assertEqual(Notification.objects.filter(notification_type='payroll_approved').count(), 2)
+        self.assertEqual(AuditLog.objects.filter(action='approve_payroll').count(), 2)
+
+    def test_mark_paid_moves_only_approved(self):
+        outcomes = PayrollTransitionService.transition(
+            [payroll.id for payroll in self.payrolls.values()], 'mark_paid', user=self.approver
+        )
+
+        self.assertEqual(sorted(outcomes.values()), ['invalid_status', 'invalid_status', 'paid'])
+        self.assertEqual(list(Payroll.objects.filter(status='paid')), [self.payrolls['approved']])
+
+
+@override_settings(PAYSLIP_BATCH_STALE_SECONDS=600)
+class PayslipBatchTests(TestCase):
+    """
+    Batches abandoned by a dead worker are reclaimed; paying a payroll keeps its payslip
+    """
+
+    def test_stale_running_batch_is_reclaimed(self):
+        stale = PayslipBatch.objects.create(
+            status='running', heartbeat_at=timezone.now() - timedelta(minutes=11), rendered=3
+        )
+        PayslipBatch.objects.create(status='running', heartbeat_at=timezone.now())
+
+        claimed = PayslipService.claim_next()
+
+        self.assertEqual(claimed.id, stale.id)
+        self.assertEqual(claimed.rendered, 0)
+        self.assertIsNone(PayslipService.claim_next())
+
+    def test_payslip_hash_ignores_the_status(self):
+        employee = make_employee('payee')
+        employee.refresh_from_db()
+        payroll = Payroll.objects.create(
+            employee=employee, pay_period_start=date(2025, 1, 6), pay_period_end=date(2025, 1, 19),
+            base_salary=Decimal('5000.00'), status='approved',
+        )
+        approved = payslip_hash(payslip_context(payroll))
+
+        payroll.status = 'paid'
+
+        self.assertEqual(payslip_hash(payslip_context(payroll)), approved)
+
+
+@override_settings(PAYROLL_PERIOD_ANCHOR='2025-01-06', PAYROLL_PERIOD_DAYS=14)
+class AttendanceTotalsTests(TestCase):
+    """
+    Attendance saves, edits and deletes move the period and month accumulators by their delta
+    """
+
+    def setUp(self):
+        self.employee = make_employee('worker')
+        self.employee.refresh_from_db()
+
+    def record(self, day, check_in='09:00', check_out='17:00'):
+        def at(clock):
+            return timezone.make_aware(datetime.combine(day, datetime.strptime(clock, '%H:%M').time()))
+        return Attendance.objects.create(
+            employee=self.employee, date=day, check_in_time=at(check_in), check_out_time=at(check_out)
+        )
+
+    def period(self, period_start):
+        return AttendancePeriodTotal.objects.filter(employee=self.employee, period_start=period_start).values(
+            'days_recorded', 'present_days', 'late_days', 'total_hours', 'overtime_hours'
+        ).get()
+
+    def test_changes_apply_deltas(self):
+        first = self.record(date(2025, 1, 7))
+        second = self.record(date(2025, 1, 8), '09:30', '17:30')
+        self.assertEqual(self.period(date(2025, 1, 6)), {
+            'days_recorded': 2, 'present_days': 2, 'late_days': 1,
+            'total_hours': Decimal('16.00'), 'overtime_hours': Decimal('0.00'),
+        })
+
+        # Two hours past the 8h schedule become overtime
+        first.check_out_time = first.check_in_time + timedelta(hours=10)
+        first.save()
+        self.assertEqual(self.period(date(2025, 1, 6))['overtime_hours'], Decimal('2.00'))
+
+        # Moving a day to the next period takes its whole contribution along
+        second.date = date(2025, 1, 21)
+        second.save()
+        self.assertEqual(self.period(date(2025, 1, 6))['days_recorded'], 1)
+        self.assertEqual(self.period(date(2025, 1, 6))['late_days'], 0)
+        self.assertEqual(self.period(date(2025, 1, 20))['days_recorded'], 1)
+        self.assertEqual(self.period(date(2025, 1, 20))['total_hours'], Decimal('8.00'))
+
+        first.delete()
+        self.assertEqual(self.period(date(2025, 1, 6)), {
+            'days_recorded': 0, 'present_days': 0, 'late_days': 0,
+            'total_hours': Decimal('0.00'), 'overtime_hours': Decimal('0.00'),
+        })
+        self.assertEqual(
+            AttendanceMonthTotal.objects.get(employee=self.employee, year=2025, month=1).days_recorded, 1
+        )
+        self.assertEqual(AttendanceTotalsService.check(date(2025, 1, 6), date(2025, 2, 2)), [])
+
+    def test_totals_combine_accumulators_and_edge_days(self):
+        for day in (date(2025, 1, 3), date(2025, 1, 7), date(2025, 1, 20), date(2025, 2, 4)):
+            self.record(day)
+
+        # 2025-01-06..2025-02-02 are two whole periods; the 3rd and 4th are edge days
+        totals = AttendanceTotalsService.totals([self.employee.id], date(2025, 1, 3), date(2025, 2, 4))
+
+        self.assertEqual(totals[self.employee.id]['days_recorded'], 4)
+        self.assertEqual(totals[self.employee.id]['total_hours'], Decimal('32.00'))
+
+
+@override_settings(PAYROLL_PERIOD_ANCHOR='2025-01-06', PAYROLL_PERIOD_DAYS=14)
+class AbsenceDetectionTests(TestCase):
+    """
+    Working days with neither attendance nor approved leave become absence rows, counted once
+    """
+
+    def setUp(self):
+        self.employee = make_employee('absentee')
+        self.part_timer = make_employee('parttimer', work_days_per_week=3)
+        Attendance.objects.create(employee=self.employee, date=date(2025, 1, 6))
+        leave = [('approved', date(2025, 1, 8), date(2025, 1, 9)), ('pending', date(2025, 1, 10), date(2025, 1, 10))]
+        for status, start, end in leave:
+            LeaveRequest.objects.create(
+                employee=self.employee, leave_type='annual', start_date=start, end_date=end,
+                days_requested=(end - start).days + 1, reason='Trip', status=status,
+            )
+
+    def test_detect_skips_days_off_and_approved_leave(self):
+        # Monday 2025-01-06 to Sunday 2025-01-12
+        created = AbsenceDetectionService.detect(date(2025, 1, 6), date(2025, 1, 12))
+
+        absences = Attendance.objects.filter(is_absent=True)
+        self.assertEqual(created, 5)
+        self.assertEqual(
+            sorted(absences.filter(employee=self.employee).values_list('date', flat=True)),
+            [date(2025, 1, 7), date(2025, 1, 10)],
+        )
+        self.assertEqual(
+            sorted(absences.filter(employee=self.part_timer).values_list('date', flat=True)),
+            [date(2025, 1, 6), date(2025, 1, 7), date(2025, 1, 8)],
+        )
+        period = AttendancePeriodTotal.objects.get(employee=self.employee, period_start=date(2025, 1, 6))
+        self.assertEqual((period.days_recorded, period.absent_days), (3, 2))
+        self.assertEqual(AttendanceTotalsService.check(date(2025, 1, 6), date(2025, 1, 19)), [])
+
+    def test_rerun_is_idempotent(self):
+        AbsenceDetectionService.detect(date(2025, 1, 6), date(2025, 1, 12))
+
+        self.assertEqual(AbsenceDetectionService.detect(date(2025, 1, 6), date(2025, 1, 12)), 0)
+        self.assertEqual(Attendance.objects.filter(is_absent=True).count(), 5)
+        self.assertEqual(AttendanceTotalsService.check(date(2025, 1, 6), date(2025, 1, 19)), [])
+
+
+@override_settings(PAYROLL_PERIOD_ANCHOR='2025-01-06', PAYROLL_PERIOD_DAYS=14)
+class AttendanceArchiveTests(TestCase):
+    """
+    Archived years stay visible to exports, the calendar and the accumulators
+    """
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.employee = make_employee('archived')
+        self.employee.refresh_from_db()
+        for day in (date(2024, 12, 30), date(2024, 12, 31), date(2025, 1, 2)):
+            Attendance.objects.create(employee=self.employee, date=day, is_absent=True)
+        # Corrections already folded into payroll
+        AttendanceChange.objects.all().delete()
+        AttendanceArchiveService.archive(2024)
+
+    def test_reads_cover_the_archived_year(self):
+        rows = list(attendance_rows(date(2024, 12, 1), date(2025, 1, 31)))
+        self.assertEqual([row[2] for row in rows], [date(2024, 12, 30), date(2024, 12, 31), date(2025, 1, 2)])
+        self.assertEqual(AttendanceCalendarService.build_grid(2024, 12).totals()['absent'], 2)
+        self.assertEqual(AttendanceCalendarService.day_detail(date(2024, 12, 31))['count'], 1)
+
+    def test_refresh_keeps_the_archived_days_of_a_straddling_period(self):
+        # 2024-12-23..2025-01-05 straddles the archived year
+        AttendancePeriodTotal.objects.filter(period_start=date(2024, 12, 23)).update(days_recorded=0, absent_days=0)
+
+        AttendanceTotalsService.refresh([(self.employee.id, date(2025, 1, 2))])
+
+        period = AttendancePeriodTotal.objects.get(employee=self.employee, period_start=date(2024, 12, 23))
+        self.assertEqual((period.days_recorded, period.absent_days), (3, 3))
+        self.assertEqual(AttendanceTotalsService.check(date(2024, 12, 23), date(2025, 1, 5)), [])
+
+    def test_restore_counts_only_rows_it_inserts(self):
+        Attendance.objects.create(employee=self.employee, date=date(2024, 12, 30))
+
+        self.assertEqual(AttendanceArchiveService.restore(2024), 1)
+        self.assertFalse(Attendance.objects.get(employee=self.employee, date=date(2024, 12, 30)).is_absent)
+        self.assertTrue(Attendance.objects.get(employee=self.employee, date=date(2024, 12, 31)).is_absent)
+
+
+class ImportPunchesTests(TestCase):
+    """
+    Malformed rows in a punch file are skipped and counted, not fatal
+    """
+
+    def setUp(self):
+        fingerprint_index.invalidate()
+        self.employee = make_employee('scanner', fingerprint_id='FP100')
+
+    def test_invalid_timestamp_is_skipped_and_counted(self):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w') as export:
+            export.write(
+                'fingerprint_id,timestamp,device_id\n'
+                'FP100,2025-03-03T08:55:00,D1\n'
+                'FP100,2025-13-45T08:00:00,D1\n'
+                'FP100,2025-03-03T17:05:00,D1\n'
+            )
+        self.addCleanup(os.remove, path)
+        out = StringIO()
+
+        call_command('import_punches', path, stdout=out)
+
+        self.assertEqual(RawPunch.objects.filter(employee=self.employee).count(), 2)
+        self.assertIn('Skipped 1 malformed rows', out.getvalue())
+        self.assertIn('Imported 2 of 3 punches', out.getvalue())
+
+
+@override_settings(PUNCH_INDEX_TTL=300, PUNCH_INDEX_MISS_TTL=30)
+class FingerprintIndexTests(TestCase):
+    """
+    Unknown fingerprint ids are remembered for a short while instead of queried on every request
+    """
+
+    def test_unknown_id_is_negatively_cached(self):
+        index = FingerprintIndex()
+        with mock.patch('hr.punch_ingestion.time.monotonic', return_value=1000):
+            self.assertEqual(index.resolve(['FP404']), {})
+            employee = make_employee('enrolled', fingerprint_id='FP404')
+            with self.assertNumQueries(0):
+                self.assertEqual(index.resolve(['FP404']), {})
+
+        with mock.patch('hr.punch_ingestion.time.monotonic', return_value=1031):
+            self.assertEqual(index.resolve(['FP404']), {'FP404': employee.id})
+
+
+class NotificationDedupTests(TestCase):
+    """
+    Rerunning a deduplicated fan-out stores nothing new and keeps unread counts right
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create_user(username=f'hr{i}', email=f'hr{i}@example.com', role='hr') for i in range(2)]
+
+    def fan_out(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return NotificationService.fan_out(
+                User.objects.filter(role='hr'), 'Weekly Attendance Summary', 'Summary', dedup_window='2025-W10'
+            )
+
+    def test_rerun_inserts_nothing(self):
+        self.assertEqual(self.fan_out(), 2)
+        self.assertEqual(UnreadCounter.get(self.users[0].id), 1)
+
+        self.assertEqual(self.fan_out(), 0)
+
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(UnreadCounter.get(self.users[0].id), 1)
+
+    def test_partial_rerun_counts_only_new_rows(self):
+        self.fan_out()
+        self.users.append(User.objects.create_user(username='hr2', email='hr2@example.com', role='hr'))
+
+        self.assertEqual(self.fan_out(), 1)
+        self.assertEqual([UnreadCounter.get(user.id) for user in self.users], [1, 1, 1])
+
+
+@override_settings(NOTIFICATION_DIGEST_TYPES=['late_checkin'])
+class NotificationDigestTests(TestCase):
+    """
+    Digest alert types are buffered and flushed as one notification per recipient
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.late, self.punctual = (
+            User.objects.create_user(username=name, email=f'{name}@example.com') for name in ('late', 'punctual')
+        )
+        alerts = [
+            NotificationService.build_notification(self.late, 'Late Check-in', f'Late on day {day}', 'late_checkin')
+            for day in (1, 2)
+        ]
+        alerts.append(NotificationService.build_notification(self.punctual, 'Welcome', 'Hello', 'general'))
+        NotificationService.bulk_create(alerts)
+
+    def test_alerts_are_buffered_then_merged(self):
+        self.assertEqual(Notification.objects.get().notification_type, 'general')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = NotificationDigestService.send_digests(until=timezone.now() + timedelta(seconds=1))
+
+        self.assertEqual((stats['digests'], stats['items']), (1, 2))
+        digest = Notification.objects.get(notification_type='digest')
+        self.assertEqual(
+            (digest.recipient, digest.title, digest.email_status), (self.late, 'Daily digest: 2 alerts', 'pending')
+        )
+        self.assertIn('Late on day 1', digest.message)
+        self.assertIn('Late on day 2', digest.message)
+        self.assertEqual(UnreadCounter.get(self.late.id), 1)
+
+    def test_rerun_sends_nothing_new(self):
+        until = timezone.now() + timedelta(seconds=1)
+        NotificationDigestService.send_digests(until=until)
+
+        self.assertEqual(NotificationDigestService.send_digests(until=until)['digests'], 0)
+        self.assertEqual(Notification.objects.filter(notification_type='digest').count(), 1)
+
+
+@override_settings(NOTIFICATION_EMAIL_MAX_ATTEMPTS=3)
+class EmailOutboxTests(TestCase):
+    """
+    Claims, takeovers of expired claims and retries in the email outbox
+    """
+
+    def setUp(self):
+        user = User.objects.create_user(username='outbox', email='outbox@example.com')
+        self.notification = NotificationService.create_notification(user, 'Payslip ready', 'Your payslip is ready')
+
+    def expire_claim(self):
+        Notification.objects.filter(id=self.notification.id).update(
+            email_next_attempt_at=timezone.now() - timedelta(seconds=1)
+        )
+
+    def test_claimed_rows_are_not_claimed_twice(self):
+        self.assertEqual(len(EmailOutboxService.claim_batch(10)), 1)
+        self.assertEqual(EmailOutboxService.claim_batch(10), [])
+
+    def test_takeover_counts_an_attempt_and_fences_the_old_worker(self):
+        [first] = EmailOutboxService.claim_batch(10)
+        self.expire_claim()
+        [second] = EmailOutboxService.claim_batch(10)
+        self.assertEqual(second.email_attempts, 1)
+
+        EmailOutboxService._record(first.email_claim, [first], [], timezone.now())
+        self.notification.refresh_from_db()
+        self.assertEqual(self.notification.email_status, 'sending')
+        self.assertEqual(self.notification.email_claim, second.email_claim)
+
+    def test_row_that_keeps_killing_its_worker_fails(self):
+        for _ in range(3):
+            EmailOutboxService.claim_batch(10)
+            self.expire_claim()
+        self.assertEqual(EmailOutboxService.claim_batch(10), [])
+
+        self.notification.refresh_from_db()
+        self.assertEqual(self.notification.email_status, 'failed')
+        self.assertEqual(self.notification.email_attempts, 3)
+
+    def test_failed_send_is_retried_with_backoff_until_attempts_run_out(self):
+        with mock.patch('hr.notification_outbox.EmailMessage.send', side_effect=SMTPException('down')):
+            stats = EmailOutboxService.deliver_batch()
+            self.assertEqual(stats['failed'], 1)
+            self.notification.refresh_from_db()
+            self.assertEqual(self.notification.email_status, 'pending')
+            self.assertGreater(self.notification.email_next_attempt_at, timezone.now())
+            self.assertEqual(EmailOutboxService.deliver_batch()['claimed'], 0)
+
+            for _ in range(2):
+                self.expire_claim()
+                EmailOutboxService.deliver_batch()
+
+        self.notification.refresh_from_db()
+        self.assertEqual(self.notification.email_status, 'failed')
+        self.assertEqual(self.notification.email_attempts, 3)
+        self.assertEqual(self.notification.email_error, 'down')
+
+
+class NotificationInboxTests(TestCase):
+    """
+    Keyset pages of the inbox
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', email='reader@example.com')
+        for index in range(5):
+            NotificationService.create_notification(self.user, f'Notice {index}', 'Body', send_email=False)
+        # Rows inserted in one batch often share a timestamp; the id breaks the tie
+        Notification.objects.update(created_at=timezone.now())
+
+    def test_pages_cover_equal_timestamps_once(self):
+        seen, cursor = [], None
+        while True:
+            page = NotificationInboxService.page(self.user, cursor=cursor, limit=2)
+            seen.extend(row['id'] for row in page['results'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, sorted(Notification.objects.values_list('id', flat=True), reverse=True))
+
+    def test_unread_only_and_count(self):
+        newest = Notification.objects.order_by('-id').first()
+        NotificationInboxService.mark_read(self.user, ids=[newest.id])
+
+        page = NotificationInboxService.page(self.user, limit=10, unread_only=True)
+
+        self.assertNotIn(newest.id, [row['id'] for row in page['results']])
+        self.assertEqual(len(page['results']), 4)
+        self.assertEqual(page['unread_count'], 4)
@@ -27,6 +27,8 @@ urlpatterns = [
     path('attendance/', views.attendance_list, name='attendance_list'),
     path('attendance/create/', views.attendance_create, name='attendance_create'),
     path('attendance/calendar/', views.attendance_calendar, name='attendance_calendar'),
+    path('attendance/calendar/day/', views.attendance_calendar_day, name='attendance_calendar_day'),
+    path('attendance/presence/stream/', views.presence_stream, name='presence_stream'),
     
     # Leave Request URLs
     path('leave/', views.leave_request_list, name='leave_request_list'),
@@ -39,12 +41,19 @@ urlpatterns = [
     path('payroll/<int:pk>/approve/', views.payroll_approve, name='payroll_approve'),
     path('payroll/<int:pk>/reject/', views.payroll_reject, name='payroll_reject'),
     path('payroll/bulk-process/', views.payroll_bulk_process, name='payroll_bulk_process'),
+    path('payroll/bulk-transition/', views.payroll_bulk_transition, name='payroll_bulk_transition'),
+    path('payroll/simulate/', views.payroll_simulate, name='payroll_simulate'),
     path('payroll/generate-payslips/', views.payroll_generate_payslips, name='payroll_generate_payslips'),
+    path('payroll/payslip-batches/<int:pk>/status/', views.payslip_batch_status, name='payslip_batch_status'),
     
     # API URLs for AJAX requests
     path('api/employee/<int:pk>/', views.get_employee_data, name='get_employee_data'),
     path('api/notification/<int:pk>/read/', views.mark_notification_read, name='mark_notification_read'),
+    path('api/notifications/', views.notification_inbox, name='notification_inbox'),
+    path('api/notifications/unread-count/', views.notification_unread_count, name='notification_unread_count'),
+    path('api/notifications/read/', views.notifications_mark_read, name='notifications_mark_read'),
     path('api/attendance/<int:employee_id>/summary/', views.attendance_summary, name='attendance_summary'),
+    path('api/attendance/punches/', views.attendance_punch_ingest, name='attendance_punch_ingest'),
     
     # Export URLs
     path('export/employees/csv/', views.export_employees_csv, name='export_employees_csv'),
@@ -52,6 +61,9 @@ urlpatterns = [
     path('export/payroll/csv/', views.export_payroll_csv, name='export_payroll_csv'),
     path('export/leave-requests/csv/', views.export_leave_requests_csv, name='export_leave_requests_csv'),
     path('export/documents/csv/', views.export_documents_csv, name='export_documents_csv'),
+    path('export/jobs/', views.export_job_create, name='export_job_create'),
+    path('export/jobs/<int:pk>/', views.export_job_status, name='export_job_status'),
+    path('export/jobs/<int:pk>/download/', views.export_job_download, name='export_job_download'),
     
     # Document URLs
     path('documents/', views.document_list, name='document_list'),
@@ -2,13 +2,15 @@
 Views for HR system with role-based access control
 """
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
-import csv
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, FileResponse
+from django.core.handlers.asgi import ASGIRequest
 from io import StringIO
 from django.core.paginator import Paginator
+from django.core.files.storage import default_storage
 from django.db.models import Q, Sum, Count, Avg
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
@@ -21,12 +23,14 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from datetime import date, timedelta, datetime
+import hmac
 import json
 import logging
 
 from .models import (
     User, Employee, Department, JobPosition, Attendance, 
-    LeaveRequest, Payroll, Document, Notification, AuditLog
+    LeaveRequest, Payroll, Document, Notification, AuditLog, PayslipBatch,
+    ExportJob
 )
 from .forms import (
     CustomUserCreationForm, CustomUserChangeForm, DepartmentForm, JobPositionForm,
@@ -39,6 +43,21 @@ from .permissions import (
     can_view_all_data, owner_or_hr_required, audit_log, validate_employee_access,
     validate_department_access, rate_limit
 )
+from .payroll_engine import PayrollEngine
+from .payroll_simulation import PayrollSimulator
+from .payroll_transitions import PayrollTransitionService, TRANSITIONS
+from .attendance_totals import AttendanceTotalsService
+from .attendance_calendar import AttendanceCalendarService
+from .presence import presence_events
+from .exports import (
+    streaming_csv_response, EMPLOYEE_HEADER, employee_rows, ATTENDANCE_HEADER, attendance_rows,
+    PAYROLL_HEADER, payroll_rows, LEAVE_REQUEST_HEADER, leave_request_rows, DOCUMENT_HEADER, document_rows,
+)
+from .export_jobs import ExportJobService, normalize_params
+from .notifications import NotificationService
+from .notification_inbox import UnreadCounter, NotificationInboxService
+from .payslips import PayslipService
+from .punch_ingestion import PunchIngestionService
 
 logger = logging.getLogger(__name__)
 
@@ -189,9 +208,10 @@ def employee_dashboard(request):
         messages.error(request, 'Employee profile not found.')
         return redirect('login')
     
-    # Get employee statistics
-    total_attendance_days = Attendance.objects.filter(employee=employee).count()
-    late_days = Attendance.objects.filter(employee=employee, is_late=True).count()
+    # Get employee statistics from the monthly rollup
+    history = AttendanceTotalsService.month_totals([employee.id]).get(employee.id, {})
+    total_attendance_days = history.get('days_recorded', 0)
+    late_days = history.get('late_days', 0)
     pending_leave_requests = LeaveRequest.objects.filter(
         employee=employee,
         status='pending'
@@ -206,11 +226,12 @@ def employee_dashboard(request):
     # Recent payrolls
     recent_payrolls = Payroll.objects.filter(employee=employee).order_by('-pay_period_end')[:3]
     
-    # Unread notifications
+    # Unread notifications; the cached counter spares the query when there are none
+    unread_count = UnreadCounter.get(request.user.id)
     unread_notifications = Notification.objects.filter(
         recipient=request.user,
         is_read=False
-    ).order_by('-created_at')[:5]
+    ).order_by('-created_at')[:5] if unread_count else []
     
     context = {
         'employee': employee,
@@ -221,11 +242,30 @@ def employee_dashboard(request):
         'recent_leave_requests': recent_leave_requests,
         'recent_payrolls': recent_payrolls,
         'unread_notifications': unread_notifications,
+        'unread_count': unread_count,
     }
     
     return render(request, 'hr/dashboards/employee_dashboard.html', context)
 
 
+@login_required
+async def presence_stream(request):
+    """
+    Live check-in/check-out feed for the HR dashboard as server-sent events
+    """
+    user = await request.auser()
+    if not (user.is_admin() or user.is_hr()):
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    if not isinstance(request, ASGIRequest):
+        # WSGI would buffer the endless stream instead of sending it
+        return JsonResponse({'error': 'The presence stream is only served over ASGI'}, status=501)
+    
+    response = StreamingHttpResponse(presence_events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 # Employee Management Views
 @login_required
 @hr_or_admin_required
@@ -237,7 +277,10 @@ def employee_list(request):
     
     # Filtering
     search = request.GET.get('search')
-    department_id = request.GET.get('department')
+    try:
+        department_id = int(request.GET['department']) if request.GET.get('department') else None
+    except ValueError:
+        return HttpResponse('department must be an integer', status=400)
     status_filter = request.GET.get('status')
     
     if search:
@@ -483,16 +526,14 @@ def leave_request_create(request):
             )
             
             # Create notification for HR
-            hr_users = User.objects.filter(role='hr')
-            for hr_user in hr_users:
-                Notification.objects.create(
-                    recipient=hr_user,
-                    title='New Leave Request',
-                    message=f'{request.user.get_full_name()} has submitted a leave request.',
-                    notification_type='leave_approval',
-                    related_object_id=leave_request.id,
-                    related_object_type='LeaveRequest'
-                )
+            NotificationService.fan_out(
+                User.objects.filter(role='hr'),
+                title='New Leave Request',
+                message=f'{request.user.get_full_name()} has submitted a leave request.',
+                notification_type='leave_approval',
+                related_object=leave_request,
+                send_email=False
+            )
             
             messages.success(request, 'Leave request submitted successfully.')
             return redirect('leave_request_list')
@@ -680,6 +721,82 @@ def mark_notification_read(request, pk):
     return JsonResponse({'status': 'success'})
 
 
+@login_required
+@require_http_methods(["GET"])
+def notification_inbox(request):
+    """
+    The user's notifications, newest first; pass next_cursor back as ?cursor= for the next page
+    """
+    try:
+        limit = min(max(int(request.GET.get('limit', getattr(settings, 'NOTIFICATION_INBOX_PAGE_SIZE', 20))), 1), 100)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+    
+    try:
+        data = NotificationInboxService.page(
+            request.user, cursor=request.GET.get('cursor'), limit=limit,
+            unread_only=request.GET.get('unread') in ('1', 'true', 'yes'),
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse(data)
+
+
+@login_required
+@require_http_methods(["GET"])
+def notification_unread_count(request):
+    """
+    Unread badge count, served from the cache
+    """
+    return JsonResponse({'unread_count': UnreadCounter.get(request.user.id)})
+
+
+@login_required
+@require_http_methods(["POST"])
+def notifications_mark_read(request):
+    """
+    Mark several notifications, or all of them with {"all": true}, as read in one UPDATE
+    """
+    try:
+        payload = json.loads(request.body or '{}')
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+    
+    if payload.get('all'):
+        ids = None
+    else:
+        ids = payload.get('ids')
+        if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+            return JsonResponse({'error': 'Expected "ids" as a list of notification ids, or "all": true'}, status=400)
+    
+    updated = NotificationInboxService.mark_read(request.user, ids)
+    
+    return JsonResponse({'updated': updated, 'unread_count': UnreadCounter.get(request.user.id)})
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def attendance_punch_ingest(request):
+    """
+    Batch punch ingestion for fingerprint terminals, authenticated with PUNCH_INGEST_TOKEN
+    """
+    expected = getattr(settings, 'PUNCH_INGEST_TOKEN', '')
+    provided = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if not expected or not hmac.compare_digest(provided.encode(), expected.encode()):
+        return JsonResponse({'error': 'Invalid device token'}, status=401)
+    
+    try:
+        payload = json.loads(request.body or '[]')
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+    punches = payload.get('punches') if isinstance(payload, dict) else payload
+    if not isinstance(punches, list):
+        return JsonResponse({'error': 'Expected a list of punches'}, status=400)
+    
+    return JsonResponse(PunchIngestionService.ingest(punches))
+
+
 @login_required
 @require_http_methods(["GET"])
 def attendance_summary(request, employee_id):
@@ -694,17 +811,12 @@ def attendance_summary(request, employee_id):
     
     # Get current month data
     today = date.today()
-    start_of_month = today.replace(day=1)
-    
-    attendances = Attendance.objects.filter(
-        employee=employee,
-        date__gte=start_of_month
-    )
+    totals = AttendanceTotalsService.month_totals([employee.id], [(today.year, today.month)]).get(employee.id, {})
     
-    total_days = attendances.count()
-    present_days = attendances.filter(check_in_time__isnull=False).count()
-    late_days = attendances.filter(is_late=True).count()
-    absent_days = attendances.filter(is_absent=True).count()
+    total_days = totals.get('days_recorded', 0)
+    present_days = totals.get('present_days', 0)
+    late_days = totals.get('late_days', 0)
+    absent_days = totals.get('absent_days', 0)
     
     data = {
         'total_days': total_days,
@@ -723,64 +835,35 @@ def attendance_calendar(request):
     Calendar view for attendance tracking
     """
     # Get date range (default to current month)
-    year = int(request.GET.get('year', date.today().year))
-    month = int(request.GET.get('month', date.today().month))
-    
-    # Calculate date range for the month
-    start_date = date(year, month, 1)
-    if month == 12:
-        end_date = date(year + 1, 1, 1) - timedelta(days=1)
-    else:
-        end_date = date(year, month + 1, 1) - timedelta(days=1)
+    try:
+        year = int(request.GET.get('year', date.today().year))
+        month = int(request.GET.get('month', date.today().month))
+        start_date, end_date = AttendanceCalendarService.month_bounds(year, month)
+        employee_id = int(request.GET['employee_id']) if request.GET.get('employee_id') else None
+    except ValueError:
+        return HttpResponse('year, month and employee_id must be integers', status=400)
     
     # Get attendance data based on user role
     if request.user.is_admin() or request.user.is_hr():
-        # HR/Admin can see all employees
-        employee_id = request.GET.get('employee_id')
-        if employee_id:
-            attendances = Attendance.objects.filter(
-                employee_id=employee_id,
-                date__range=[start_date, end_date]
-            ).select_related('employee__user')
-        else:
-            attendances = Attendance.objects.filter(
-                date__range=[start_date, end_date]
-            ).select_related('employee__user')
-        
-        # Get all employees for filter dropdown
-        employees = Employee.objects.filter(status='active').select_related('user')
+        # HR/Admin can see all employees; get them for the filter dropdown
+        employees = Employee.objects.filter(status='active').select_related('user').only(
+            'id', 'employee_id', 'user__first_name', 'user__last_name'
+        )
     else:
         # Employees can only see their own attendance
-        attendances = Attendance.objects.filter(
-            employee=request.user.employee_profile,
-            date__range=[start_date, end_date]
-        ).select_related('employee__user')
+        employee_id = request.user.employee_profile.id
         employees = None
     
-    # Create calendar data structure
-    calendar_data = {}
-    for att in attendances:
-        day = att.date.day
-        if day not in calendar_data:
-            calendar_data[day] = []
-        
-        calendar_data[day].append({
-            'employee_name': att.employee.user.get_full_name(),
-            'employee_id': att.employee.employee_id,
-            'check_in': att.check_in_time.strftime('%H:%M') if att.check_in_time else 'N/A',
-            'check_out': att.check_out_time.strftime('%H:%M') if att.check_out_time else 'N/A',
-            'work_hours': float(att.work_hours),
-            'overtime_hours': float(att.overtime_hours),
-            'is_late': att.is_late,
-            'is_absent': att.is_absent,
-            'status': 'absent' if att.is_absent else ('late' if att.is_late else 'present')
-        })
+    # Per-day status counts from one grouped query, cached until the month's attendance changes.
+    # The template fetches a day's records from attendance_calendar_day when it is opened.
+    grid = AttendanceCalendarService.month_grid(year, month, employee_id)
     
     # Calculate month statistics
-    total_attendance_records = attendances.count()
-    present_records = attendances.filter(is_absent=False).count()
-    absent_records = attendances.filter(is_absent=True).count()
-    late_records = attendances.filter(is_late=True).count()
+    month_totals = grid.totals()
+    total_attendance_records = month_totals['total']
+    present_records = month_totals['present']
+    absent_records = month_totals['absent']
+    late_records = month_totals['late']
     
     # Navigation dates
     prev_month = month - 1 if month > 1 else 12
@@ -793,7 +876,9 @@ def attendance_calendar(request):
         'month': month,
         'start_date': start_date,
         'end_date': end_date,
-        'calendar_data': calendar_data,
+        'calendar_counts': grid.as_dict(),
+        'calendar_weeks': grid.weeks(),
+        'day_detail_url': reverse('hr:attendance_calendar_day'),
         'employees': employees,
         'selected_employee_id': request.GET.get('employee_id', ''),
         'total_records': total_attendance_records,
@@ -810,6 +895,27 @@ def attendance_calendar(request):
     return render(request, 'hr/attendance_calendar.html', context)
 
 
+@login_required
+@require_http_methods(["GET"])
+def attendance_calendar_day(request):
+    """
+    Paginated attendance records for one calendar day
+    """
+    try:
+        day = date.fromisoformat(request.GET.get('date', ''))
+        page_size = min(max(int(request.GET.get('page_size', 50)), 1), 500)
+        employee_id = int(request.GET['employee_id']) if request.GET.get('employee_id') else None
+    except ValueError:
+        return JsonResponse({'error': 'date must be YYYY-MM-DD, page_size and employee_id integers'}, status=400)
+    
+    if not (request.user.is_admin() or request.user.is_hr()):
+        employee_id = request.user.employee_profile.id
+    
+    return JsonResponse(AttendanceCalendarService.day_detail(
+        day, employee_id, page=request.GET.get('page', 1), page_size=page_size
+    ))
+
+
 # Export Functions
 @login_required
 @hr_or_admin_required
@@ -817,43 +923,7 @@ def export_employees_csv(request):
     """
     Export employee data to CSV
     """
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="employees.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'Employee ID', 'First Name', 'Last Name', 'Email', 'Phone', 'Department', 
-        'Position', 'Manager', 'Employment Type', 'Status', 'Hire Date', 
-        'Base Salary', 'Work Start Time', 'Work End Time', 'Vacation Days', 
-        'Sick Days', 'Personal Days'
-    ])
-    
-    employees = Employee.objects.select_related(
-        'user', 'department', 'position', 'manager__user'
-    ).all()
-    
-    for emp in employees:
-        writer.writerow([
-            emp.employee_id,
-            emp.user.first_name,
-            emp.user.last_name,
-            emp.user.email,
-            emp.user.phone_number,
-            emp.department.name if emp.department else '',
-            emp.position.title if emp.position else '',
-            emp.manager.user.get_full_name() if emp.manager else '',
-            emp.get_employment_type_display(),
-            emp.get_status_display(),
-            emp.hire_date,
-            emp.base_salary,
-            emp.work_start_time,
-            emp.work_end_time,
-            emp.vacation_days_remaining,
-            emp.sick_days_remaining,
-            emp.personal_days_remaining,
-        ])
-    
-    return response
+    return streaming_csv_response(request, 'employees.csv', EMPLOYEE_HEADER, employee_rows())
 
 
 @login_required
@@ -865,35 +935,14 @@ def export_attendance_csv(request):
     # Get date range from request
     start_date = request.GET.get('start_date', (date.today() - timedelta(days=30)).strftime('%Y-%m-%d'))
     end_date = request.GET.get('end_date', date.today().strftime('%Y-%m-%d'))
+    try:
+        start_date, end_date = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    except ValueError:
+        return HttpResponse('start_date and end_date must be YYYY-MM-DD', status=400)
     
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="attendance_{start_date}_to_{end_date}.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'Employee ID', 'Employee Name', 'Date', 'Check In', 'Check Out', 
-        'Work Hours', 'Overtime Hours', 'Is Late', 'Is Absent', 'Notes'
-    ])
-    
-    attendances = Attendance.objects.filter(
-        date__range=[start_date, end_date]
-    ).select_related('employee__user').order_by('date', 'employee__employee_id')
-    
-    for att in attendances:
-        writer.writerow([
-            att.employee.employee_id,
-            att.employee.user.get_full_name(),
-            att.date,
-            att.check_in_time.strftime('%H:%M') if att.check_in_time else '',
-            att.check_out_time.strftime('%H:%M') if att.check_out_time else '',
-            att.work_hours,
-            att.overtime_hours,
-            'Yes' if att.is_late else 'No',
-            'Yes' if att.is_absent else 'No',
-            att.notes,
-        ])
-    
-    return response
+    return streaming_csv_response(
+        request, f'attendance_{start_date}_to_{end_date}.csv', ATTENDANCE_HEADER, attendance_rows(start_date, end_date)
+    )
 
 
 @login_required
@@ -905,41 +954,14 @@ def export_payroll_csv(request):
     # Get date range from request
     start_date = request.GET.get('start_date', (date.today() - timedelta(days=30)).strftime('%Y-%m-%d'))
     end_date = request.GET.get('end_date', date.today().strftime('%Y-%m-%d'))
+    try:
+        start_date, end_date = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    except ValueError:
+        return HttpResponse('start_date and end_date must be YYYY-MM-DD', status=400)
     
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="payroll_{start_date}_to_{end_date}.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'Employee ID', 'Employee Name', 'Pay Period Start', 'Pay Period End',
-        'Base Salary', 'Hours Worked', 'Overtime Hours', 'Overtime Pay',
-        'Deductions', 'Bonuses', 'Net Salary', 'Status', 'Created By', 'Approved By'
-    ])
-    
-    payrolls = Payroll.objects.filter(
-        pay_period_start__gte=start_date,
-        pay_period_end__lte=end_date
-    ).select_related('employee__user', 'created_by', 'approved_by').order_by('pay_period_start')
-    
-    for payroll in payrolls:
-        writer.writerow([
-            payroll.employee.employee_id,
-            payroll.employee.user.get_full_name(),
-            payroll.pay_period_start,
-            payroll.pay_period_end,
-            payroll.base_salary,
-            payroll.hours_worked,
-            payroll.overtime_hours,
-            payroll.overtime_pay,
-            payroll.deductions,
-            payroll.bonuses,
-            payroll.net_salary,
-            payroll.get_status_display(),
-            payroll.created_by.get_full_name() if payroll.created_by else '',
-            payroll.approved_by.get_full_name() if payroll.approved_by else '',
-        ])
-    
-    return response
+    return streaming_csv_response(
+        request, f'payroll_{start_date}_to_{end_date}.csv', PAYROLL_HEADER, payroll_rows(start_date, end_date)
+    )
 
 
 @login_required
@@ -948,36 +970,7 @@ def export_leave_requests_csv(request):
     """
     Export leave requests data to CSV
     """
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="leave_requests.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'Employee ID', 'Employee Name', 'Leave Type', 'Start Date', 'End Date',
-        'Days Requested', 'Reason', 'Status', 'Approved By', 'Approved At',
-        'Rejection Reason'
-    ])
-    
-    leave_requests = LeaveRequest.objects.select_related(
-        'employee__user', 'approved_by'
-    ).order_by('-created_at')
-    
-    for req in leave_requests:
-        writer.writerow([
-            req.employee.employee_id,
-            req.employee.user.get_full_name(),
-            req.get_leave_type_display(),
-            req.start_date,
-            req.end_date,
-            req.days_requested,
-            req.reason,
-            req.get_status_display(),
-            req.approved_by.get_full_name() if req.approved_by else '',
-            req.approved_at.strftime('%Y-%m-%d %H:%M') if req.approved_at else '',
-            req.rejection_reason,
-        ])
-    
-    return response
+    return streaming_csv_response(request, 'leave_requests.csv', LEAVE_REQUEST_HEADER, leave_request_rows())
 
 
 @login_required
@@ -986,34 +979,71 @@ def export_documents_csv(request):
     """
     Export document data to CSV
     """
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="documents.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'Employee ID', 'Employee Name', 'Document Type', 'Title', 'Description',
-        'Upload Date', 'Expiry Date', 'Is Verified', 'Verified By', 'Verified At'
-    ])
-    
-    documents = Document.objects.select_related(
-        'employee__user', 'verified_by'
-    ).order_by('-created_at')
-    
-    for doc in documents:
-        writer.writerow([
-            doc.employee.employee_id,
-            doc.employee.user.get_full_name(),
-            doc.get_document_type_display(),
-            doc.title,
-            doc.description,
-            doc.created_at.strftime('%Y-%m-%d'),
-            doc.expiry_date.strftime('%Y-%m-%d') if doc.expiry_date else '',
-            'Yes' if doc.is_verified else 'No',
-            doc.verified_by.get_full_name() if doc.verified_by else '',
-            doc.verified_at.strftime('%Y-%m-%d %H:%M') if doc.verified_at else '',
-        ])
+    return streaming_csv_response(request, 'documents.csv', DOCUMENT_HEADER, document_rows())
+
+
+@login_required
+@hr_or_admin_required
+@require_http_methods(["POST"])
+def export_job_create(request):
+    """
+    Queue a background export; an unchanged, already built export is handed back at once
+    """
+    if request.content_type == 'application/json':
+        try:
+            payload = json.loads(request.body or '{}')
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+    else:
+        payload = request.POST
     
-    return response
+    try:
+        params = normalize_params(
+            payload.get('kind'), payload.get('start_date'), payload.get('end_date'),
+            str(payload.get('gzip', '')).lower() in ('1', 'true', 'yes'),
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    # Built by the process_exports workers; poll export_job_status for progress
+    job, reused = ExportJobService.request(payload['kind'], params, user=request.user)
+    data = ExportJobService.describe(job)
+    data['reused'] = reused
+    data['status_url'] = reverse('hr:export_job_status', args=[job.id])
+    data['download_url'] = reverse('hr:export_job_download', args=[job.id])
+    
+    return JsonResponse(data, status=200 if job.status == 'completed' else 202)
+
+
+@login_required
+@hr_or_admin_required
+@require_http_methods(["GET"])
+def export_job_status(request, pk):
+    """
+    Progress of a background export
+    """
+    job = get_object_or_404(ExportJob, pk=pk)
+    return JsonResponse(ExportJobService.describe(job))
+
+
+@login_required
+@hr_or_admin_required
+@require_http_methods(["GET"])
+def export_job_download(request, pk):
+    """
+    Download the file of a completed export
+    """
+    job = get_object_or_404(ExportJob, pk=pk)
+    if job.status != 'completed':
+        return JsonResponse({'error': f'Export is {job.status}', 'status': job.status}, status=409)
+    if not default_storage.exists(job.file_path):
+        return JsonResponse({'error': 'Export file is no longer available; request it again'}, status=410)
+    
+    content_type = 'application/gzip' if job.file_path.endswith('.gz') else 'text/csv'
+    return FileResponse(
+        default_storage.open(job.file_path, 'rb'), as_attachment=True,
+        filename=job.file_path.rsplit('/', 1)[-1], content_type=content_type,
+    )
 
 
 # Payroll Approval Workflow
@@ -1118,44 +1148,16 @@ def payroll_bulk_process(request):
             messages.error(request, 'Please select employees and specify pay period.')
             return redirect('hr:payroll_list')
         
-        created_count = 0
-        for employee_id in employee_ids:
-            employee = get_object_or_404(Employee, id=employee_id)
-            
-            # Check if payroll already exists for this period
-            existing_payroll = Payroll.objects.filter(
-                employee=employee,
-                pay_period_start=pay_period_start,
-                pay_period_end=pay_period_end
-            ).first()
-            
-            if not existing_payroll:
-                # Calculate hours worked for the period
-                attendances = Attendance.objects.filter(
-                    employee=employee,
-                    date__range=[pay_period_start, pay_period_end]
-                )
-                
-                total_hours = sum(float(att.work_hours) for att in attendances)
-                total_overtime = sum(float(att.overtime_hours) for att in attendances)
-                
-                # Create payroll record
-                payroll = Payroll.objects.create(
-                    employee=employee,
-                    pay_period_start=pay_period_start,
-                    pay_period_end=pay_period_end,
-                    base_salary=employee.base_salary,
-                    hours_worked=total_hours,
-                    overtime_hours=total_overtime,
-                    status='pending',
-                    created_by=request.user
-                )
-                
-                # Calculate net salary
-                payroll.calculate_net_salary()
-                payroll.save()
-                
-                created_count += 1
+        try:
+            start_date, end_date = date.fromisoformat(pay_period_start), date.fromisoformat(pay_period_end)
+        except ValueError:
+            messages.error(request, 'Pay period dates must be YYYY-MM-DD.')
+            return redirect('hr:payroll_list')
+        
+        employees = Employee.objects.filter(id__in=employee_ids)
+        engine = PayrollEngine(start_date, end_date, created_by=request.user, status='pending')
+        result = engine.run(employees)
+        created_count = result.created_count
         
         messages.success(request, f'Created {created_count} payroll records.')
         
@@ -1172,11 +1174,77 @@ def payroll_bulk_process(request):
     return redirect('hr:payroll_list')
 
 
+@login_required
+@hr_or_admin_required
+@require_http_methods(["POST"])
+def payroll_bulk_transition(request):
+    """
+    Approve, reject or mark paid many payrolls at once, selected by id or by pay period
+    """
+    if request.content_type == 'application/json':
+        try:
+            payload = json.loads(request.body or '{}')
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+        payroll_ids = payload.get('payroll_ids') or []
+    else:
+        payload = request.POST
+        payroll_ids = request.POST.getlist('payroll_ids')
+    
+    transition_name = payload.get('action')
+    if transition_name not in TRANSITIONS:
+        return JsonResponse({'error': f"action must be one of {', '.join(TRANSITIONS)}"}, status=400)
+    
+    try:
+        if payload.get('pay_period_start') and payload.get('pay_period_end'):
+            payroll_ids = Payroll.objects.filter(
+                pay_period_start=date.fromisoformat(payload['pay_period_start']),
+                pay_period_end=date.fromisoformat(payload['pay_period_end']),
+            ).values_list('id', flat=True)
+        outcomes = PayrollTransitionService.transition(
+            payroll_ids, transition_name, user=request.user, reason=payload.get('reason', '')
+        )
+    except (TypeError, ValueError):
+        return JsonResponse(
+            {'error': 'payroll_ids must be integers and pay_period_start/pay_period_end YYYY-MM-DD'}, status=400
+        )
+    
+    target = TRANSITIONS[transition_name][1]
+    return JsonResponse({
+        'action': transition_name,
+        'updated': sum(1 for outcome in outcomes.values() if outcome == target),
+        'outcomes': outcomes,
+    })
+
+
+@login_required
+@hr_or_admin_required
+@require_http_methods(["GET"])
+def payroll_simulate(request):
+    """
+    What-if payroll for a period, computed in memory without creating records
+    """
+    try:
+        start_date = date.fromisoformat(request.GET.get('start_date', ''))
+        end_date = date.fromisoformat(request.GET.get('end_date', ''))
+        department_id = int(request.GET['department']) if request.GET.get('department') else None
+    except ValueError:
+        return JsonResponse({'error': 'start_date and end_date must be YYYY-MM-DD and department an integer'}, status=400)
+    if end_date < start_date:
+        return JsonResponse({'error': 'end_date must not be before start_date'}, status=400)
+    
+    employees = Employee.objects.filter(status='active')
+    if department_id:
+        employees = employees.filter(department_id=department_id)
+    
+    return JsonResponse(PayrollSimulator(start_date, end_date).simulate(employees))
+
+
 @login_required
 @hr_or_admin_required
 def payroll_generate_payslips(request):
     """
-    Generate PDF payslips for approved payroll records
+    Queue payslip rendering for approved payroll records
     """
     if request.method == 'POST':
         payroll_ids = request.POST.getlist('payroll_ids')
@@ -1185,42 +1253,47 @@ def payroll_generate_payslips(request):
             messages.error(request, 'Please select payroll records to generate payslips.')
             return redirect('hr:payroll_list')
         
-        generated_count = 0
-        for payroll_id in payroll_ids:
-            payroll = get_object_or_404(Payroll, id=payroll_id)
-            
-            if payroll.status == 'approved' and not payroll.payslip_generated:
-                # Mark as payslip generated (in a real system, you'd generate actual PDF)
-                payroll.payslip_generated = True
-                payroll.save()
-                
-                # Create notification for employee
-                Notification.objects.create(
-                    recipient=payroll.employee.user,
-                    title='Payslip Available',
-                    message=f'Your payslip for {payroll.pay_period_start} to {payroll.pay_period_end} is now available.',
-                    notification_type='payslip_available',
-                    related_object_id=payroll.id,
-                    related_object_type='payroll'
-                )
-                
-                generated_count += 1
+        # Rendering happens in the process_payslips workers; poll payslip_batch_status for progress
+        batch = PayslipService.enqueue(payroll_ids, requested_by=request.user)
         
-        messages.success(request, f'Generated {generated_count} payslips.')
+        messages.success(request, f'Queued {batch.total} payslips for generation (batch #{batch.id}).')
         
         # Log the action
         AuditLog.objects.create(
             user=request.user,
             action='generate_payslips',
-            model_name='Payroll',
-            object_id=None,
-            object_repr=f'Generated {generated_count} payslips',
-            changes=f'Generated payslips for {generated_count} payroll records'
+            model_name='PayslipBatch',
+            object_id=batch.id,
+            object_repr=f'Queued {batch.total} payslips',
+            changes=f'Queued payslips for {batch.total} payroll records'
         )
     
     return redirect('hr:payroll_list')
 
 
+@login_required
+@hr_or_admin_required
+@require_http_methods(["GET"])
+def payslip_batch_status(request, pk):
+    """
+    Progress of a queued payslip batch
+    """
+    batch = get_object_or_404(PayslipBatch, pk=pk)
+    
+    data = {
+        'id': batch.id,
+        'status': batch.status,
+        'total': batch.total,
+        'rendered': batch.rendered,
+        'cached': batch.cached,
+        'failed': batch.failed,
+        'progress': batch.progress(),
+        'error': batch.error,
+    }
+    
+    return JsonResponse(data)
+
+
 # Document Workflow
 @login_required
 @hr_or_admin_required
@@ -1373,19 +1446,8 @@ def document_expiry_alerts(request):
         is_verified=True
     ).select_related('employee__user')
     
-    alert_count = 0
-    for doc in expiring_documents:
-        # Create notification for employee
-        Notification.objects.create(
-            recipient=doc.employee.user,
-            title='Document Expiring Soon',
-            message=f'Your document "{doc.title}" will expire on {doc.expiry_date}. Please renew it soon.',
-            notification_type='document_expiring',
-            related_object_id=doc.id,
-            related_object_type='document'
-        )
-        
-        alert_count += 1
+    # Documents already alerted for their expiry date (by the daily check or an earlier click) are skipped
+    alert_count = NotificationService.notify_expiring_documents(expiring_documents)
     
     messages.success(request, f'Sent {alert_count} document expiry alerts.')
     